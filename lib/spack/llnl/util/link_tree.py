@@ -7,26 +7,201 @@
 
 from __future__ import print_function
 
+import errno
 import os
 import shutil
 import filecmp
+import multiprocessing.pool
 
-from llnl.util.filesystem import traverse_tree, mkdirp, touch
+from llnl.util.filesystem import mkdirp, touch
 import llnl.util.tty as tty
 
-__all__ = ['LinkTree']
+try:
+    from os import scandir as _scandir
+except ImportError:  # Python < 3.5
+    _scandir = None
+
+__all__ = ['LinkTree', 'MergePlan', 'copy_file', 'link_files',
+           'remove_files']
 
 empty_file_name = '.spack-empty'
 
+#: Default number of threads used to create and remove links.  Each link
+#: is a metadata round-trip, which is what dominates on shared filesystems.
+default_jobs = 8
+
+#: Below this many files, links are created serially: starting a thread
+#: pool is not worth it.
+min_parallel_files = 64
+
 
 def remove_link(src, dest):
     if not os.path.islink(dest):
-        raise ValueError("%s is not a link tree!" % dest)
-    # remove if dest is a hardlink/symlink to src; this will only
-    # be false if two packages are merged into a prefix and have a
-    # conflicting file
-    if filecmp.cmp(src, dest, shallow=True):
+        # hardlinked or copied files compare equal to their source
+        if not (os.path.isfile(dest) and
+                filecmp.cmp(src, dest, shallow=True)):
+            raise ValueError("%s is not a link tree!" % dest)
         os.remove(dest)
+        return
+    # remove if dest is a symlink to src, or a dangling link left by a
+    # removed source; this will only be false if two packages are merged
+    # into a prefix and have a conflicting file
+    if (not os.path.exists(dest) or
+            os.path.realpath(dest) == os.path.realpath(src) or
+            filecmp.cmp(src, dest, shallow=True)):
+        os.remove(dest)
+
+
+def copy_file(src, dest):
+    """Link function that copies ``src`` to ``dest``.
+
+    Symbolic links in the source are recreated rather than followed.
+    """
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dest)
+    else:
+        shutil.copy2(src, dest)
+
+
+def _parallel_map(fn, items, jobs=None):
+    """Map ``fn`` over ``items`` with a pool of ``jobs`` threads."""
+    items = list(items)
+    jobs = default_jobs if jobs is None else jobs
+    if jobs <= 1 or len(items) < min_parallel_files:
+        return [fn(item) for item in items]
+
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        chunksize = max(1, len(items) // (jobs * 4))
+        return pool.map(fn, items, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def link_files(file_map, link=os.symlink, relative=False, jobs=None,
+               check_existing=True):
+    """Link each source file in ``file_map`` to its destination.
+
+    Links are created from a pool of threads, so that the latency of each
+    filesystem metadata operation is overlapped with the others.
+
+    Args:
+        file_map (dict): maps source files to destination paths; the
+            parent directories of the destinations must exist
+        link (callable): function to create links with (defaults to
+            os.symlink); can also be ``os.link`` or ``copy_file``
+        relative (bool): create symlinks relative to their destination
+        jobs (int): number of threads to use (``default_jobs`` if None)
+        check_existing (bool): if False, destinations are known not to
+            exist and are not checked before linking
+
+    Returns:
+        (list): destinations that already existed and were not linked
+    """
+    # os.symlink and os.link fail if the destination exists, so we can
+    # skip checking for it; other functions (e.g. copies) would overwrite
+    exclusive = link in (os.symlink, getattr(os, 'link', None))
+
+    def _link(item):
+        src, dst = item
+        if check_existing and not exclusive and os.path.lexists(dst):
+            return dst
+        if relative:
+            dst_dir = os.path.dirname(os.path.abspath(dst))
+            src = os.path.relpath(os.path.abspath(src), dst_dir)
+        try:
+            link(src, dst)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            return dst
+
+    return [dst for dst in _parallel_map(_link, file_map.items(), jobs)
+            if dst is not None]
+
+
+def remove_files(file_map, remove_file=remove_link, jobs=None):
+    """Call ``remove_file(src, dst)`` for each item of ``file_map``, from a
+    pool of threads.
+    """
+    def _remove(item):
+        remove_file(*item)
+
+    _parallel_map(_remove, file_map.items(), jobs)
+
+
+def _list_dir(path):
+    """Yield (name, is_dir, is_link) for each entry of the directory
+    ``path``, with ``is_dir`` following symbolic links.
+    """
+    if _scandir:
+        for entry in list(_scandir(path)):
+            yield entry.name, entry.is_dir(), entry.is_symlink()
+    else:
+        for name in os.listdir(path):
+            child = os.path.join(path, name)
+            yield name, os.path.isdir(child), os.path.islink(child)
+
+
+class MergePlan(object):
+    """Directories and files to merge from a source tree into a
+    destination, computed from a single walk of the source.
+
+    Attributes:
+        directories (list): (src, dest) pairs of directories, in pre-order
+        files (dict): map of source files to destination paths
+    """
+
+    def __init__(self, source_root, dest_root):
+        self.source_root = source_root
+        self.dest_root = dest_root
+        self.directories = []
+        self.files = {}
+        self._dest_state = None
+
+    def dest_state(self):
+        """Map each destination directory to its state in the destination
+        tree: None if it doesn't exist, 'dir' or 'file'.
+
+        Directories are stat'ed in pre-order and the children of missing
+        directories are known to be missing without asking the filesystem.
+        """
+        if self._dest_state is None:
+            state = {}
+            for src, dest in self.directories:
+                parent = os.path.dirname(dest)
+                if dest != self.dest_root and state.get(parent) != 'dir':
+                    state[dest] = None
+                elif os.path.isdir(dest):
+                    state[dest] = 'dir'
+                elif os.path.lexists(dest):
+                    state[dest] = 'file'
+                else:
+                    state[dest] = None
+            self._dest_state = state
+        return self._dest_state
+
+    def existing_files(self):
+        """Destination files that already exist, stat'ing only those whose
+        parent directory already existed.
+        """
+        state = self.dest_state()
+        return [dest for dest in self.files.values()
+                if state.get(os.path.dirname(dest)) == 'dir' and
+                os.path.exists(dest)]
+
+    def find_dir_conflicts(self):
+        state = self.dest_state()
+        conflicts = []
+        for src, dest in self.directories:
+            if state[dest] == 'file':
+                conflicts.append("File blocks directory: %s" % dest)
+        for dest in self.files.values():
+            if state.get(os.path.dirname(dest)) == 'dir':
+                if os.path.isdir(dest):
+                    conflicts.append("Directory blocks directory: %s" % dest)
+        return conflicts
 
 
 class LinkTree(object):
@@ -45,75 +220,109 @@ class LinkTree(object):
 
         self._root = source_root
 
+    def plan(self, dest_root, ignore=None):
+        """Walk the source tree once and return the ``MergePlan`` to merge
+        it into ``dest_root``.
+
+        ``ignore`` is called with paths relative to the source root; ignored
+        directories are not descended into.  Symbolic links to directories
+        are planned as files, and linked like them, e.g. ``lib64 -> lib``.
+        """
+        ignore = ignore or (lambda x: False)
+        dest_root = os.path.normpath(dest_root)
+        plan = MergePlan(self._root, dest_root)
+        if ignore(''):
+            return plan
+
+        plan.directories.append((self._root, dest_root))
+        stack = ['']
+        while stack:
+            rel_path = stack.pop()
+            src_dir = os.path.join(self._root, rel_path)
+            dest_dir = os.path.join(dest_root, rel_path)
+
+            subdirs = []
+            for name, is_dir, is_link in sorted(_list_dir(src_dir)):
+                rel_child = os.path.join(rel_path, name)
+                if ignore(rel_child):
+                    continue
+
+                src = os.path.join(src_dir, name)
+                dest = os.path.join(dest_dir, name)
+                if is_dir and not is_link:
+                    plan.directories.append((src, dest))
+                    subdirs.append(rel_child)
+                else:
+                    plan.files[src] = dest
+
+            # parents are always planned before their children
+            stack.extend(reversed(subdirs))
+        return plan
+
     def find_conflict(self, dest_root, ignore=None,
-                      ignore_file_conflicts=False):
+                      ignore_file_conflicts=False, plan=None):
         """Returns the first file in dest that conflicts with src"""
-        ignore = ignore or (lambda x: False)
-        conflicts = self.find_dir_conflicts(dest_root, ignore)
+        plan = plan or self.plan(dest_root, ignore)
+        conflicts = plan.find_dir_conflicts()
 
         if not ignore_file_conflicts:
-            conflicts.extend(
-                dst for src, dst
-                in self.get_file_map(dest_root, ignore).items()
-                if os.path.exists(dst))
+            conflicts.extend(plan.existing_files())
 
         if conflicts:
             return conflicts[0]
 
-    def find_dir_conflicts(self, dest_root, ignore):
-        conflicts = []
-        kwargs = {'follow_nonexisting': False, 'ignore': ignore}
-        for src, dest in traverse_tree(self._root, dest_root, **kwargs):
-            if os.path.isdir(src):
-                if os.path.exists(dest) and not os.path.isdir(dest):
-                    conflicts.append("File blocks directory: %s" % dest)
-            elif os.path.exists(dest) and os.path.isdir(dest):
-                conflicts.append("Directory blocks directory: %s" % dest)
-        return conflicts
+    def find_dir_conflicts(self, dest_root, ignore, plan=None):
+        plan = plan or self.plan(dest_root, ignore)
+        return plan.find_dir_conflicts()
 
-    def get_file_map(self, dest_root, ignore):
-        merge_map = {}
-        kwargs = {'follow_nonexisting': True, 'ignore': ignore}
-        for src, dest in traverse_tree(self._root, dest_root, **kwargs):
-            if not os.path.isdir(src):
-                merge_map[src] = dest
-        return merge_map
-
-    def merge_directories(self, dest_root, ignore):
-        for src, dest in traverse_tree(self._root, dest_root, ignore=ignore):
-            if os.path.isdir(src):
-                if not os.path.exists(dest):
+    def get_file_map(self, dest_root, ignore, plan=None):
+        plan = plan or self.plan(dest_root, ignore)
+        return dict(plan.files)
+
+    def merge_directories(self, dest_root, ignore, plan=None):
+        """Create the directories of the source tree in ``dest_root``.
+
+        Directories missing in the destination are created in one batch,
+        without checking for their existence first.
+        """
+        plan = plan or self.plan(dest_root, ignore)
+        state = plan.dest_state()
+        for src, dest in plan.directories:
+            if state[dest] is None:
+                if dest == plan.dest_root:
                     mkdirp(dest)
-                    continue
+                else:
+                    os.mkdir(dest)
+                state[dest] = 'dir'
+                continue
 
-                if not os.path.isdir(dest):
-                    raise ValueError("File blocks directory: %s" % dest)
+            if state[dest] != 'dir':
+                raise ValueError("File blocks directory: %s" % dest)
 
-                # mark empty directories so they aren't removed on unmerge.
-                if not os.listdir(dest):
-                    marker = os.path.join(dest, empty_file_name)
-                    touch(marker)
+            # mark empty directories so they aren't removed on unmerge.
+            if not os.listdir(dest):
+                marker = os.path.join(dest, empty_file_name)
+                touch(marker)
 
-    def unmerge_directories(self, dest_root, ignore):
-        for src, dest in traverse_tree(
-                self._root, dest_root, ignore=ignore, order='post'):
-            if os.path.isdir(src):
-                if not os.path.exists(dest):
-                    continue
-                elif not os.path.isdir(dest):
-                    raise ValueError("File blocks directory: %s" % dest)
+    def unmerge_directories(self, dest_root, ignore, plan=None):
+        plan = plan or self.plan(dest_root, ignore)
+        for src, dest in reversed(plan.directories):
+            if not os.path.exists(dest):
+                continue
+            elif not os.path.isdir(dest):
+                raise ValueError("File blocks directory: %s" % dest)
 
-                # remove directory if it is empty.
-                if not os.listdir(dest):
-                    shutil.rmtree(dest, ignore_errors=True)
+            # remove directory if it is empty.
+            if not os.listdir(dest):
+                shutil.rmtree(dest, ignore_errors=True)
 
-                # remove empty dir marker if present.
-                marker = os.path.join(dest, empty_file_name)
-                if os.path.exists(marker):
-                    os.remove(marker)
+            # remove empty dir marker if present.
+            marker = os.path.join(dest, empty_file_name)
+            if os.path.exists(marker):
+                os.remove(marker)
 
     def merge(self, dest_root, ignore_conflicts=False, ignore=None,
-              link=os.symlink, relative=False):
+              link=os.symlink, relative=False, jobs=None):
         """Link all files in src into dest, creating directories
            if necessary.
 
@@ -125,47 +334,51 @@ class LinkTree(object):
         ignore (callable): callable that returns True if a file is to be
             ignored in the merge (by default ignore nothing)
 
-        link (callable): function to create links with (defaults to os.symlink)
+        link (callable): function to create links with (defaults to
+            os.symlink); use os.link for hardlinks and copy_file for copies
 
         relative (bool): create all symlinks relative to the target
             (default False)
 
+        jobs (int): number of threads creating links (default
+            ``default_jobs``)
+
         """
-        if ignore is None:
-            ignore = lambda x: False
+        plan = self.plan(dest_root, ignore)
 
         conflict = self.find_conflict(
-            dest_root, ignore=ignore, ignore_file_conflicts=ignore_conflicts)
+            dest_root, ignore_file_conflicts=ignore_conflicts, plan=plan)
         if conflict:
             raise MergeConflictError(conflict)
 
-        self.merge_directories(dest_root, ignore)
-        existing = []
-        for src, dst in self.get_file_map(dest_root, ignore).items():
-            if os.path.exists(dst):
-                existing.append(dst)
-            elif relative:
-                abs_src = os.path.abspath(src)
-                dst_dir = os.path.dirname(os.path.abspath(dst))
-                rel = os.path.relpath(abs_src, dst_dir)
-                link(rel, dst)
+        # Destinations whose directory did not exist before the merge can't
+        # exist either, so they are linked without checking.
+        state = dict(plan.dest_state())
+        self.merge_directories(dest_root, ignore, plan=plan)
+        new_files, old_files = {}, {}
+        for src, dst in plan.files.items():
+            if state.get(os.path.dirname(dst)) == 'dir':
+                old_files[src] = dst
             else:
-                link(src, dst)
+                new_files[src] = dst
+
+        link_files(new_files, link=link, relative=relative, jobs=jobs,
+                   check_existing=False)
+        existing = link_files(
+            old_files, link=link, relative=relative, jobs=jobs)
 
         for c in existing:
             tty.warn("Could not merge: %s" % c)
 
-    def unmerge(self, dest_root, ignore=None, remove_file=remove_link):
+    def unmerge(self, dest_root, ignore=None, remove_file=remove_link,
+                jobs=None):
         """Unlink all files in dest that exist in src.
 
         Unlinks directories in dest if they are empty.
         """
-        if ignore is None:
-            ignore = lambda x: False
-
-        for src, dst in self.get_file_map(dest_root, ignore).items():
-            remove_file(src, dst)
-        self.unmerge_directories(dest_root, ignore)
+        plan = self.plan(dest_root, ignore)
+        remove_files(plan.files, remove_file=remove_file, jobs=jobs)
+        self.unmerge_directories(dest_root, ignore, plan=plan)
 
 
 class MergeConflictError(Exception):
@@ -6,6 +6,8 @@
 import os
 import fcntl
 import errno
+import random
+import signal
 import time
 import socket
 
@@ -16,6 +18,16 @@ __all__ = ['Lock', 'LockTransaction', 'WriteTransaction', 'ReadTransaction',
            'LockError', 'LockTimeoutError',
            'LockPermissionError', 'LockROFileError', 'CantCreateLockError']
 
+#: How contended locks are waited for by default.  'blocking' waits in the
+#: kernel (``F_SETLKW``) and is woken up as soon as the lock is released;
+#: 'poll' retries non-blocking attempts with a jittered, exponential
+#: backoff.  Blocking waits fall back to polling where they are not
+#: available (see ``Lock._blocking_lock``).
+default_wait_strategy = 'blocking'
+
+#: errnos with which filesystems refuse blocking lock requests
+_blocking_unsupported_errnos = (errno.ENOLCK, errno.EINVAL, errno.EOPNOTSUPP)
+
 
 class Lock(object):
     """This is an implementation of a filesystem lock using Python's lockf.
@@ -32,7 +44,7 @@ class Lock(object):
     """
 
     def __init__(self, path, start=0, length=0, debug=False,
-                 default_timeout=None):
+                 default_timeout=None, wait_strategy=None):
         """Construct a new lock on the file at ``path``.
 
         By default, the lock applies to the whole file.  Optionally,
@@ -43,6 +55,9 @@ class Lock(object):
         not currently expose the ``whence`` parameter -- ``whence`` is
         always ``os.SEEK_SET`` and ``start`` is always evaluated from the
         beginning of the file.
+
+        ``wait_strategy`` is either 'blocking' or 'poll' and defaults to
+        ``default_wait_strategy``.
         """
         self.path = path
         self._file = None
@@ -65,35 +80,42 @@ class Lock(object):
         self.pid = self.old_pid = None
         self.host = self.old_host = None
 
-    @staticmethod
-    def _poll_interval_generator(_wait_times=None):
-        """This implements a backoff scheme for polling a contended resource
-        by suggesting a succession of wait times between polls.
+        self.wait_strategy = wait_strategy or default_wait_strategy
+        if self.wait_strategy not in ('blocking', 'poll'):
+            raise ValueError(
+                "Invalid lock wait strategy: %s" % self.wait_strategy)
+
+        # Wait statistics for this lock, updated on every acquisition of
+        # the POSIX lock (see ``_acquired_debug``).
+        self.wait_stats = {
+            'acquired': 0,        # number of acquisitions
+            'contended': 0,       # acquisitions that had to wait
+            'attempts': 0,        # total locking attempts
+            'wait_time': 0.0,     # total time spent waiting (seconds)
+            'max_wait_time': 0.0  # longest single wait (seconds)
+        }
 
-        It suggests a poll interval of .1s until 2 seconds have passed,
-        then a poll interval of .2s until 10 seconds have passed, and finally
-        (for all requests after 10s) suggests a poll interval of .5s.
+    @staticmethod
+    def _backoff_intervals(base=1e-3, cap=5e-1):
+        """Adaptive backoff scheme for polling a contended lock.
 
-        This doesn't actually track elapsed time, it estimates the waiting
-        time as though the caller always waits for the full length of time
-        suggested by this function.
+        The ceiling of the wait time starts at ``base`` and doubles after
+        each request up to ``cap``; each suggested wait is drawn at random
+        below the ceiling, so that processes woken up by the same release
+        don't all retry at the same time.
         """
-        num_requests = 0
-        stage1, stage2, stage3 = _wait_times or (1e-1, 2e-1, 5e-1)
-        wait_time = stage1
+        ceiling = base
         while True:
-            if num_requests >= 60:  # 40 * .2 = 8
-                wait_time = stage3
-            elif num_requests >= 20:  # 20 * .1 = 2
-                wait_time = stage2
-            num_requests += 1
-            yield wait_time
+            yield random.uniform(base, ceiling)
+            ceiling = min(cap, ceiling * 2)
 
     def _lock(self, op, timeout=None):
         """This takes a lock using POSIX locks (``fcntl.lockf``).
 
-        The lock is implemented as a spin lock using a nonblocking call
-        to ``lockf()``.
+        The lock is first tried with a nonblocking call to ``lockf()``.  If
+        it is contended, it is waited for according to the wait strategy:
+        with a blocking call to ``lockf()`` (see ``_blocking_lock``), or by
+        polling with ``_backoff_intervals``.
 
         On acquiring an exclusive lock, the lock writes this process's
         pid and host to the lock file, in case the holding process needs
@@ -132,16 +154,30 @@ class Lock(object):
             # If the file were writable, we'd have opened it 'r+'
             raise LockROFileError(self.path)
 
-        poll_intervals = iter(Lock._poll_interval_generator())
         start_time = time.time()
-        num_attempts = 0
-        while (not timeout) or (time.time() - start_time) < timeout:
+        num_attempts = 1
+        if self._poll_lock(op):
+            return time.time() - start_time, num_attempts
+
+        if self.wait_strategy == 'blocking':
+            acquired = self._blocking_lock(op, timeout)
+            if acquired is not None:
+                num_attempts += 1
+                if acquired:
+                    return time.time() - start_time, num_attempts
+                raise LockTimeoutError("Timed out waiting for lock.")
+
+        for wait_time in Lock._backoff_intervals():
+            if timeout:
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    break
+                wait_time = min(wait_time, remaining)
+
+            time.sleep(wait_time)
             num_attempts += 1
             if self._poll_lock(op):
-                total_wait_time = time.time() - start_time
-                return total_wait_time, num_attempts
-
-            time.sleep(next(poll_intervals))
+                return time.time() - start_time, num_attempts
 
         num_attempts += 1
         if self._poll_lock(op):
@@ -150,6 +186,74 @@ class Lock(object):
 
         raise LockTimeoutError("Timed out waiting for lock.")
 
+    def _blocking_lock(self, op, timeout):
+        """Wait for the lock with a blocking call to ``lockf()``
+        (``F_SETLKW``), so that the kernel hands us the lock as soon as it
+        is released.
+
+        Timeouts are implemented with a ``SIGALRM`` interval timer that
+        interrupts the wait.  A helper thread can't be used for this: once
+        abandoned, it could still be granted the lock, which POSIX locks
+        would then hold for the whole process.  An interval timer that was
+        already armed is restored afterwards, but does not fire during the
+        wait.
+
+        Returns True if the lock was acquired and False if it timed out.
+        Returns None if a blocking wait is not possible, i.e. when there is
+        a timeout outside of the main thread (signals can only be handled
+        there), when the filesystem does not honour blocking locks, or when
+        the kernel detects that waiting would deadlock; the caller then
+        falls back to polling.
+        """
+        if getattr(self, '_blocking_unsupported', False):
+            return None
+
+        # The handler only interrupts the wait itself, so that the lock is
+        # not left held but untracked when the timer fires just after it
+        # was granted.
+        waiting = [True]
+
+        def interrupt_wait(signum, frame):
+            if waiting[0]:
+                raise _LockWaitInterrupted()
+
+        if timeout:
+            try:
+                old_handler = signal.signal(signal.SIGALRM, interrupt_wait)
+            except ValueError:
+                return None
+            armed_time = time.time()
+            old_timer = signal.setitimer(signal.ITIMER_REAL, timeout)
+
+        try:
+            try:
+                fcntl.lockf(self._file, op, self._length, self._start,
+                            os.SEEK_SET)
+            finally:
+                waiting[0] = False
+
+        except _LockWaitInterrupted:
+            # The timer may fire just after the lock was granted; taking
+            # a lock we already hold succeeds, so check before giving up.
+            return bool(self._poll_lock(op))
+
+        except IOError as e:
+            if e.errno == errno.EDEADLK:
+                return None
+            elif e.errno in _blocking_unsupported_errnos:
+                self._blocking_unsupported = True
+                return None
+            raise
+
+        finally:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, old_handler)
+                _rearm_timer(old_timer, time.time() - armed_time)
+
+        self._locked(op)
+        return True
+
     def _poll_lock(self, op):
         """Attempt to acquire the lock in a non-blocking manner. Return whether
         the locking attempt succeeds
@@ -159,15 +263,7 @@ class Lock(object):
             fcntl.lockf(self._file, op | fcntl.LOCK_NB,
                         self._length, self._start, os.SEEK_SET)
 
-            # help for debugging distributed locking
-            if self.debug:
-                # All locks read the owner PID and host
-                self._read_debug_data()
-
-                # Exclusive locks write their PID/host
-                if op == fcntl.LOCK_EX:
-                    self._write_debug_data()
-
+            self._locked(op)
             return True
 
         except IOError as e:
@@ -177,6 +273,17 @@ class Lock(object):
             else:
                 raise
 
+    def _locked(self, op):
+        """Called once the POSIX lock has been acquired."""
+        # help for debugging distributed locking
+        if self.debug:
+            # All locks read the owner PID and host
+            self._read_debug_data()
+
+            # Exclusive locks write their PID/host
+            if op == fcntl.LOCK_EX:
+                self._write_debug_data()
+
     def _ensure_parent_directory(self):
         parent = os.path.dirname(self.path)
 
@@ -334,10 +441,20 @@ class Lock(object):
         tty.debug(*args)
 
     def _acquired_debug(self, lock_type, wait_time, nattempts):
-        attempts_format = 'attempt' if nattempts == 1 else 'attempt'
+        stats = self.wait_stats
+        stats['acquired'] += 1
+        stats['attempts'] += nattempts
         if nattempts > 1:
-            acquired_attempts_format = ' after {0:0.2f}s and {1:d} {2}'.format(
-                wait_time, nattempts, attempts_format)
+            stats['contended'] += 1
+            stats['wait_time'] += wait_time
+            stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+
+        if nattempts > 1:
+            acquired_attempts_format = (
+                ' after {0:0.2f}s and {1:d} attempts'
+                ' ({2:d}/{3:d} acquisitions contended, {4:0.2f}s waited)'
+                .format(wait_time, nattempts, stats['contended'],
+                        stats['acquired'], stats['wait_time']))
         else:
             # Dont print anything if we succeeded immediately
             acquired_attempts_format = ''
@@ -346,6 +463,20 @@ class Lock(object):
             .format(lock_type, self, acquired_attempts_format))
 
 
+class _LockWaitInterrupted(Exception):
+    """Raised by the SIGALRM handler to interrupt a blocking lock wait."""
+
+
+def _rearm_timer(timer, elapsed):
+    """Arm again an interval timer, as returned by ``setitimer()``, that
+    was replaced ``elapsed`` seconds ago.  If it would have fired in the
+    meantime, it fires right away."""
+    delay, interval = timer
+    if delay:
+        signal.setitimer(
+            signal.ITIMER_REAL, max(delay - elapsed, 1e-6), interval)
+
+
 class LockTransaction(object):
     """Simple nested transaction context manager that uses a file lock.
 
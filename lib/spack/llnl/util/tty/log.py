@@ -7,11 +7,16 @@
 """
 from __future__ import unicode_literals
 
+import codecs
+import collections
+import gzip
+import locale
 import multiprocessing
 import os
 import re
 import select
 import sys
+import time
 import traceback
 from contextlib import contextmanager
 from six import string_types
@@ -19,8 +24,9 @@ from six import StringIO
 
 import llnl.util.tty as tty
 
-# Use this to strip escape sequences
-_escape = re.compile(r'\x1b[^m]*m|\x1b\[?1034h')
+# Use this to strip escape sequences.  Output is stripped in chunks of
+# several lines, so sequences must not match across lines.
+_escape = re.compile(r'\x1b[^m\n]*m|\x1b\[?1034h')
 
 # control characters for enabling/disabling echo
 #
@@ -30,10 +36,94 @@ _escape = re.compile(r'\x1b[^m]*m|\x1b\[?1034h')
 xon, xoff = '\x11\n', '\x13\n'
 control = re.compile('(\x11\n|\x13\n)')
 
+#: Maximum number of bytes read from the logging pipe at once.
+read_chunk_size = 64 * 1024
+
+#: Seconds between flushes of the log file and of echoed output.
+flush_interval = 0.2
+
+#: Number of lines of a compressed log also kept uncompressed.
+tail_lines = 1000
+
+# native strings, which can be searched for in undecoded output on Python 2
+_newline, _xon_char, _xoff_char = str('\n'), str('\x11'), str('\x13')
+
 
 def _strip(line):
-    """Strip color and control characters from a line."""
-    return _escape.sub('', line)
+    """Strip color and control characters from lines of output."""
+    return _escape.sub(line[:0], line)
+
+
+def _incremental_decoder():
+    """Return a function decoding chunks of bytes read from the pipe.
+
+    Multi-byte characters split across reads are kept until the next
+    call.  On Python 2, output is logged as bytes and is not decoded.
+    """
+    if sys.version_info[0] < 3:
+        return lambda data, final=False: data
+    encoding = locale.getpreferredencoding(False) or 'utf-8'
+    return codecs.getincrementaldecoder(encoding)(errors='replace').decode
+
+
+def _encode(text):
+    """Encode text for the compressed log."""
+    if isinstance(text, bytes):
+        return text
+    return text.encode(locale.getpreferredencoding(False) or 'utf-8',
+                       'replace')
+
+
+def _split_controls(text, force_echo):
+    """Split text on the echo control sequences.
+
+    Returns a list of (text, force_echo) segments, where ``force_echo``
+    is the state in effect for the segment, and the state at the end of
+    the text.
+    """
+    if _xon_char not in text and _xoff_char not in text:
+        return [(text, force_echo)], force_echo
+
+    segments = []
+    for i, part in enumerate(control.split(text)):
+        if i % 2:
+            force_echo = (part == xon)
+        elif part:
+            segments.append((part, force_echo))
+    return segments, force_echo
+
+
+class _LogTail(object):
+    """Last ``lines`` lines written to a log, kept as a deque of chunks."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.chunks = collections.deque()
+        self.newlines = 0
+
+    def append(self, text):
+        self.chunks.append(text)
+        self.newlines += text.count(_newline)
+
+        # drop chunks that are entirely before the last ``lines`` lines
+        while len(self.chunks) > 1:
+            first = self.chunks[0].count(_newline)
+            if self.newlines - first < self.lines:
+                break
+            self.chunks.popleft()
+            self.newlines -= first
+
+    def getvalue(self):
+        if not self.chunks:
+            return ''
+        text = self.chunks[0][:0].join(self.chunks)
+        start = len(text)
+        count = self.lines + (0 if text.endswith(_newline) else -1)
+        for _ in range(count + 1):
+            start = text.rfind(_newline, 0, start)
+            if start < 0:
+                return text
+        return text[start + 1:]
 
 
 class keyboard_input(object):
@@ -189,7 +279,8 @@ class log_output(object):
     work within test frameworks like nose and pytest.
     """
 
-    def __init__(self, file_like=None, echo=False, debug=False, buffer=False):
+    def __init__(self, file_like=None, echo=False, debug=False, buffer=False,
+                 compress=False):
         """Create a new output log context manager.
 
         Args:
@@ -199,6 +290,9 @@ class log_output(object):
             debug (bool): whether to enable tty debug mode during logging
             buffer (bool): pass buffer=True to skip unbuffering output; note
                 this doesn't set up any *new* buffering
+            compress (bool): if ``file_like`` is a filename, write the
+                complete log gzip-compressed to ``file_like + '.gz'``, and
+                only its last ``tail_lines`` lines to ``file_like``
 
         log_output can take either a file object or a filename. If a
         filename is passed, the file will be opened and closed entirely
@@ -217,10 +311,12 @@ class log_output(object):
         self.echo = echo
         self.debug = debug
         self.buffer = buffer
+        self.compress = compress
 
         self._active = False  # used to prevent re-entry
 
-    def __call__(self, file_like=None, echo=None, debug=None, buffer=None):
+    def __call__(self, file_like=None, echo=None, debug=None, buffer=None,
+                 compress=None):
         """Thie behaves the same as init. It allows a logger to be reused.
 
         Arguments are the same as for ``__init__()``.  Args here take
@@ -247,6 +343,8 @@ class log_output(object):
             self.debug = debug
         if buffer is not None:
             self.buffer = buffer
+        if compress is not None:
+            self.compress = compress
         return self
 
     def __enter__(self):
@@ -260,8 +358,11 @@ class log_output(object):
         # set up a stream for the daemon to write to
         self.close_log_in_parent = True
         self.write_log_in_parent = False
+        self.compressed_path = None
         if isinstance(self.file_like, string_types):
             self.log_file = open(self.file_like, 'w')
+            if self.compress:
+                self.compressed_path = self.file_like + '.gz'
 
         elif _file_descriptors_work(self.file_like):
             self.log_file = self.file_like
@@ -413,25 +514,42 @@ class log_output(object):
         sys.stdout.flush()
 
     def _writer_daemon(self, stdin):
-        """Daemon that writes output to the log file and stdout."""
-        # Use line buffering (3rd param = 1) since Python 3 has a bug
-        # that prevents unbuffered text I/O.
-        in_pipe = os.fdopen(self.read_fd, 'r', 1)
+        """Daemon that writes output to the log file and stdout.
+
+        Output is read from the pipe in chunks of up to ``read_chunk_size``
+        bytes, and control and escape sequences are stripped from whole
+        chunks at once.  Only complete lines are processed, so that these
+        sequences are never split between chunks.  The log file and stdout
+        are flushed at most every ``flush_interval`` seconds.
+        """
+        in_fd = self.read_fd
         os.close(self.write_fd)
 
         echo = self.echo        # initial echo setting, user-controllable
         force_echo = False      # parent can force echo for certain output
 
         # list of streams to select from
-        istreams = [in_pipe, stdin] if stdin else [in_pipe]
+        istreams = [in_fd, stdin] if stdin else [in_fd]
 
         log_file = self.log_file
+        compressed, tail = None, None
+        if self.compressed_path:
+            compressed = gzip.open(self.compressed_path, 'wb')
+            tail = _LogTail(tail_lines)
+
+        decode = _incremental_decoder()
+        pending = decode(b'')
+        last_flush, dirty = time.time(), False
         try:
             with keyboard_input(stdin):
                 while True:
-                    # No need to set any timeout for select.select
-                    # Wait until a key press or an event on in_pipe.
-                    rlist, _, _ = select.select(istreams, [], [])
+                    # Wait until a key press or an event on in_fd, or
+                    # until the next flush is due.
+                    timeout = None
+                    if dirty:
+                        timeout = max(
+                            0, last_flush + flush_interval - time.time())
+                    rlist, _, _ = select.select(istreams, [], [], timeout)
 
                     # Allow user to toggle echo with 'v' key.
                     # Currently ignores other chars.
@@ -440,36 +558,58 @@ class log_output(object):
                             echo = not echo
 
                     # Handle output from the with block process.
-                    if in_pipe in rlist:
-                        # If we arrive here it means that in_pipe was
-                        # ready for reading : it should never happen that
-                        # line is false-ish
-                        line = in_pipe.readline()
-                        if not line:
-                            break  # EOF
-
-                        # find control characters and strip them.
-                        controls = control.findall(line)
-                        line = re.sub(control, '', line)
-
-                        # Echo to stdout if requested or forced
-                        if echo or force_echo:
-                            sys.stdout.write(line)
-                            sys.stdout.flush()
-
-                        # Stripped output to log file.
-                        log_file.write(_strip(line))
-                        log_file.flush()
-
-                        if xon in controls:
-                            force_echo = True
-                        if xoff in controls:
-                            force_echo = False
+                    eof = False
+                    if in_fd in rlist:
+                        data = os.read(in_fd, read_chunk_size)
+                        eof = not data
+                        pending += decode(data, eof)
+
+                        # process complete lines, unless the pipe was
+                        # closed or a single line fills a whole chunk
+                        end = pending.rfind(_newline) + 1
+                        if eof or (not end and
+                                   len(pending) >= read_chunk_size):
+                            end = len(pending)
+
+                        if end:
+                            text, pending = pending[:end], pending[end:]
+                            segments, force_echo = _split_controls(
+                                text, force_echo)
+
+                            # Echo to stdout if requested or forced
+                            echoed = [t for t, forced in segments
+                                      if echo or forced]
+                            if echoed:
+                                sys.stdout.write(text[:0].join(echoed))
+
+                            # Stripped output to log file.
+                            text = _strip(
+                                text[:0].join(t for t, _ in segments))
+                            if compressed:
+                                compressed.write(_encode(text))
+                                tail.append(text)
+                            else:
+                                log_file.write(text)
+                            dirty = True
+
+                    if dirty and (eof or time.time() >= last_flush +
+                                  flush_interval):
+                        sys.stdout.flush()
+                        (compressed or log_file).flush()
+                        last_flush, dirty = time.time(), False
+
+                    if eof:
+                        break
         except BaseException:
             tty.error("Exception occurred in writer daemon!")
             traceback.print_exc()
 
         finally:
+            # keep the end of the log uncompressed, for error reporting
+            if compressed:
+                compressed.close()
+                log_file.write(tail.getvalue())
+
             # send written data back to parent if we used a StringIO
             if self.write_log_in_parent:
                 self.child.send(log_file.getvalue())
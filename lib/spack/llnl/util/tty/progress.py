@@ -0,0 +1,73 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Progress bar for long-running operations on a terminal."""
+from __future__ import unicode_literals
+
+import sys
+import time
+
+import llnl.util.tty as tty
+
+
+class ProgressBar(object):
+    """Context manager that draws a progress bar on a terminal.
+
+    Use it like this::
+
+        with ProgressBar(len(items), 'Reading') as progress:
+            for item in items:
+                # ... do something with item ...
+                progress.update()
+
+    The bar is redrawn at most every ``interval`` seconds, and it is
+    erased when the block exits.  Nothing is drawn if the stream is not a
+    TTY or if messages are disabled.
+    """
+
+    def __init__(self, total, label='', stream=None, interval=0.1):
+        self.total = total
+        self.label = label
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.count = 0
+
+        self._last_draw = 0
+        self._width = 0
+        try:
+            self.enabled = self.stream.isatty() and tty.msg_enabled()
+        except Exception:
+            self.enabled = False
+
+    def update(self, count=1):
+        """Record ``count`` more completed items and redraw if needed."""
+        self.count += count
+        if not self.enabled:
+            return
+
+        now = time.time()
+        if now - self._last_draw >= self.interval or self.count >= self.total:
+            self._last_draw = now
+            self._draw()
+
+    def _draw(self):
+        rows, cols = tty.terminal_size()
+        counter = ' %d/%d' % (self.count, self.total)
+        width = max(10, min(cols, 80) - len(self.label) - len(counter) - 4)
+        done = width * self.count // max(self.total, 1)
+
+        line = '%s [%s%s]%s' % (
+            self.label, '#' * done, ' ' * (width - done), counter)
+        self._width = len(line)
+        self.stream.write('\r' + line)
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.enabled and self._width:
+            self.stream.write('\r' + ' ' * self._width + '\r')
+            self.stream.flush()
@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import multiprocessing.pool
 import os
 import re
 import tarfile
@@ -17,11 +18,14 @@ from six.moves.urllib.error import URLError
 
 import llnl.util.tty as tty
 from llnl.util.filesystem import mkdirp, install_tree
+from llnl.util.lang import memoized
 
 import spack.cmd
 import spack.fetch_strategy as fs
 import spack.util.gpg as gpg_util
+import spack.util.timeline
 import spack.relocate as relocate
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 from spack.spec import Spec
 from spack.stage import Stage
@@ -32,6 +36,12 @@ from spack.util.executable import ProcessError
 
 _build_cache_relative_path = 'build_cache'
 
+#: Index of the full hashes of the specs in a build cache directory
+_index_json_name = 'index.json'
+
+#: Default number of spec.yaml files read at once from mirrors
+_check_jobs = 16
+
 
 class NoOverwriteException(Exception):
     """
@@ -90,6 +100,7 @@ class NewLayoutException(spack.error.SpackError):
     pass
 
 
+@memoized
 def has_gnupg2():
     try:
         gpg_util.Gpg.gpg()('--version', output=os.devnull)
@@ -266,6 +277,19 @@ def _generate_html_index(path_list, output_path):
     f.close()
 
 
+def _generate_json_index(path_list, output_path):
+    full_hashes = {}
+    for path in path_list:
+        if path.endswith('.spec.yaml'):
+            with open(path) as f:
+                full_hash = _spec_yaml_full_hash(f.read())
+            if full_hash:
+                full_hashes[os.path.basename(path)] = full_hash
+
+    with open(output_path, 'w') as f:
+        sjson.dump({'full_hashes': full_hashes}, f)
+
+
 def generate_package_index(build_cache_dir):
     yaml_list = os.listdir(build_cache_dir)
     path_list = [os.path.join(build_cache_dir, l) for l in yaml_list]
@@ -276,6 +300,14 @@ def generate_package_index(build_cache_dir):
     _generate_html_index(path_list, index_html_path_tmp)
     shutil.move(index_html_path_tmp, index_html_path)
 
+    # index.json has the full hash of each spec.yaml, so that specs can be
+    # checked against the mirror without reading each spec.yaml
+    index_json_path_tmp = os.path.join(build_cache_dir, 'index.json.tmp')
+    index_json_path = os.path.join(build_cache_dir, _index_json_name)
+
+    _generate_json_index(path_list, index_json_path_tmp)
+    shutil.move(index_json_path_tmp, index_json_path)
+
 
 def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
                   allow_root=False, key=None, regenerate_index=False):
@@ -454,6 +486,7 @@ def make_package_placeholder(workdir, prefix, allow_root):
     relocate.make_link_placeholder(cur_path_names, workdir, prefix)
 
 
+@spack.util.timeline.timed('relocate', 'buildcache')
 def relocate_package(workdir, allow_root):
     """
     Relocate the given package
@@ -493,6 +526,7 @@ def relocate_package(workdir, allow_root):
         relocate.relocate_links(path_names, old_path, new_path)
 
 
+@spack.util.timeline.timed('extract tarball', 'buildcache')
 def extract_tarball(spec, filename, allow_root=False, unsigned=False,
                     force=False):
     """
@@ -515,19 +549,28 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
 
     with closing(tarfile.open(spackfile_path, 'r')) as tar:
         tar.extractall(tmpdir)
+    verification = None
     if not unsigned:
         if os.path.exists('%s.asc' % specfile_path):
-            try:
-                Gpg.verify('%s.asc' % specfile_path, specfile_path)
-            except Exception as e:
-                shutil.rmtree(tmpdir)
-                tty.die(str(e))
+            # The tarball is checked and extracted in tmpdir while gpg
+            # runs.  Nothing is installed before the signature is verified.
+            verification = Gpg.start_verify(
+                '%s.asc' % specfile_path, specfile_path)
         else:
             shutil.rmtree(tmpdir)
             raise NoVerifyException(
                 "Package spec file failed signature verification.\n"
                 "Use spack buildcache keys to download "
                 "and install a key for verification from the mirror.")
+
+    def wait_for_verification():
+        if verification is not None:
+            try:
+                verification.wait()
+            except Exception as e:
+                shutil.rmtree(tmpdir)
+                tty.die(str(e))
+
     # get the sha256 checksum of the tarball
     checksum = checksum_tarball(tarfile_path)
 
@@ -540,6 +583,7 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
 
     # if the checksums don't match don't install
     if bchecksum['hash'] != checksum:
+        wait_for_verification()
         shutil.rmtree(tmpdir)
         raise NoChecksumException(
             "Package tarball failed checksum verification.\n"
@@ -553,6 +597,7 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
     # if the original relative prefix and new relative prefix differ the
     # directory layout has changed and the  buildcache cannot be installed
     if old_relative_prefix != new_relative_prefix:
+        wait_for_verification()
         shutil.rmtree(tmpdir)
         msg = "Package tarball was created from an install "
         msg += "prefix with a different directory layout.\n"
@@ -568,6 +613,7 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
     workdir = os.path.join(tmpdir, os.path.basename(spec.prefix))
 
     # cleanup
+    wait_for_verification()
     os.remove(tarfile_path)
     os.remove(specfile_path)
 
@@ -670,77 +716,97 @@ def get_keys(install=False, trust=False, force=False):
             for link in links:
                 if re.search(r'\.key', link):
                     keys.add(link)
-        for link in keys:
-            with Stage(link, name="build_cache", keep=True) as stage:
-                if os.path.exists(stage.save_filename) and force:
-                    os.remove(stage.save_filename)
-                if not os.path.exists(stage.save_filename):
-                    try:
-                        stage.fetch()
-                    except fs.FetchError:
-                        continue
-            tty.msg('Found key %s' % link)
-            if install:
-                if trust:
-                    Gpg.trust(stage.save_filename)
-                    tty.msg('Added this key to trusted keys.')
-                else:
-                    tty.msg('Will not add this key to trusted keys.'
-                            'Use -t to install all downloaded keys')
+    keyfiles = []
+    for link in keys:
+        with Stage(link, name="build_cache", keep=True) as stage:
+            if os.path.exists(stage.save_filename) and force:
+                os.remove(stage.save_filename)
+            if not os.path.exists(stage.save_filename):
+                try:
+                    stage.fetch()
+                except fs.FetchError:
+                    continue
+        tty.msg('Found key %s' % link)
+        if install:
+            if trust:
+                keyfiles.append(stage.save_filename)
+            else:
+                tty.msg('Will not add this key to trusted keys.'
+                        'Use -t to install all downloaded keys')
 
+    # import all the keys with a single gpg process
+    if keyfiles:
+        Gpg.trust(*keyfiles)
+        tty.msg('Added %d keys to trusted keys.' % len(keyfiles))
 
-def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
-    if not spec.concrete:
-        raise ValueError('spec must be concrete to check against mirror')
 
-    pkg_name = spec.name
-    pkg_version = spec.version
+#: Matches the top-level full_hash written into spec.yaml by build_tarball()
+_full_hash_line = re.compile(r'^full_hash: *(\S+) *$', re.MULTILINE)
 
-    pkg_hash = spec.dag_hash()
-    pkg_full_hash = spec.full_hash()
 
-    tty.debug('Checking {0}-{1}, dag_hash = {2}, full_hash = {3}'.format(
-        pkg_name, pkg_version, pkg_hash, pkg_full_hash))
-    tty.debug(spec.tree())
+def _spec_yaml_full_hash(contents):
+    """Return the full hash in the text of a buildcache spec.yaml, or
+    None if it has none.
 
-    # Try to retrieve the .spec.yaml directly, based on the known
-    # format of the name, in order to determine if the package
-    # needs to be rebuilt.
-    build_cache_dir = build_cache_directory(mirror_url)
-    spec_yaml_file_name = tarball_name(spec, '.spec.yaml')
-    file_path = os.path.join(build_cache_dir, spec_yaml_file_name)
+    The full hash of the root is a top-level key, while the hashes of
+    the nodes are indented, so it is usually found without parsing the
+    whole DAG.
+    """
+    match = _full_hash_line.search(contents)
+    if match:
+        return match.group(1)
+    return syaml.load(contents).get('full_hash')
 
-    result_of_error = 'Package ({0}) will {1}be rebuilt'.format(
-        spec.short_spec, '' if rebuild_on_errors else 'not ')
 
+def _spec_yaml_url(spec, mirror_url):
+    return os.path.join(build_cache_directory(mirror_url),
+                        tarball_name(spec, '.spec.yaml'))
+
+
+def _read_spec_yaml(url):
+    """Return the contents of the spec.yaml at ``url``, or the URLError
+    raised while reading it."""
     try:
-        yaml_contents = read_from_url(file_path)
+        return read_from_url(url)
     except URLError as url_err:
-        err_msg = [
-            'Unable to determine whether {0} needs rebuilding,',
-            ' caught URLError attempting to read from {1}.',
-        ]
-        tty.error(''.join(err_msg).format(spec.short_spec, file_path))
-        tty.debug(url_err)
-        tty.warn(result_of_error)
-        return rebuild_on_errors
+        return url_err
 
-    if not yaml_contents:
-        tty.error('Reading {0} returned nothing'.format(file_path))
-        tty.warn(result_of_error)
-        return rebuild_on_errors
 
-    spec_yaml = syaml.load(yaml_contents)
+def _read_spec_yamls(urls, jobs=None):
+    """Read the spec.yaml files at ``urls`` with up to ``jobs`` (default:
+    ``_check_jobs``) concurrent requests, see ``_read_spec_yaml()``."""
+    jobs = min(jobs or _check_jobs, len(urls))
+    if jobs <= 1:
+        return [_read_spec_yaml(url) for url in urls]
+
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        return pool.map(_read_spec_yaml, urls)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _read_json_index(mirror_url):
+    """Return the full hashes of the spec.yaml files in the index.json of
+    a mirror, by file name, or an empty dict if it has no usable index."""
+    url = os.path.join(build_cache_directory(mirror_url), _index_json_name)
+    try:
+        return sjson.load(read_from_url(url))['full_hashes']
+    except (IOError, ValueError, KeyError, TypeError) as e:
+        tty.debug('Cannot use index {0}: {1}'.format(url, e))
+        return {}
+
 
+def _full_hash_differs(spec, full_hash, remote_full_hash):
     # If either the full_hash didn't exist in the .spec.yaml file, or it
     # did, but didn't match the one we computed locally, then we should
     # just rebuild.  This can be simplified once the dag_hash and the
     # full_hash become the same thing.
-    if ('full_hash' not in spec_yaml or
-            spec_yaml['full_hash'] != pkg_full_hash):
-        if 'full_hash' in spec_yaml:
+    if remote_full_hash != full_hash:
+        if remote_full_hash:
             reason = 'hash mismatch, remote = {0}, local = {1}'.format(
-                spec_yaml['full_hash'], pkg_full_hash)
+                remote_full_hash, full_hash)
         else:
             reason = 'full_hash was missing from remote spec.yaml'
         tty.msg('Rebuilding {0}, reason: {1}'.format(
@@ -751,13 +817,60 @@ def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
     return False
 
 
+def _needs_rebuild(spec, full_hash, file_path, yaml_contents,
+                   rebuild_on_errors):
+    """Whether ``spec`` needs rebuilding, given what ``_read_spec_yaml()``
+    returned for its spec.yaml at ``file_path``."""
+    tty.debug('Checking {0}-{1}, dag_hash = {2}, full_hash = {3}'.format(
+        spec.name, spec.version, spec.dag_hash(), full_hash))
+    if tty.is_debug():
+        tty.debug(spec.tree())
+
+    result_of_error = 'Package ({0}) will {1}be rebuilt'.format(
+        spec.short_spec, '' if rebuild_on_errors else 'not ')
+
+    if isinstance(yaml_contents, URLError):
+        err_msg = [
+            'Unable to determine whether {0} needs rebuilding,',
+            ' caught URLError attempting to read from {1}.',
+        ]
+        tty.error(''.join(err_msg).format(spec.short_spec, file_path))
+        tty.debug(yaml_contents)
+        tty.warn(result_of_error)
+        return rebuild_on_errors
+
+    if not yaml_contents:
+        tty.error('Reading {0} returned nothing'.format(file_path))
+        tty.warn(result_of_error)
+        return rebuild_on_errors
+
+    return _full_hash_differs(
+        spec, full_hash, _spec_yaml_full_hash(yaml_contents))
+
+
+def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
+    if not spec.concrete:
+        raise ValueError('spec must be concrete to check against mirror')
+
+    # Try to retrieve the .spec.yaml directly, based on the known
+    # format of the name, in order to determine if the package
+    # needs to be rebuilt.
+    file_path = _spec_yaml_url(spec, mirror_url)
+    return _needs_rebuild(spec, spec.full_hash(), file_path,
+                          _read_spec_yaml(file_path), rebuild_on_errors)
+
+
 def check_specs_against_mirrors(mirrors, specs, output_file=None,
-                                rebuild_on_errors=False):
+                                rebuild_on_errors=False, jobs=None):
     """Check all the given specs against buildcaches on the given mirrors and
     determine if any of the specs need to be rebuilt.  Reasons for needing to
     rebuild include binary cache for spec isn't present on a mirror, or it is
     present but the full_hash has changed since last time spec was built.
 
+    Specs are checked against the index.json of each mirror when it has
+    one.  The .spec.yaml files of the other specs are read concurrently,
+    from all the mirrors at once.
+
     Arguments:
         mirrors (dict): Mirrors to check against
         specs (iterable): Specs to check against mirrors
@@ -766,18 +879,43 @@ def check_specs_against_mirrors(mirrors, specs, output_file=None,
             JSON object and written to this file.
         rebuild_on_errors (boolean): Treat any errors encountered while
             checking specs as a signal to rebuild package.
+        jobs (int): Number of .spec.yaml files read at once (default: 16)
 
     Returns: 1 if any spec was out-of-date on any mirror, 0 otherwise.
 
     """
+    specs = list(specs)
+    full_hashes = [spec.full_hash() for spec in specs]
+    spec_yaml_names = [tarball_name(spec, '.spec.yaml') for spec in specs]
+
+    # Full hashes found in the index of each mirror, and the spec.yaml
+    # files to read for the specs that are not in an index
+    indices = {}
+    urls = []
+    for mirror_url in mirrors.values():
+        indices[mirror_url] = _read_json_index(mirror_url)
+        urls.extend(
+            os.path.join(build_cache_directory(mirror_url), name)
+            for name in spec_yaml_names if name not in indices[mirror_url])
+    contents = dict(zip(urls, _read_spec_yamls(urls, jobs)))
+
     rebuilds = {}
     for mirror_name, mirror_url in mirrors.items():
         tty.msg('Checking for built specs at %s' % mirror_url)
 
         rebuild_list = []
 
-        for spec in specs:
-            if needs_rebuild(spec, mirror_url, rebuild_on_errors):
+        index = indices[mirror_url]
+        for spec, full_hash, name in zip(specs, full_hashes, spec_yaml_names):
+            if name in index:
+                rebuild = _full_hash_differs(spec, full_hash, index[name])
+            else:
+                file_path = os.path.join(
+                    build_cache_directory(mirror_url), name)
+                rebuild = _needs_rebuild(spec, full_hash, file_path,
+                                         contents[file_path],
+                                         rebuild_on_errors)
+            if rebuild:
                 rebuild_list.append({
                     'short_spec': spec.short_spec,
                     'hash': spec.dag_hash()
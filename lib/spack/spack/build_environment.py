@@ -49,10 +49,12 @@ from llnl.util.lang import dedupe
 
 import spack.build_systems.cmake
 import spack.build_systems.meson
+import spack.compile_cache
 import spack.config
 import spack.main
 import spack.paths
 import spack.store
+import spack.util.timeline
 from spack.util.string import plural
 from spack.util.environment import (
     env_flag, filter_system_paths, get_path, is_system_path,
@@ -87,7 +89,14 @@ SPACK_SHORT_SPEC = 'SPACK_SHORT_SPEC'
 SPACK_DEBUG_LOG_ID = 'SPACK_DEBUG_LOG_ID'
 SPACK_DEBUG_LOG_DIR = 'SPACK_DEBUG_LOG_DIR'
 SPACK_CCACHE_BINARY = 'SPACK_CCACHE_BINARY'
+SPACK_COMPILE_CACHE_DIR = 'SPACK_COMPILE_CACHE_DIR'
+SPACK_COMPILE_CACHE_ID = 'SPACK_COMPILE_CACHE_ID'
+SPACK_COMPILE_CACHE_SED = 'SPACK_COMPILE_CACHE_SED'
 SPACK_SYSTEM_DIRS = 'SPACK_SYSTEM_DIRS'
+SPACK_WRAPPER_ARGS_KEY = 'SPACK_WRAPPER_ARGS_KEY'
+
+#: Languages of the compiler wrapper, as in its SPACK_<LANG>_RPATH_ARG
+wrapper_languages = ('CC', 'CXX', 'F77', 'FC')
 
 
 # Platform-specific library suffix.
@@ -348,6 +357,15 @@ def set_build_environment_variables(pkg, env, dirty):
         extra_rpaths = ':'.join(compiler.extra_rpaths)
         env.set('SPACK_COMPILER_EXTRA_RPATHS', extra_rpaths)
 
+    rpath_args = dict(
+        (lang, getattr(compiler, '%s_rpath_arg' % lang.lower()))
+        for lang in wrapper_languages)
+    wrapper_args = wrapper_arguments(
+        include_dirs, link_dirs, rpath_dirs, compiler.extra_rpaths or [],
+        rpath_args)
+    for name, value in iteritems(wrapper_args):
+        env.set(name, value)
+
     # Add bin directories from dependencies to the PATH for the build.
     for prefix in build_prefixes:
         for dirname in ['bin', 'bin64']:
@@ -392,6 +410,15 @@ def set_build_environment_variables(pkg, env, dirty):
             raise RuntimeError("No ccache binary found in PATH")
         env.set(SPACK_CCACHE_BINARY, ccache)
 
+    # Hand the shared cache of object files to the compiler wrapper
+    if spack.compile_cache.enabled():
+        compile_cache = spack.compile_cache
+        env.set(SPACK_COMPILE_CACHE_DIR, compile_cache.root())
+        env.set(SPACK_COMPILE_CACHE_ID, compile_cache.compiler_identity(
+            pkg.compiler, pkg.spec.architecture))
+        env.set(SPACK_COMPILE_CACHE_SED, compile_cache.canonicalize_script(
+            compile_cache.canonical_paths(pkg)))
+
     # Add any pkgconfig directories to PKG_CONFIG_PATH
     for prefix in build_link_prefixes:
         for directory in ('lib', 'lib64', 'share'):
@@ -402,6 +429,46 @@ def set_build_environment_variables(pkg, env, dirty):
     return env
 
 
+def wrapper_arguments(include_dirs, link_dirs, rpath_dirs, extra_rpaths,
+                      rpath_args):
+    """Compute the search path arguments that the compiler wrapper adds
+    to every command line, so that it doesn't have to on each call.
+
+    The wrapper only uses them if the variables they are computed from
+    still have the same value when it runs, which it checks against
+    ``SPACK_WRAPPER_ARGS_KEY``.
+
+    Args:
+        include_dirs (list): value of ``SPACK_INCLUDE_DIRS``
+        link_dirs (list): value of ``SPACK_LINK_DIRS``
+        rpath_dirs (list): value of ``SPACK_RPATH_DIRS``
+        extra_rpaths (list): value of ``SPACK_COMPILER_EXTRA_RPATHS``
+        rpath_args (dict): value of ``SPACK_<LANG>_RPATH_ARG`` for each
+            of the ``wrapper_languages``
+
+    Returns:
+        (dict): environment variables to set for the wrapper, with
+            ``:``-separated lists of arguments
+    """
+    # must match args_key in the wrapper
+    key = [':'.join(dirs) for dirs in
+           (include_dirs, link_dirs, rpath_dirs, extra_rpaths)]
+    key.extend(str(rpath_args[lang]) for lang in wrapper_languages)
+
+    link_dirs = list(link_dirs) + list(extra_rpaths)
+    rpath_dirs = list(rpath_dirs) + list(extra_rpaths)
+    env = {
+        SPACK_WRAPPER_ARGS_KEY: '|'.join(key),
+        'SPACK_INCLUDE_ARGS': ':'.join('-I' + d for d in include_dirs),
+        'SPACK_LINK_ARGS': ':'.join('-L' + d for d in link_dirs),
+        'SPACK_LD_RPATH_ARGS': ':'.join('-rpath:' + d for d in rpath_dirs),
+    }
+    for lang in wrapper_languages:
+        env['SPACK_%s_RPATH_ARGS' % lang] = ':'.join(
+            str(rpath_args[lang]) + d for d in rpath_dirs)
+    return env
+
+
 def _set_variables_for_single_module(pkg, module):
     """Helper function to set module variables for single module."""
 
@@ -759,9 +826,14 @@ def fork(pkg, function, dirty, fake):
         if input_stream is not None:
             sys.stdin = input_stream
 
+        # Events of the parent's timeline are still recorded there
+        spack.util.timeline.take_events()
+        spack.util.timeline.name_process('build {0}'.format(pkg.name))
+
         try:
             if not fake:
-                setup_package(pkg, dirty=dirty)
+                with spack.util.timeline.span('setup build environment'):
+                    setup_package(pkg, dirty=dirty)
             return_value = function()
             child_pipe.send(return_value)
         except StopIteration as e:
@@ -796,6 +868,7 @@ def fork(pkg, function, dirty, fake):
             child_pipe.send(ce)
 
         finally:
+            child_pipe.send(spack.util.timeline.take_events())
             child_pipe.close()
 
     parent_pipe, child_pipe = multiprocessing.Pipe()
@@ -819,6 +892,10 @@ def fork(pkg, function, dirty, fake):
             input_stream.close()
 
     child_result = parent_pipe.recv()
+    try:
+        spack.util.timeline.add_events(parent_pipe.recv())
+    except EOFError:
+        pass
     p.join()
 
     # let the caller know which package went wrong.
@@ -19,8 +19,10 @@ from spack.util.path import canonicalize_path
 def _misc_cache():
     """The ``misc_cache`` is Spack's cache for small data.
 
-    Currently the ``misc_cache`` stores indexes for virtual dependency
-    providers and for which packages provide which tags.
+    Currently the ``misc_cache`` stores indexes of package metadata
+    (e.g. virtual dependency providers, tags), the environment
+    modifications made by sourcing files and the versions of detected
+    compilers.
     """
     path = spack.config.get('config:misc_cache')
     if not path:
@@ -145,6 +145,11 @@ def setup_parser(subparser):
         help="Default to rebuilding packages if errors are encountered " +
              "during the process of checking whether rebuilding is needed")
 
+    check.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of spec.yaml files read from mirrors at once '
+             '(default: 16)')
+
     check.set_defaults(func=check_binaries)
 
     # Download tarball and spec.yaml
@@ -439,7 +444,8 @@ def check_binaries(args):
         sys.exit(0)
 
     sys.exit(bindist.check_specs_against_mirrors(
-        configured_mirrors, specs, args.output_file, args.rebuild_on_error))
+        configured_mirrors, specs, args.output_file, args.rebuild_on_error,
+        args.jobs))
 
 
 def get_tarball(args):
@@ -14,6 +14,7 @@ import spack.cmd
 import spack.repo
 import spack.stage
 from spack.paths import lib_path, var_path
+from spack.util.string import parse_size
 
 
 description = "remove temporary build files and/or downloaded archives"
@@ -21,6 +22,24 @@ section = "build"
 level = "long"
 
 
+def size(string):
+    """Parse a size in bytes, with an optional K, M, G or T suffix"""
+    try:
+        return parse_size(string)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _format_size(nbytes):
+    for unit in ('', 'K', 'M', 'G'):
+        if nbytes < 1024:
+            break
+        nbytes /= 1024.0
+    else:
+        unit = 'T'
+    return '%.1f%sB' % (nbytes, unit) if unit else '%dB' % nbytes
+
+
 class AllClean(argparse.Action):
     """Activates flags -s -d -m and -p simultaneously"""
     def __call__(self, parser, namespace, values, option_string=None):
@@ -32,8 +51,15 @@ def setup_parser(subparser):
         '-s', '--stage', action='store_true',
         help="remove all temporary build stages (default)")
     subparser.add_argument(
-        '-d', '--downloads', action='store_true',
+        '-d', '--downloads', '--fetch-cache', action='store_true',
         help="remove cached downloads")
+    subparser.add_argument(
+        '--max-size', type=size, default=None, metavar='SIZE',
+        help="with -d, only remove the least recently used downloads "
+             "until the cache holds at most SIZE (e.g. 20G)")
+    subparser.add_argument(
+        '--max-age', type=float, default=None, metavar='DAYS',
+        help="with -d, only remove the downloads not used in DAYS days")
     subparser.add_argument(
         '-m', '--misc-cache', action='store_true',
         help="remove long-lived caches, like the virtual package index")
@@ -51,6 +77,10 @@ def setup_parser(subparser):
 
 
 def clean(parser, args):
+    # Limits on the fetch cache are only meaningful when cleaning it
+    if args.max_size is not None or args.max_age is not None:
+        args.downloads = True
+
     # If nothing was set, activate the default
     if not any([args.specs, args.stage, args.downloads, args.misc_cache,
                 args.python_cache]):
@@ -70,8 +100,16 @@ def clean(parser, args):
         spack.stage.purge()
 
     if args.downloads:
-        tty.msg('Removing cached downloads')
-        spack.caches.fetch_cache.destroy()
+        if args.max_size is None and args.max_age is None:
+            tty.msg('Removing cached downloads')
+            spack.caches.fetch_cache.destroy()
+        else:
+            max_age = None
+            if args.max_age is not None:
+                max_age = args.max_age * 24 * 3600
+            removed = spack.caches.fetch_cache.evict(args.max_size, max_age)
+            tty.msg('Removed %d cached downloads (%s)' % (
+                len(removed), _format_size(sum(s for _, s in removed))))
 
     if args.misc_cache:
         tty.msg('Removing cached information on repositories')
@@ -138,11 +138,14 @@ def gpg_init(args):
     if import_dir is None:
         import_dir = spack.paths.gpg_keys_path
 
+    keyfiles = []
     for root, _, filenames in os.walk(import_dir):
         for filename in filenames:
             if not filename.endswith('.key'):
                 continue
-            Gpg.trust(os.path.join(root, filename))
+            keyfiles.append(os.path.join(root, filename))
+    if keyfiles:
+        Gpg.trust(*keyfiles)
 
 
 def gpg_untrust(args):
@@ -13,7 +13,6 @@ from llnl.util.tty.colify import colify
 
 import spack.repo
 import spack.spec
-import spack.fetch_strategy as fs
 
 
 description = 'get detailed information on a particular package'
@@ -127,7 +126,11 @@ class VariantFormatter(object):
 
 
 def print_text_info(pkg):
-    """Print out a plain text description of a package."""
+    """Print out a plain text description of a package.
+
+    Args:
+        pkg (PackageMetadata): metadata of the package, from the index
+    """
 
     header = section_title(
         '{0}:   '
@@ -136,7 +139,7 @@ def print_text_info(pkg):
 
     color.cprint('')
     color.cprint(section_title('Description:'))
-    if pkg.__doc__:
+    if pkg.description:
         color.cprint(color.cescape(pkg.format_doc(indent=4)))
     else:
         color.cprint("    None")
@@ -150,7 +153,7 @@ def print_text_info(pkg):
 
     color.cprint('')
     color.cprint(section_title("Tags: "))
-    if hasattr(pkg, 'tags'):
+    if pkg.tags:
         tags = sorted(pkg.tags)
         colify(tags, indent=4)
     else:
@@ -175,14 +178,14 @@ def print_text_info(pkg):
                             v)
         preferred = sorted(pkg.versions, key=key_fn).pop()
 
-        f = fs.for_package_version(pkg, preferred)
+        f = pkg.sources[str(preferred)] or ''
         line = version('    {0}'.format(pad(preferred))) + color.cescape(f)
         color.cprint(line)
         color.cprint('')
         color.cprint(section_title('Safe versions:  '))
 
         for v in reversed(sorted(pkg.versions)):
-            f = fs.for_package_version(pkg, v)
+            f = pkg.sources[str(v)] or ''
             line = version('    {0}'.format(pad(v))) + color.cescape(f)
             color.cprint(line)
 
@@ -214,7 +217,9 @@ def print_text_info(pkg):
     if pkg.provided:
         inverse_map = {}
         for spec, whens in pkg.provided.items():
+            spec = spack.spec.Spec(spec)
             for when in whens:
+                when = spack.spec.Spec(when)
                 if when not in inverse_map:
                     inverse_map[when] = set()
                 inverse_map[when].add(spec)
@@ -231,5 +236,5 @@ def print_text_info(pkg):
 
 
 def info(parser, args):
-    pkg = spack.repo.get(args.name)
+    pkg = spack.repo.path.get_metadata(args.name)
     print_text_info(pkg)
@@ -18,6 +18,7 @@ import spack.environment as ev
 import spack.fetch_strategy
 import spack.paths
 import spack.report
+import spack.util.timeline
 from spack.error import SpackError
 
 
@@ -135,6 +136,11 @@ packages. If neither are chosen, don't run tests for any packages."""
         default=None,
         help="filename for the log file. if not passed a default will be used"
     )
+    subparser.add_argument(
+        '--timeline',
+        default=None, metavar='FILE',
+        help="write a timeline of the installation to FILE, in the Trace "
+             "Event Format of chrome://tracing")
     subparser.add_argument(
         '--cdash-upload-url',
         default=None,
@@ -217,6 +223,13 @@ def install_spec(cli_args, kwargs, abstract_spec, spec):
 
 
 def install(parser, args, **kwargs):
+    if args.timeline:
+        with spack.util.timeline.recording(args.timeline):
+            return install_specs(parser, args, **kwargs)
+    return install_specs(parser, args, **kwargs)
+
+
+def install_specs(parser, args, **kwargs):
     if not args.package and not args.specfiles:
         # if there are no args but an active environment or spack.yaml file
         # then install the packages from it.
@@ -81,9 +81,9 @@ def filter_by_name(pkgs, args):
                 if f.match(p):
                     return True
 
-                pkg = spack.repo.get(p)
-                if pkg.__doc__:
-                    return f.match(pkg.__doc__)
+                pkg = spack.repo.path.get_metadata(p)
+                if pkg.description:
+                    return f.match(pkg.description)
                 return False
         else:
             def match(p, f):
@@ -130,7 +130,7 @@ def rows_for_ncols(elts, ncols):
 def rst(pkg_names, out):
     """Print out information on all packages in restructured text."""
 
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    pkgs = [spack.repo.path.get_metadata(name) for name in pkg_names]
 
     out.write('.. _package-list:\n')
     out.write('\n')
@@ -199,7 +199,7 @@ def html(pkg_names, out):
     """
 
     # Read in all packages
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    pkgs = [spack.repo.path.get_metadata(name) for name in pkg_names]
 
     # Start at 2 because the title of the page from Sphinx is id1.
     span_id = 2
@@ -10,5 +10,12 @@ section = "admin"
 level = "long"
 
 
+def setup_parser(subparser):
+    subparser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of processes reading install prefixes '
+             '(default: number of CPUs, up to 16)')
+
+
 def reindex(parser, args):
-    spack.store.store.reindex()
+    spack.store.store.reindex(jobs=args.jobs)
@@ -136,9 +136,8 @@ def url_list(args):
     urls = set()
 
     # Gather set of URLs from all packages
-    for pkg in spack.repo.path.all_packages():
-        url = getattr(pkg.__class__, 'url', None)
-        urls = url_list_parsing(args, urls, url, pkg)
+    for pkg in spack.repo.path.all_package_metadata():
+        urls = url_list_parsing(args, urls, pkg.url, pkg)
 
         for params in pkg.versions.values():
             url = params.get('url', None)
@@ -169,13 +168,13 @@ def url_summary(args):
 
     tty.msg('Generating a summary of URL parsing in Spack...')
 
-    # Loop through all packages
-    for pkg in spack.repo.path.all_packages():
+    # Loop through all packages, using the metadata index so that package
+    # files don't need to be imported
+    for pkg in spack.repo.path.all_package_metadata():
         urls = set()
 
-        url = getattr(pkg.__class__, 'url', None)
-        if url:
-            urls.add(url)
+        if pkg.url:
+            urls.add(pkg.url)
 
         for params in pkg.versions.values():
             url = params.get('url', None)
@@ -335,7 +334,7 @@ def url_list_parsing(args, urls, url, pkg):
         urls (set): List of URLs that have already been added
         url (str or None): A URL to potentially add to ``urls`` depending on
             ``args``
-        pkg (spack.package.PackageBase): The Spack package
+        pkg (spack.metadata_index.PackageMetadata): The Spack package
 
     Returns:
         set: The updated set of ``urls``
@@ -383,7 +382,7 @@ def name_parsed_correctly(pkg, name):
     """Determine if the name of a package was correctly parsed.
 
     Args:
-        pkg (spack.package.PackageBase): The Spack package
+        pkg (spack.metadata_index.PackageMetadata): The Spack package
         name (str): The name that was extracted from the URL
 
     Returns:
@@ -413,7 +412,7 @@ def version_parsed_correctly(pkg, version):
     """Determine if the version of a package was correctly parsed.
 
     Args:
-        pkg (spack.package.PackageBase): The Spack package
+        pkg (spack.metadata_index.PackageMetadata): The Spack package
         version (str): The version that was extracted from the URL
 
     Returns:
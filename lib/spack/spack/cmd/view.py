@@ -23,6 +23,8 @@ The `view` can be built and tore down via a number of methods (the "actions"):
 
 - hardlink :: like the symlink view but hardlinks are used.
 
+- copy :: like the symlink view but files are copied.
+
 - statlink :: a view producing a status report of a symlink or
   hardlink view.
 
@@ -36,7 +38,7 @@ YamlFilesystemView.
 import os
 
 import llnl.util.tty as tty
-from llnl.util.link_tree import MergeConflictError
+from llnl.util.link_tree import MergeConflictError, copy_file
 from llnl.util.tty.color import colorize
 
 import spack.environment as ev
@@ -51,7 +53,7 @@ description = "project packages to a compact naming scheme on the filesystem."
 section = "environments"
 level = "short"
 
-actions_link = ["symlink", "add", "soft", "hardlink", "hard"]
+actions_link = ["symlink", "add", "soft", "hardlink", "hard", "copy"]
 actions_remove = ["remove", "rm"]
 actions_status = ["statlink", "status", "check"]
 
@@ -112,6 +114,9 @@ def setup_parser(sp):
         "hardlink": ssp.add_parser(
             'hardlink', aliases=['hard'],
             help='add packages files to a filesystem via via hard links'),
+        "copy": ssp.add_parser(
+            'copy',
+            help='add package files to a filesystem view via copy'),
         "remove": ssp.add_parser(
             'remove', aliases=['rm'],
             help='remove packages from a filesystem view'),
@@ -125,7 +130,7 @@ def setup_parser(sp):
         act.add_argument('path', nargs=1,
                          help="path to file system view directory")
 
-        if cmd in ("symlink", "hardlink"):
+        if cmd in ("symlink", "hardlink", "copy"):
             # invalid for remove/statlink, for those commands the view needs to
             # already know its own projections.
             help_msg = "Initialize view using projections from file."
@@ -157,7 +162,7 @@ def setup_parser(sp):
             so["nargs"] = "+"
             act.add_argument('specs', **so)
 
-    for cmd in ["symlink", "hardlink"]:
+    for cmd in ["symlink", "hardlink", "copy"]:
         act = file_system_view_actions[cmd]
         act.add_argument("-i", "--ignore-conflicts", action='store_true')
 
@@ -179,11 +184,18 @@ def view(parser, args):
     else:
         ordered_projections = {}
 
+    if args.action in ["hardlink", "hard"]:
+        link = os.link
+    elif args.action == "copy":
+        link = copy_file
+    else:
+        link = os.symlink
+
     view = YamlFilesystemView(
         path, spack.store.layout,
         projections=ordered_projections,
         ignore_conflicts=getattr(args, "ignore_conflicts", False),
-        link=os.link if args.action in ["hardlink", "hard"] else os.symlink,
+        link=link,
         verbose=args.verbose)
 
     # Process common args and specs
@@ -0,0 +1,151 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Shared cache of object files compiled by Spack's compiler wrapper.
+
+When ``config:compile_cache`` is set, ``lib/spack/env/cc`` keys each
+compile of one C or C++ source into an object file on:
+
+  * the identity of the compiler, from ``compiler_identity()``;
+  * the compiler command line; and
+  * the preprocessed source,
+
+where the stage directory and the install prefixes of the package and
+its dependencies are replaced by placeholders in the command line and
+in the line markers of the preprocessed source.  A package rebuilt for
+a new hash, e.g. because a dependency changed, then reuses the objects
+of sources whose preprocessed text did not change.
+
+Objects live in a directory shared by all builds, and the least recently
+used ones are removed after each install so that the cache stays under
+``config:compile_cache_size``.
+"""
+import os
+import re
+
+import spack.config
+import spack.paths
+from spack.util.path import canonicalize_path
+from spack.util.string import parse_size
+
+#: Default bound on the size of the cache
+default_size = '5G'
+
+
+def enabled():
+    return bool(spack.config.get('config:compile_cache', False))
+
+
+def root():
+    """Directory of the cached object files."""
+    path = spack.config.get('config:compile_cache_dir')
+    if not path:
+        path = os.path.join(spack.paths.user_config_path, 'compile_cache')
+    return canonicalize_path(path)
+
+
+def max_size():
+    """Size in bytes the cache is trimmed to."""
+    size = spack.config.get('config:compile_cache_size', default_size)
+    if isinstance(size, int):
+        return size
+    return parse_size(size)
+
+
+def compiler_identity(compiler, architecture):
+    """String identifying the compilers a package is built with.
+
+    Compilers are identified by their spec and by the path, size and
+    modification time of their executables, so that objects are not
+    reused after a compiler is updated in place.
+    """
+    parts = [str(compiler.spec), str(architecture)]
+    for path in (compiler.cc, compiler.cxx):
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            parts.append('%s %d %d' % (path, st.st_size, int(st.st_mtime)))
+    return '|'.join(parts)
+
+
+def canonical_paths(pkg):
+    """Paths of a build that are replaced by placeholders in cache keys.
+
+    Returns:
+        (list): ``(path, placeholder)`` pairs for the stage directory, the
+            prefix of ``pkg`` and the prefixes of its dependencies
+    """
+    paths = [(pkg.stage.path, 'stage'),
+             (os.path.realpath(pkg.stage.path), 'stage'),
+             (pkg.prefix, 'prefix')]
+    for dep in pkg.spec.traverse(root=False):
+        if not dep.external:
+            paths.append((dep.prefix, dep.name))
+    return paths
+
+
+def canonicalize_script(paths):
+    """Return a sed script replacing each of ``paths`` by its placeholder.
+
+    Longer paths are replaced first, so that a path is not replaced by
+    the placeholder of a directory above it.
+
+    Args:
+        paths (list): ``(path, placeholder)`` pairs
+    """
+    script = []
+    for path, name in sorted(set(paths), key=lambda p: (-len(p[0]), p)):
+        escaped = re.sub(r'([][\\.*^$|])', r'\\\1', path.rstrip('/'))
+        script.append('s|%s|@%s@|g;' % (escaped, name))
+    return ''.join(script)
+
+
+def entries(cache_root):
+    """Yield ``(path, size, last use)`` for each object in the cache.
+
+    The size includes the diagnostics saved with the object."""
+    for dirpath, _, filenames in os.walk(cache_root):
+        for filename in filenames:
+            if not filename.endswith('.o'):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed by another process
+            size = st.st_size
+            err = path[:-len('.o')] + '.err'
+            if os.path.exists(err):
+                size += os.path.getsize(err)
+            yield path, size, st.st_mtime
+
+
+def trim(cache_root=None, size=None):
+    """Remove the least recently used objects until the cache holds at
+    most ``size`` bytes.
+
+    Args:
+        cache_root (str): directory of the cache, default is ``root()``
+        size (int): bound on the size of the cache, default is
+            ``max_size()``
+
+    Returns:
+        (list): paths of the removed objects
+    """
+    cache_root = cache_root or root()
+    size = max_size() if size is None else size
+
+    total, removed = 0, []
+    for path, entry_size, _ in sorted(
+            entries(cache_root), key=lambda e: e[2], reverse=True):
+        total += entry_size
+        if total <= size:
+            continue
+        for p in (path, path[:-len('.o')] + '.err'):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        removed.append(path)
+    return removed
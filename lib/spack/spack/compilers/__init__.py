@@ -24,6 +24,7 @@ import spack.spec
 import spack.config
 import spack.architecture
 import spack.util.imp as simp
+import spack.util.spack_json as sjson
 from spack.util.environment import get_path
 from spack.util.naming import mod_to_class
 
@@ -208,10 +209,9 @@ def find_compilers(*path_hints):
         search_paths = getattr(o, 'compiler_search_paths', default_paths)
         arguments.extend(arguments_to_detect_version_fn(o, search_paths))
 
-    # Here we map the function arguments to the corresponding calls
-    tp = multiprocessing.pool.ThreadPool()
-    detected_versions = tp.map(detect_version, arguments)
-    tp.close()
+    # Versions of executables seen before are read from the detection
+    # cache; the others are detected by a pool of threads running them
+    detected_versions = _detect_versions(arguments)
 
     def valid_version(item):
         value, error = item
@@ -569,6 +569,152 @@ def detect_version(detect_version_args):
     return fn(detect_version_args)
 
 
+#: Entry of ``misc_cache`` holding the versions of compilers detected by
+#: previous runs of ``find_compilers()``.
+_detection_cache_file = 'compilers/detected-versions.json'
+
+
+def _executable_stat(path):
+    """Return ``(realpath, [inode, size, mtime])`` for an executable, or
+    ``(None, None)`` if it can't be stat'ed.
+    """
+    try:
+        path = os.path.realpath(path)
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return path, [st.st_ino, st.st_size, st.st_mtime]
+
+
+def _detection_cache_key(args):
+    """Key of a candidate compiler in the detection cache, or None if the
+    result of its detection can't be cached.
+
+    Candidates are identified by compiler, language and by the realpath,
+    inode, size and mtime of the executable, so an executable that is
+    replaced or modified is detected again.
+    """
+    if hasattr(args.id.os, 'detect_version'):
+        # the OS detects versions without running the executable
+        return None
+
+    path, stat = _executable_stat(args.path)
+    if path is None:
+        return None
+    return '{0}:{1}:{2}:{3}'.format(
+        args.id.compiler_name, args.language, path,
+        ':'.join(str(x) for x in stat))
+
+
+def _read_detection_cache():
+    """Return the detection cache: a dict from keys computed by
+    ``_detection_cache_key()`` to entries holding a version or an error.
+    """
+    import spack.caches
+    cache = spack.caches.misc_cache
+    try:
+        if not cache.init_entry(_detection_cache_file):
+            return {}
+        with cache.read_transaction(_detection_cache_file) as f:
+            data = sjson.load(f)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot read compiler detection cache: {0}'.format(e))
+        return {}
+
+    # version detection may change from a version of Spack to another
+    if data.get('spack_version') != spack.spack_version:
+        return {}
+    return data['compilers']
+
+
+def _write_detection_cache(entries):
+    """Add ``entries`` to the detection cache, and drop the entries of
+    executables that were removed or modified.
+    """
+    import spack.caches
+    cache = spack.caches.misc_cache
+    try:
+        cache.init_entry(_detection_cache_file)
+        with cache.write_transaction(_detection_cache_file) as (old, new):
+            data = sjson.load(old) if old else {}
+            if data.get('spack_version') != spack.spack_version:
+                data = {'spack_version': spack.spack_version, 'compilers': {}}
+
+            compilers = data['compilers']
+            compilers.update(entries)
+            for key, entry in list(compilers.items()):
+                if _executable_stat(entry['path']) != (
+                        entry['path'], entry['stat']):
+                    del compilers[key]
+            sjson.dump(data, new)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot write compiler detection cache: {0}'.format(e))
+
+
+def _detect_versions(arguments):
+    """Detect the versions of compilers for a list of DetectVersionArgs.
+
+    Results are cached in ``misc_cache``, so that only compilers that are
+    new, or whose executable changed, are run.  The others are detected
+    by a pool of at most ``config:compiler_detection_threads`` threads.
+
+    Returns:
+        A list of ``(DetectVersionArgs, error)`` tuples, as returned by
+        ``detect_version()``, in the same order as ``arguments``.
+    """
+    cache = _read_detection_cache()
+    keys = [_detection_cache_key(args) for args in arguments]
+
+    # Run each executable at most once, even if it matches several names
+    to_detect = {}
+    for i, (args, key) in enumerate(zip(arguments, keys)):
+        if key is None:
+            to_detect[i] = args
+        elif key not in cache:
+            to_detect.setdefault(key, args)
+
+    results = {}
+    if to_detect:
+        jobs = spack.config.get('config:compiler_detection_threads')
+        tp = multiprocessing.pool.ThreadPool(
+            min(jobs or multiprocessing.cpu_count(), len(to_detect)))
+        try:
+            items = list(to_detect.items())
+            detected = tp.map(detect_version, [args for _, args in items])
+        finally:
+            tp.close()
+        results = dict((key, r) for (key, _), r in zip(items, detected))
+
+    new_entries = {}
+    detected_versions = []
+    for i, (args, key) in enumerate(zip(arguments, keys)):
+        if key is None:
+            detected_versions.append(results[i])
+            continue
+
+        if key in results:
+            value, error = results[key]
+            path, stat = _executable_stat(args.path)
+            cache[key] = new_entries[key] = {
+                'path': path,
+                'stat': stat,
+                'version': value.id.version if value else None,
+                'error': error,
+            }
+
+        entry = cache[key]
+        if entry['version'] is None:
+            detected_versions.append((None, entry['error']))
+        else:
+            compiler_id = args.id._replace(version=entry['version'])
+            detected_versions.append((args._replace(id=compiler_id), None))
+
+    if new_entries:
+        _write_detection_cache(new_entries)
+
+    return detected_versions
+
+
 def make_compiler_list(detected_versions):
     """Process a list of detected versions and turn them into a list of
     compiler specs.
@@ -20,28 +20,41 @@ provides a cache and a sanity checking mechanism for what is in the
 filesystem.
 
 """
+import bisect
 import datetime
+import multiprocessing
 import time
 import os
 import sys
 import socket
 import contextlib
+import uuid
+from ordereddict_backport import OrderedDict
 from six import string_types
 from six import iteritems
 
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:
+    from collections import Mapping, MutableMapping
+
 from ruamel.yaml.error import MarkedYAMLError, YAMLError
 
 import llnl.util.tty as tty
 from llnl.util.filesystem import mkdirp
+from llnl.util.tty.progress import ProgressBar
 
 import spack.store
 import spack.repo
 import spack.spec
+import spack.database_snapshot
+import spack.util.timeline
 import spack.util.spack_yaml as syaml
 import spack.util.spack_json as sjson
 from spack.filesystem_view import YamlFilesystemView
 from spack.util.crypto import bit_length
-from spack.directory_layout import DirectoryLayoutError
+from spack.database_snapshot import DatabaseSnapshot
+from spack.directory_layout import DirectoryLayoutError, SpecReadError
 from spack.error import SpackError
 from spack.version import Version
 from spack.util.lock import Lock, WriteTransaction, ReadTransaction, LockError
@@ -59,6 +72,36 @@ _db_lock_timeout = 120
 # Types of dependencies tracked by the database
 _tracked_deps = ('link', 'run')
 
+#: Below this many prefixes, reindex reads spec files serially.
+min_parallel_reindex = 64
+
+#: Directory layout used by reindex worker processes
+_reindex_layout = None
+
+
+def _default_reindex_jobs():
+    return min(16, multiprocessing.cpu_count())
+
+
+def _init_reindex_worker(layout):
+    global _reindex_layout
+    _reindex_layout = layout
+
+
+def _read_prefix(spec_file):
+    """Read the spec file of a prefix, in a reindex worker.
+
+    Returns a tuple (spec file, spec as JSON text, prefix ctime, error
+    message).  JSON text is cheap to send back and to parse in the parent.
+    """
+    layout = _reindex_layout
+    try:
+        text = layout.read_spec_json(spec_file)
+        ctime = os.stat(layout.prefix_for_spec_file(spec_file)).st_ctime
+        return spec_file, text, ctime, None
+    except Exception as e:
+        return spec_file, None, None, str(e)
+
 
 def _now():
     """Returns the time since the epoch"""
@@ -101,6 +144,8 @@ class InstallRecord(object):
             installed, or pulled-in as a dependency of something else
         installation_time (time, optional): time of the installation
     """
+    __slots__ = ('spec', 'path', 'installed', 'ref_count', 'explicit',
+                 'installation_time')
 
     def __init__(
             self,
@@ -139,6 +184,285 @@ class InstallRecord(object):
         return InstallRecord(spec, **d)
 
 
+class LazyInstallRecords(MutableMapping):
+    """Maps DAG hashes to the ``InstallRecord`` objects of a database.
+
+    Records read from an index file are kept in their JSON form, and their
+    spec is only built, along with the specs of its dependencies, when the
+    record is first needed.  Commands that only look at a few records
+    don't pay for the rest of the database.
+
+    The spec of a record accessed here is connected to all its
+    dependencies.  Its dependents are only connected once they are asked
+    for with ``read_dependents()``, as building them for a common
+    dependency would build most of the database.
+    """
+
+    def __init__(self, db, installs=None):
+        self.db = db
+
+        #: records still in their JSON form, by DAG hash
+        self._installs = installs or {}
+        #: records whose spec has been built, by DAG hash
+        self._records = {}
+        #: hashes of the records that depend on each record
+        self._parents = {}
+        #: hashes of the records whose dependents have all been built
+        self._connected = set()
+        #: number of records set or deleted so far
+        self.changes = 0
+
+        # indexes, built on first use
+        self._sorted_hashes = None
+        self._hashes_by_name = None
+
+        self._index_dependencies()
+
+    def _index_dependencies(self):
+        """Record the dependents of each record, and report the
+        dependencies that are neither here nor in an upstream database.
+        """
+        upstream_hashes = self.db._upstreams.index()
+        for hash_key in self._installs:
+            name, deps = self._dependency_hashes(hash_key)
+            for dname, dhash in deps:
+                self._parents.setdefault(dhash, []).append(hash_key)
+                if dhash in self._installs or dhash in upstream_hashes:
+                    continue
+
+                msg = ("Missing dependency not in database: "
+                       "%s/%s needs %s-%s" % (
+                           name, hash_key[:7], dname, dhash[:7]))
+                if self.db._fail_when_missing_deps:
+                    raise MissingDependenciesError(msg)
+                tty.warn(msg)
+
+    def _dependencies(self, hash_key):
+        """Name and dependencies of a record in its JSON form."""
+        try:
+            name, node = next(iteritems(self._installs[hash_key]['spec']))
+            return name, list(spack.spec.Spec.read_yaml_dep_specs(
+                node.get('dependencies', {})))
+        except Exception as e:
+            self.db._invalid_record(hash_key, e)
+
+    def _dependency_hashes(self, hash_key):
+        """Name and dependency names and hashes of a record that was not
+        read yet."""
+        if isinstance(self._installs, DatabaseSnapshot):
+            return self._installs.dependency_hashes(hash_key)
+        name, deps = self._dependencies(hash_key)
+        return name, [(dname, dhash) for dname, dhash, dtypes in deps]
+
+    def __getitem__(self, key):
+        record = self._records.get(key)
+        if record is None:
+            if key not in self._installs:
+                raise KeyError(key)
+            record = self._read_record(key)
+        return record
+
+    def __setitem__(self, key, record):
+        self._installs.pop(key, None)
+        self._records[key] = record
+        self._connected.add(key)
+        self.changes += 1
+        self._clear_indexes()
+
+    def __delitem__(self, key):
+        if key in self._records:
+            del self._records[key]
+        else:
+            del self._installs[key]
+        self._connected.discard(key)
+        self.changes += 1
+        self._clear_indexes()
+
+    def __contains__(self, key):
+        return key in self._records or key in self._installs
+
+    def __iter__(self):
+        # records move between dicts as they are read, so iterate on a copy
+        return iter(list(self._records) + list(self._installs))
+
+    def __len__(self):
+        return len(self._records) + len(self._installs)
+
+    def _read_record(self, key):
+        """Build the spec of a record, and connect it to its dependencies."""
+        name, deps = self._dependencies(key)
+        try:
+            spec = self.db._read_spec_from_dict(key, self._installs)
+            record = InstallRecord.from_dict(spec, self._installs[key])
+        except Exception as e:
+            self.db._invalid_record(key, e)
+
+        del self._installs[key]
+        self._records[key] = record
+
+        for dname, dhash, dtypes in deps:
+            # It is important that we always check upstream installations
+            # in the same order, and that we always check the local
+            # installation first: if a downstream Spack installs a package
+            # then dependents in that installation could be using it.
+            # If a hash is installed locally and upstream, there isn't
+            # enough information to determine which one a local package
+            # depends on, so the convention ensures that this isn't an
+            # issue.
+            child = self._records.get(dhash)
+            if child is None and dhash in self._installs:
+                child = self._read_record(dhash)
+            if child is None and dhash in self.db._upstreams:
+                child = self.db._upstreams[dhash]
+
+            # Missing dependencies were reported when the database was read
+            if child is not None:
+                spec._add_dependency(child.spec, dtypes)
+
+        # Mark concrete only once dependencies are connected, or hashes
+        # would be cached prematurely.
+        spec._mark_concrete()
+        return record
+
+    def read_dependents(self, key):
+        """Build the specs of all the records that depend on a record, so
+        that its spec is connected to them."""
+        stack = [key]
+        while stack:
+            hash_key = stack.pop()
+            if hash_key in self._connected:
+                continue
+            self._connected.add(hash_key)
+
+            for parent in self._parents.get(hash_key, []):
+                if parent in self._installs:
+                    self._read_record(parent)
+                stack.append(parent)
+
+    def read_all(self):
+        """Build the specs of all the records that were not read yet."""
+        for key in list(self._installs):
+            if key in self._installs:
+                self._read_record(key)
+        self._connected.update(self._records)
+
+    def _clear_indexes(self):
+        self._sorted_hashes = None
+        self._hashes_by_name = None
+
+    def name(self, key):
+        """Name of the package of a record."""
+        record = self._records.get(key)
+        if record is not None:
+            return record.spec.name
+        if isinstance(self._installs, DatabaseSnapshot):
+            return self._installs.name(key)
+        return next(iter(self._installs[key]['spec']))
+
+    def hashes_with_prefix(self, prefix):
+        """DAG hashes of the records that start with ``prefix``."""
+        if self._sorted_hashes is None:
+            self._sorted_hashes = sorted(self)
+
+        hashes = self._sorted_hashes
+        i = bisect.bisect_left(hashes, prefix)
+        matches = []
+        while i < len(hashes) and hashes[i].startswith(prefix):
+            matches.append(hashes[i])
+            i += 1
+        return matches
+
+    def hashes_for_name(self, name):
+        """DAG hashes of the records of package ``name``."""
+        if self._hashes_by_name is None:
+            self._hashes_by_name = {}
+            for key in self:
+                self._hashes_by_name.setdefault(
+                    self.name(key), []).append(key)
+        return self._hashes_by_name.get(name, [])
+
+    def to_dict(self):
+        """JSON form of the records, for the index file.  Records that
+        were never accessed are written back as they were read.
+        """
+        installs = dict((key, record.to_dict())
+                        for key, record in iteritems(self._records))
+        installs.update(self._installs)
+        return installs
+
+
+class UpstreamIndex(Mapping):
+    """Maps DAG hashes to the records of a list of upstream databases.
+
+    Upstream databases are searched as one, through a single hash index
+    and a single name index over all of them.  A spec recorded in several
+    upstream databases is taken from the first one.  Indexes are rebuilt
+    when the records of any of the databases change.
+    """
+
+    def __init__(self, dbs):
+        self.dbs = dbs
+        self._state = None
+        self._by_hash = {}
+        self._by_name = None
+        self._sorted_hashes = None
+
+    def index(self):
+        """Current map from DAG hashes to the databases of their records."""
+        state = [(db._data, db._data.changes) for db in self.dbs]
+        if self._state is None or any(
+                data is not old_data or changes != old_changes
+                for (data, changes), (old_data, old_changes)
+                in zip(state, self._state)):
+            self._state = state
+            self._by_hash = {}
+            for db in reversed(self.dbs):
+                self._by_hash.update((key, db) for key in db._data)
+            self._by_name = None
+            self._sorted_hashes = None
+        return self._by_hash
+
+    def db_for_hash(self, hash_key):
+        """Database with the record of a DAG hash, or None."""
+        return self.index().get(hash_key)
+
+    def __getitem__(self, key):
+        return self.index()[key]._data[key]
+
+    def __contains__(self, key):
+        return key in self.index()
+
+    def __iter__(self):
+        return iter(self.index())
+
+    def __len__(self):
+        return len(self.index())
+
+    def hashes_for_name(self, name):
+        """DAG hashes of the records of package ``name``."""
+        by_hash = self.index()
+        if self._by_name is None:
+            self._by_name = {}
+            for key, db in iteritems(by_hash):
+                self._by_name.setdefault(
+                    db._data.name(key), []).append(key)
+        return self._by_name.get(name, [])
+
+    def hashes_with_prefix(self, prefix):
+        """DAG hashes of the records that start with ``prefix``."""
+        by_hash = self.index()
+        if self._sorted_hashes is None:
+            self._sorted_hashes = sorted(by_hash)
+
+        hashes = self._sorted_hashes
+        i = bisect.bisect_left(hashes, prefix)
+        matches = []
+        while i < len(hashes) and hashes[i].startswith(prefix):
+            matches.append(hashes[i])
+            i += 1
+        return matches
+
+
 class ForbiddenLockError(SpackError):
     """Raised when an upstream DB attempts to acquire a lock"""
 
@@ -149,6 +473,70 @@ class ForbiddenLock(object):
             "Cannot access attribute '{0}' of lock".format(name))
 
 
+def _query_records(records, query_spec=any, known=any, installed=True,
+                   explicit=any, start_date=None, end_date=None, hashes=None):
+    """Specs of the records in ``records`` (a map from DAG hashes to
+    ``InstallRecord`` objects) that match a query.  Arguments are those of
+    ``Database._query()``.
+    """
+    # TODO: Specs are a lot like queries.  Should there be a
+    # TODO: wildcard spec object, and should specs have attributes
+    # TODO: like installed and known that can be queried?  Or are
+    # TODO: these really special cases that only belong here?
+
+    # Just look up concrete specs with hashes; no fancy search.
+    if isinstance(query_spec, spack.spec.Spec) and query_spec.concrete:
+        # TODO: handling of hashes restriction is not particularly elegant.
+        hash_key = query_spec.dag_hash()
+        if (hash_key in records and
+            (not hashes or hash_key in hashes)):
+            return [records[hash_key].spec]
+        else:
+            return []
+
+    # Abstract specs require more work -- we test against all the
+    # records that may match.  Records that are not tested are never
+    # built.
+    if isinstance(query_spec, string_types):
+        query_spec = spack.spec.Spec(query_spec)
+
+    if hashes is not None:
+        keys = [key for key in hashes if key in records]
+    elif (query_spec is not any and query_spec.name and
+          not query_spec.virtual):
+        keys = records.hashes_for_name(query_spec.name)
+    else:
+        keys = records
+
+    results = []
+    start_date = start_date or datetime.datetime.min
+    end_date = end_date or datetime.datetime.max
+
+    for key in keys:
+        rec = records[key]
+
+        if installed is not any and rec.installed != installed:
+            continue
+
+        if explicit is not any and rec.explicit != explicit:
+            continue
+
+        if known is not any and spack.repo.path.exists(
+                rec.spec.name) != known:
+            continue
+
+        inst_date = datetime.datetime.fromtimestamp(
+            rec.installation_time
+        )
+        if not (start_date < inst_date < end_date):
+            continue
+
+        if query_spec is any or rec.spec.satisfies(query_spec):
+            results.append(rec.spec)
+
+    return results
+
+
 class Database(object):
 
     """Per-process lock objects for each install prefix."""
@@ -189,6 +577,7 @@ class Database(object):
         # Set up layout of database files within the db dir
         self._old_yaml_index_path = os.path.join(self._db_dir, 'index.yaml')
         self._index_path = os.path.join(self._db_dir, 'index.json')
+        self._snapshot_path = os.path.join(self._db_dir, 'index.snapshot')
         self._lock_path = os.path.join(self._db_dir, 'lock')
 
         # This is for other classes to use to lock prefix directories.
@@ -218,9 +607,10 @@ class Database(object):
                   str(timeout_format_str)))
         self.lock = Lock(self._lock_path,
                          default_timeout=self.db_lock_timeout)
-        self._data = {}
 
         self.upstream_dbs = list(upstream_dbs) if upstream_dbs else []
+        self._upstreams = UpstreamIndex(self.upstream_dbs)
+        self._data = LazyInstallRecords(self)
 
         # whether there was an error at the start of a read transaction
         self._error = None
@@ -297,13 +687,14 @@ class Database(object):
         else:
             prefix_lock.release_write()
 
-    def _write_to_file(self, stream):
+    def _write_to_file(self, stream, installs=None):
         """Write out the databsae to a JSON file.
 
         This function does not do any locking or transactions.
         """
         # map from per-spec hash code to installation record.
-        installs = dict((k, v.to_dict()) for k, v in self._data.items())
+        if installs is None:
+            installs = self._data.to_dict()
 
         # database includes installation list and version.
 
@@ -311,11 +702,14 @@ class Database(object):
         # the same spec well.  If there are 2 identical specs with
         # different paths, it can't differentiate.
         # TODO: fix this before we support multiple install locations.
+        # The generation identifies this write of the index, and comes
+        # first so that snapshots can check it without parsing the file.
         database = {
-            'database': {
-                'installs': installs,
-                'version': str(_db_version)
-            }
+            'database': OrderedDict([
+                ('generation', uuid.uuid4().hex),
+                ('version', str(_db_version)),
+                ('installs', installs),
+            ])
         }
 
         try:
@@ -345,9 +739,7 @@ class Database(object):
             if hash_key in self._data:
                 return self
 
-        for db in self.upstream_dbs:
-            if hash_key in db._data:
-                return db
+        return self._upstreams.db_for_hash(hash_key)
 
     def query_by_spec_hash(self, hash_key, data=None):
         if data and hash_key in data:
@@ -356,42 +748,15 @@ class Database(object):
             with self.read_transaction():
                 if hash_key in self._data:
                     return False, self._data[hash_key]
-        for db in self.upstream_dbs:
-            if hash_key in db._data:
-                return True, db._data[hash_key]
+        if hash_key in self._upstreams:
+            return True, self._upstreams[hash_key]
         return False, None
 
-    def _assign_dependencies(self, hash_key, installs, data):
-        # Add dependencies from other records in the install DB to
-        # form a full spec.
-        spec = data[hash_key].spec
-        spec_dict = installs[hash_key]['spec']
-        if 'dependencies' in spec_dict[spec.name]:
-            yaml_deps = spec_dict[spec.name]['dependencies']
-            for dname, dhash, dtypes in spack.spec.Spec.read_yaml_dep_specs(
-                    yaml_deps):
-                # It is important that we always check upstream installations
-                # in the same order, and that we always check the local
-                # installation first: if a downstream Spack installs a package
-                # then dependents in that installation could be using it.
-                # If a hash is installed locally and upstream, there isn't
-                # enough information to determine which one a local package
-                # depends on, so the convention ensures that this isn't an
-                # issue.
-                upstream, record = self.query_by_spec_hash(dhash, data=data)
-                child = record.spec if record else None
-
-                if not child:
-                    msg = ("Missing dependency not in database: "
-                           "%s needs %s-%s" % (
-                               spec.cformat('{name}{/hash:7}'),
-                               dname, dhash[:7]))
-                    if self._fail_when_missing_deps:
-                        raise MissingDependenciesError(msg)
-                    tty.warn(msg)
-                    continue
-
-                spec._add_dependency(child, dtypes)
+    def _invalid_record(self, hash_key, error):
+        msg = ("Invalid record in Spack database: "
+               "hash: %s, cause: %s: %s")
+        msg %= (hash_key, type(error).__name__, str(error))
+        raise CorruptDatabaseError(msg, self._index_path)
 
     def _read_from_file(self, stream, format='json'):
         """
@@ -441,62 +806,37 @@ class Database(object):
             raise InvalidDatabaseVersionError(_db_version, version)
         elif version < _db_version:
             self.reindex(spack.store.layout)
-            installs = dict((k, v.to_dict()) for k, v in self._data.items())
-
-        def invalid_record(hash_key, error):
-            msg = ("Invalid record in Spack database: "
-                   "hash: %s, cause: %s: %s")
-            msg %= (hash_key, type(error).__name__, str(error))
-            raise CorruptDatabaseError(msg, self._index_path)
-
-        # Build up the database in three passes:
-        #
-        #   1. Read in all specs without dependencies.
-        #   2. Hook dependencies up among specs.
-        #   3. Mark all specs concrete.
-        #
-        # The database is built up so that ALL specs in it share nodes
-        # (i.e., its specs are a true Merkle DAG, unlike most specs.)
-
-        # Pass 1: Iterate through database and build specs w/o dependencies
-        data = {}
-        for hash_key, rec in installs.items():
-            try:
-                # This constructs a spec DAG from the list of all installs
-                spec = self._read_spec_from_dict(hash_key, installs)
-
-                # Insert the brand new spec in the database.  Each
-                # spec has its own copies of its dependency specs.
-                # TODO: would a more immmutable spec implementation simplify
-                #       this?
-                data[hash_key] = InstallRecord.from_dict(spec, rec)
-            except Exception as e:
-                invalid_record(hash_key, e)
-
-        # Pass 2: Assign dependencies once all specs are created.
-        for hash_key in data:
-            try:
-                self._assign_dependencies(hash_key, installs, data)
-            except MissingDependenciesError:
-                raise
-            except Exception as e:
-                invalid_record(hash_key, e)
+            installs = self._data.to_dict()
 
-        # Pass 3: Mark all specs concrete.  Specs representing real
-        # installations must be explicitly marked.
-        # We do this *after* all dependencies are connected because if we
-        # do it *while* we're constructing specs,it causes hashes to be
-        # cached prematurely.
-        for hash_key, rec in data.items():
-            rec.spec._mark_concrete()
+        # Specs are built when their record is first accessed, so that
+        # commands that only need a few records don't build the others.
+        # All the specs of a database share nodes (i.e., they form a true
+        # Merkle DAG, unlike most specs).
+        self._data = LazyInstallRecords(self, installs)
 
-        self._data = data
+    def _read_from_snapshot(self):
+        """Fill database from its binary snapshot, if it is up to date.
+
+        Returns:
+            (bool): whether the database was read
+        """
+        snapshot = spack.database_snapshot.read(
+            self._snapshot_path, self._index_path)
+        if snapshot is None or snapshot.version != str(_db_version):
+            return False
 
-    def reindex(self, directory_layout):
+        self._data = LazyInstallRecords(self, snapshot)
+        return True
+
+    def reindex(self, directory_layout, jobs=None):
         """Build database index from scratch based on a directory layout.
 
         Locks the DB if it isn't locked already.
 
+        Args:
+            directory_layout: layout of the prefixes to index
+            jobs (int): number of processes reading spec files (by
+                default, the number of CPUs up to 16)
         """
         if self.is_upstream:
             raise UpstreamDatabaseLockingError(
@@ -510,7 +850,7 @@ class Database(object):
                     self._read_from_file(self._index_path)
             except CorruptDatabaseError as e:
                 self._error = e
-                self._data = {}
+                self._data = LazyInstallRecords(self)
 
         transaction = WriteTransaction(
             self.lock, _read_suppress_error, self._write
@@ -527,13 +867,68 @@ class Database(object):
             old_data = self._data
             try:
                 self._construct_from_directory_layout(
-                    directory_layout, old_data)
+                    directory_layout, old_data, jobs)
             except BaseException:
                 # If anything explodes, restore old data, skip write.
                 self._data = old_data
                 raise
 
-    def _construct_from_directory_layout(self, directory_layout, old_data):
+    def _read_prefix_specs(self, directory_layout, jobs=None):
+        """Read the specs in all the prefixes of a directory layout.
+
+        Spec files are read and parsed by a pool of ``jobs`` processes.
+
+        Returns:
+            (list): (spec, prefix, prefix ctime) tuples, where dependencies
+                always come before their dependents
+        """
+        spec_files = directory_layout.all_spec_files()
+        jobs = _default_reindex_jobs() if jobs is None else jobs
+
+        results = []
+        with ProgressBar(len(spec_files), 'Reading prefixes') as progress:
+            if (jobs > 1 and len(spec_files) >= min_parallel_reindex and
+                    not multiprocessing.current_process().daemon):
+                pool = multiprocessing.Pool(
+                    jobs, _init_reindex_worker, (directory_layout,))
+                try:
+                    chunksize = max(1, len(spec_files) // (jobs * 8))
+                    for result in pool.imap_unordered(
+                            _read_prefix, spec_files, chunksize):
+                        results.append(result)
+                        progress.update()
+                finally:
+                    pool.terminate()
+                    pool.join()
+            else:
+                _init_reindex_worker(directory_layout)
+                for spec_file in spec_files:
+                    results.append(_read_prefix(spec_file))
+                    progress.update()
+
+        specs = []
+        for spec_file, text, ctime, error in results:
+            if error is None:
+                try:
+                    data = sjson.load(text)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                raise SpecReadError(
+                    'Unable to read file: %s' % spec_file, 'Cause: ' + error)
+
+            spec = spack.spec.Spec.from_dict(data)
+            spec._mark_concrete()
+            specs.append((len(data['spec']), spec_file, spec, ctime))
+
+        # A spec file lists all the nodes of the spec's DAG, so the DAGs of
+        # dependencies always have fewer nodes than those of dependents.
+        specs.sort(key=lambda item: item[:2])
+        return [(spec, directory_layout.prefix_for_spec_file(spec_file), ctime)
+                for _, spec_file, spec, ctime in specs]
+
+    def _construct_from_directory_layout(self, directory_layout, old_data,
+                                         jobs=None):
         # Read first the `spec.yaml` files in the prefixes. They should be
         # considered authoritative with respect to DB reindexing, as
         # entries in the DB may be corrupted in a way that still makes
@@ -542,29 +937,35 @@ class Database(object):
 
         with directory_layout.disable_upstream_check():
             # Initialize data in the reconstructed DB
-            self._data = {}
+            self._data = LazyInstallRecords(self)
 
             # Start inspecting the installed prefixes
             processed_specs = set()
 
-            for spec in directory_layout.all_specs():
+            for spec, prefix, inst_time in self._read_prefix_specs(
+                    directory_layout, jobs):
                 # Try to recover explicit value from old DB, but
                 # default it to True if DB was corrupt. This is
                 # just to be conservative in case a command like
                 # "autoremove" is run by the user after a reindex.
-                tty.debug(
-                    'RECONSTRUCTING FROM SPEC.YAML: {0}'.format(spec))
+                # (formatting specs is slow, so only do it for debug)
+                if tty.is_debug():
+                    tty.debug(
+                        'RECONSTRUCTING FROM SPEC.YAML: {0}'.format(spec))
                 explicit = True
-                inst_time = os.stat(spec.prefix).st_ctime
                 if old_data is not None:
                     old_info = old_data.get(spec.dag_hash())
                     if old_info is not None:
                         explicit = old_info.explicit
                         inst_time = old_info.installation_time
 
+                # No need to read the spec again to check that it is
+                # installed if it was just read from its own prefix.
                 extra_args = {
                     'explicit': explicit,
-                    'installation_time': inst_time
+                    'installation_time': inst_time,
+                    'check_installed':
+                        prefix != directory_layout.path_for_spec(spec)
                 }
                 self._add(spec, directory_layout, **extra_args)
 
@@ -635,6 +1036,7 @@ class Database(object):
                     "Invalid ref_count: %s: %d (expected %d), in DB %s" %
                     (key, found, expected, self._index_path))
 
+    @spack.util.timeline.timed('database write', 'database')
     def _write(self, type, value, traceback):
         """Write the in-memory database index to its file path.
 
@@ -655,9 +1057,10 @@ class Database(object):
             '.%s.%s.temp' % (socket.getfqdn(), os.getpid()))
 
         # Write a temporary database file them move it into place
+        installs = self._data.to_dict()
         try:
             with open(temp_file, 'w') as f:
-                self._write_to_file(f)
+                self._write_to_file(f, installs)
             os.rename(temp_file, self._index_path)
         except BaseException:
             # Clean up temp file if something goes wrong.
@@ -665,6 +1068,16 @@ class Database(object):
                 os.remove(temp_file)
             raise
 
+        # The snapshot is only an optimization: if it cannot be written,
+        # the stale one is ignored and index.json is read instead.
+        try:
+            spack.database_snapshot.write(
+                self._snapshot_path, installs, str(_db_version),
+                self._index_path)
+        except (IOError, OSError) as e:
+            tty.debug('Cannot write database snapshot: %s' % e)
+
+    @spack.util.timeline.timed('database read', 'database')
     def _read(self):
         """Re-read Database from the data in the set location.
 
@@ -674,8 +1087,10 @@ class Database(object):
 
         """
         if os.path.isfile(self._index_path):
-            # Read from JSON file if a JSON database exists
-            self._read_from_file(self._index_path, format='json')
+            # Read from JSON file if a JSON database exists, unless its
+            # snapshot is up to date
+            if not self._read_from_snapshot():
+                self._read_from_file(self._index_path, format='json')
 
         elif os.path.isfile(self._old_yaml_index_path):
             if (not self.is_upstream) and os.access(
@@ -704,7 +1119,8 @@ class Database(object):
             spec,
             directory_layout=None,
             explicit=False,
-            installation_time=None
+            installation_time=None,
+            check_installed=True
     ):
         """Add an install record for this spec to the database.
 
@@ -729,6 +1145,10 @@ class Database(object):
                 installation_time
                     Date and time of installation
 
+                check_installed
+                    Whether to check that the spec itself (but not its
+                    dependencies) is installed in ``directory_layout``
+
         """
         if not spec.concrete:
             raise NonConcreteSpecAddError(
@@ -757,7 +1177,8 @@ class Database(object):
             if not spec.external and directory_layout:
                 path = directory_layout.path_for_spec(spec)
                 try:
-                    directory_layout.check_installed(spec)
+                    if check_installed:
+                        directory_layout.check_installed(spec)
                     installed = True
                 except DirectoryLayoutError as e:
                     tty.warn(
@@ -880,6 +1301,17 @@ class Database(object):
         if direction not in ('parents', 'children'):
             raise ValueError("Invalid direction: %s" % direction)
 
+        with self.read_transaction():
+            if direction == 'parents':
+                # Dependents are only connected to specs once they are
+                # read, and those of upstream specs may be in this or in
+                # any upstream database.
+                for match in self.query(spec):
+                    for db in [self] + self._upstreams.dbs:
+                        db._data.read_dependents(match.dag_hash())
+            return self._installed_relatives(spec, direction, transitive)
+
+    def _installed_relatives(self, spec, direction, transitive):
         relatives = set()
         for spec in self.query(spec):
             if transitive:
@@ -984,63 +1416,19 @@ class Database(object):
             list of specs that match the query
 
         """
-        # TODO: Specs are a lot like queries.  Should there be a
-        # TODO: wildcard spec object, and should specs have attributes
-        # TODO: like installed and known that can be queried?  Or are
-        # TODO: these really special cases that only belong here?
-
-        # Just look up concrete specs with hashes; no fancy search.
-        if isinstance(query_spec, spack.spec.Spec) and query_spec.concrete:
-            # TODO: handling of hashes restriction is not particularly elegant.
-            hash_key = query_spec.dag_hash()
-            if (hash_key in self._data and
-                (not hashes or hash_key in hashes)):
-                return [self._data[hash_key].spec]
-            else:
-                return []
-
-        # Abstract specs require more work -- currently we test
-        # against everything.
-        results = []
-        start_date = start_date or datetime.datetime.min
-        end_date = end_date or datetime.datetime.max
-
-        for key, rec in self._data.items():
-            if hashes is not None and rec.spec.dag_hash() not in hashes:
-                continue
-
-            if installed is not any and rec.installed != installed:
-                continue
-
-            if explicit is not any and rec.explicit != explicit:
-                continue
-
-            if known is not any and spack.repo.path.exists(
-                    rec.spec.name) != known:
-                continue
-
-            inst_date = datetime.datetime.fromtimestamp(
-                rec.installation_time
-            )
-            if not (start_date < inst_date < end_date):
-                continue
-
-            if query_spec is any or rec.spec.satisfies(query_spec):
-                results.append(rec.spec)
-
-        return results
+        return _query_records(self._data, query_spec, known, installed,
+                              explicit, start_date, end_date, hashes)
 
     def query_local(self, *args, **kwargs):
         with self.read_transaction():
             return sorted(self._query(*args, **kwargs))
 
     def query(self, *args, **kwargs):
-        upstream_results = []
-        for upstream_db in self.upstream_dbs:
-            # queries for upstream DBs need to *not* lock - we may not
-            # have permissions to do this and the upstream DBs won't know about
-            # us anyway (so e.g. they should never uninstall specs)
-            upstream_results.extend(upstream_db._query(*args, **kwargs) or [])
+        # queries for upstream DBs need to *not* lock - we may not
+        # have permissions to do this and the upstream DBs won't know about
+        # us anyway (so e.g. they should never uninstall specs).  They are
+        # queried all at once, through their merged indexes.
+        upstream_results = _query_records(self._upstreams, *args, **kwargs)
 
         local_results = set(self.query_local(*args, **kwargs))
 
@@ -1049,6 +1437,45 @@ class Database(object):
 
         return sorted(results)
 
+    def get_by_hash_local(self, dag_hash, default=None, installed=any):
+        """Look up specs in this database by DAG hash, or by prefix of
+        DAG hash.
+
+        Args:
+            dag_hash (str): hash, or prefix of a hash, of the specs
+            default: value returned if no spec matches
+            installed (bool or any, optional): restrict the search to
+                installed (or uninstalled) specs
+
+        Returns:
+            (list): the specs with a matching hash, or ``default``
+        """
+        with self.read_transaction():
+            return self._get_by_hash_local(dag_hash, default, installed)
+
+    def _get_by_hash_local(self, dag_hash, default, installed):
+        specs = []
+        for key in self._data.hashes_with_prefix(dag_hash):
+            rec = self._data[key]
+            if installed is any or rec.installed == installed:
+                specs.append(rec.spec)
+        return specs or default
+
+    def get_by_hash(self, dag_hash, default=None, installed=any):
+        """Like ``get_by_hash_local()``, but also searches upstream
+        databases.
+        """
+        specs = self.get_by_hash_local(dag_hash, [], installed)
+        hashes = set(spec.dag_hash() for spec in specs)
+
+        # upstream databases are not locked, as in query()
+        for key in self._upstreams.hashes_with_prefix(dag_hash):
+            rec = self._upstreams[key]
+            if key not in hashes and (
+                    installed is any or rec.installed == installed):
+                specs.append(rec.spec)
+        return specs or default
+
     def query_one(self, query_spec, known=any, installed=True):
         """Query for exactly one spec that matches the query spec.
 
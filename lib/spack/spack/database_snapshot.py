@@ -0,0 +1,279 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Binary snapshots of the install database.
+
+Decoding ``index.json`` costs time proportional to the size of the
+database on every command that reads it.  A snapshot holds the same
+records in a form that can be read with ``mmap``: what is needed to list
+the records and connect them (hashes, package names and the dependency
+hashes of each record) is in fixed-size tables, and the JSON of each
+record is only decoded when its spec is built.
+
+A snapshot is written next to ``index.json``, and records its size and
+the random generation that ``Database._write_to_file`` writes at the
+start of each new ``index.json``.  It is only used while they match, so
+any other write of ``index.json`` makes it stale, even one that keeps its
+size and modification time.  Indexes written without a generation, e.g.
+by older versions of Spack, are compared by their SHA-256 digest instead.
+
+Layout of the file (all integers are little-endian)::
+
+    header        see ``_header`` below
+    string table  (nstrings + 1) offsets, then UTF-8 data
+    records       nrecords x ``_record``
+    dependencies  ndeps x ``_dependency``
+    JSON blobs    one per record
+
+Strings (hashes and names) are stored once, and referred to by their
+index in the string table.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import socket
+import struct
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from six import iteritems
+
+import llnl.util.tty as tty
+
+import spack.spec
+import spack.util.spack_json as sjson
+
+_magic = b'SPACKDB\0'
+
+#: Version of the snapshot format, changed when the layout changes
+format_version = 3
+
+#: magic, format version, index.json size, generation and digest (only
+#: for indexes without a generation), index of the database version in
+#: the string table, nstrings, nrecords, ndeps
+_header = struct.Struct('<8sIQ32s32sIIII')
+
+#: hash, name, first dependency, number of dependencies, blob offset and
+#: blob length
+_record_format = 'IIIIQI'
+_record = struct.Struct('<' + _record_format)
+
+#: name and hash of a dependency
+_dependency_format = 'II'
+_dependency = struct.Struct('<' + _dependency_format)
+
+
+#: Generation of index.json, in the first bytes of the file
+_generation = re.compile(
+    br'^\{\s*"database":\s*\{\s*"generation":\s*"(\w+)"')
+_generation_head_size = 256
+
+
+def _index_generation(index_path):
+    """Generation of the JSON index, or None if it has none."""
+    with open(index_path, 'rb') as f:
+        match = _generation.match(f.read(_generation_head_size))
+    return match.group(1) if match else None
+
+
+def _index_digest(index_path):
+    """SHA-256 digest of the JSON index."""
+    digest = hashlib.sha256()
+    with open(index_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class DatabaseSnapshot(Mapping):
+    """Maps DAG hashes to install records in their JSON form, read from
+    a snapshot file.
+
+    Records are decoded on first access; names and dependency hashes are
+    available without decoding anything.  Records can be removed, but
+    not added.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+
+        (magic, fmt, self.index_size, self.index_generation,
+         self.index_digest, version_idx,
+         nstrings, nrecords, ndeps) = _header.unpack_from(buf, 0)
+        if magic != _magic or fmt != format_version:
+            raise ValueError('not a database snapshot of version %d' %
+                             format_version)
+
+        # string table
+        pos = _header.size
+        offsets = struct.unpack_from('<%dI' % (nstrings + 1), buf, pos)
+        pos += 4 * (nstrings + 1)
+        data = buf[pos:pos + offsets[-1]]
+        self._strings = [data[offsets[i]:offsets[i + 1]]
+                         for i in range(nstrings)]
+        if sys.version_info[0] >= 3:
+            self._strings = [s.decode('utf-8') for s in self._strings]
+        pos += offsets[-1]
+
+        #: version of the database the records were written with
+        self.version = self._strings[version_idx]
+
+        # records and dependencies, as flat tuples of their fields
+        self._records = struct.unpack_from(
+            '<' + _record_format * nrecords, buf, pos)
+        pos += _record.size * nrecords
+        self._deps = struct.unpack_from(
+            '<' + _dependency_format * ndeps, buf, pos)
+        pos += _dependency.size * ndeps
+        self._blobs = pos
+
+        strings = self._strings
+        self._index = dict(
+            (strings[self._records[i]], i)
+            for i in range(0, len(self._records), len(_record_format)))
+        self._decoded = {}
+
+    def __getitem__(self, key):
+        record = self._decoded.get(key)
+        if record is None:
+            i = self._index[key]
+            offset, length = self._records[i + 4:i + 6]
+            start = self._blobs + offset
+            blob = self._buf[start:start + length].decode('utf-8')
+            record = self._decoded[key] = sjson.load(blob)
+        return record
+
+    def __delitem__(self, key):
+        del self._index[key]
+        self._decoded.pop(key, None)
+
+    def pop(self, key, *default):
+        if key in self._index:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def name(self, key):
+        """Name of the package of a record."""
+        return self._strings[self._records[self._index[key] + 1]]
+
+    def dependency_hashes(self, key):
+        """Name of the package of a record, and names and hashes of its
+        dependencies.
+        """
+        i = self._index[key]
+        strings = self._strings
+        start, count = self._records[i + 2:i + 4]
+        deps = self._deps[2 * start:2 * (start + count)]
+        return strings[self._records[i + 1]], [
+            (strings[deps[j]], strings[deps[j + 1]])
+            for j in range(0, len(deps), 2)]
+
+
+def read(path, index_path):
+    """Read the snapshot at ``path``, if it is up to date with the JSON
+    index at ``index_path``.
+
+    Returns:
+        (DatabaseSnapshot or None): the snapshot, or None if there is no
+            valid and up-to-date snapshot
+    """
+    try:
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot = DatabaseSnapshot(buf)
+        # Modification times are too coarse on some filesystems to tell
+        # writes apart, so compare generations, or else contents.
+        fresh = snapshot.index_size == os.path.getsize(index_path)
+        if fresh:
+            generation = _index_generation(index_path)
+            if generation:
+                fresh = snapshot.index_generation == generation
+            else:
+                fresh = snapshot.index_digest == _index_digest(index_path)
+    except (IOError, OSError, ValueError, IndexError, struct.error) as e:
+        tty.debug('Cannot read database snapshot %s: %s' % (path, e))
+        return None
+    return snapshot if fresh else None
+
+
+def write(path, installs, version, index_path):
+    """Atomically write a snapshot of ``installs`` at ``path``.
+
+    Args:
+        path (str): path of the snapshot
+        installs (dict): install records in their JSON form, by DAG hash
+        version (str): version of the database
+        index_path (str): path of the JSON index written with these
+            records
+    """
+    strings, string_index = [], {}
+
+    def string(s):
+        idx = string_index.get(s)
+        if idx is None:
+            idx = string_index[s] = len(strings)
+            strings.append(s.encode('utf-8'))
+        return idx
+
+    records, deps, blobs, blob_offset = [], [], [], 0
+    for hash_key, install in iteritems(installs):
+        name, node = next(iteritems(install['spec']))
+        node_deps = list(spack.spec.Spec.read_yaml_dep_specs(
+            node.get('dependencies', {})))
+        blob = json.dumps(install, separators=(',', ':')).encode('utf-8')
+
+        records.append(_record.pack(
+            string(hash_key), string(name), len(deps) // 2,
+            len(node_deps), blob_offset, len(blob)))
+        for dname, dhash, dtypes in node_deps:
+            deps.extend((string(dname), string(dhash)))
+        blobs.append(blob)
+        blob_offset += len(blob)
+
+    version_idx = string(version)
+    offsets = [0]
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+
+    generation = _index_generation(index_path)
+    header = _header.pack(
+        _magic, format_version, os.path.getsize(index_path),
+        generation or b'',
+        b'' if generation else _index_digest(index_path), version_idx,
+        len(strings), len(records), len(deps) // 2)
+
+    tmp = '%s.%s.%s.temp' % (path, socket.getfqdn(), os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(header)
+            f.write(struct.pack('<%dI' % len(offsets), *offsets))
+            f.write(b''.join(strings))
+            f.write(b''.join(records))
+            f.write(struct.pack('<%dI' % len(deps), *deps))
+            f.write(b''.join(blobs))
+        os.rename(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
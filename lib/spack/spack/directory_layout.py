@@ -3,6 +3,8 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import errno
+import json
 import os
 import shutil
 import glob
@@ -16,6 +18,8 @@ from llnl.util.filesystem import mkdirp, chgrp
 
 import spack.config
 import spack.spec
+import spack.util.spack_json as sjson
+import spack.util.spack_yaml as syaml
 from spack.error import SpackError
 
 
@@ -189,10 +193,12 @@ class YamlDirectoryLayout(DirectoryLayout):
         # locate files in older upstream databases
         self.metadata_dir        = '.spack'
         self.spec_file_name      = 'spec.yaml'
+        self.spec_json_file_name = 'spec.json'  # faster copy of spec.yaml
         self.extension_file_name = 'extensions.yaml'
         self.build_log_name      = 'build.out'  # build log.
         self.build_env_name      = 'build.env'  # build environment
         self.packages_dir        = 'repos'      # archive of package.py files
+        self.build_timeline_name = 'timeline.json'  # see spack.util.timeline
 
     @property
     def hidden_file_paths(self):
@@ -205,16 +211,24 @@ class YamlDirectoryLayout(DirectoryLayout):
         return path
 
     def write_spec(self, spec, path):
-        """Write a spec out to a file."""
+        """Write a spec out to a file, as JSON if ``path`` ends in .json
+        and as YAML otherwise.
+        """
         _check_concrete(spec)
         with open(path, 'w') as f:
-            spec.to_yaml(f)
+            if path.endswith('.json'):
+                spec.to_json(f)
+            else:
+                spec.to_yaml(f)
 
     def read_spec(self, path):
-        """Read the contents of a file and parse them as a spec"""
+        """Read the contents of a file and parse them as a spec.
+
+        If ``path`` is a ``spec.yaml`` file with a ``spec.json`` file next
+        to it, the JSON file is read instead, as it is much faster to parse.
+        """
         try:
-            with open(path) as f:
-                spec = spack.spec.Spec.from_yaml(f)
+            spec = spack.spec.Spec.from_dict(self.read_spec_data(path))
         except Exception as e:
             if spack.config.get('config:debug'):
                 raise
@@ -225,11 +239,44 @@ class YamlDirectoryLayout(DirectoryLayout):
         spec._mark_concrete()
         return spec
 
+    def read_spec_data(self, path):
+        """Read the raw data of a spec file, preferring the ``spec.json``
+        file next to a ``spec.yaml`` file.
+        """
+        return sjson.load(self.read_spec_json(path))
+
+    def read_spec_json(self, path):
+        """Return the contents of a spec file as JSON text.
+
+        The ``spec.json`` file next to a ``spec.yaml`` file is read if it
+        exists; otherwise YAML is converted to JSON.
+        """
+        if os.path.basename(path) == self.spec_file_name:
+            json_path = os.path.join(
+                os.path.dirname(path), self.spec_json_file_name)
+            try:
+                with open(json_path) as f:
+                    return f.read()
+            except (IOError, OSError) as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+        with open(path) as f:
+            if path.endswith('.json'):
+                return f.read()
+            return json.dumps(syaml.load(f))
+
     def spec_file_path(self, spec):
         """Gets full path to spec file"""
         _check_concrete(spec)
         return os.path.join(self.metadata_path(spec), self.spec_file_name)
 
+    def spec_json_file_path(self, spec):
+        """Gets full path to the JSON copy of the spec file"""
+        _check_concrete(spec)
+        return os.path.join(
+            self.metadata_path(spec), self.spec_json_file_name)
+
     @contextmanager
     def disable_upstream_check(self):
         self.check_upstream = False
@@ -245,6 +292,9 @@ class YamlDirectoryLayout(DirectoryLayout):
     def build_env_path(self, spec):
         return os.path.join(self.metadata_path(spec), self.build_env_name)
 
+    def build_timeline_path(self, spec):
+        return os.path.join(self.metadata_path(spec), self.build_timeline_name)
+
     def build_packages_path(self, spec):
         return os.path.join(self.metadata_path(spec), self.packages_dir)
 
@@ -269,6 +319,7 @@ class YamlDirectoryLayout(DirectoryLayout):
 
         mkdirp(self.metadata_path(spec), mode=perms)
         self.write_spec(spec, self.spec_file_path(spec))
+        self.write_spec(spec, self.spec_json_file_path(spec))
 
     def check_installed(self, spec):
         _check_concrete(spec)
@@ -300,15 +351,22 @@ class YamlDirectoryLayout(DirectoryLayout):
             raise InconsistentInstallDirectoryError(
                 'Spec file in %s does not match hash!' % spec_file_path)
 
-    def all_specs(self):
+    def all_spec_files(self):
+        """Paths of the spec files of all the prefixes in the layout."""
         if not os.path.isdir(self.root):
             return []
 
         path_elems = ["*"] * len(self.path_scheme.split(os.sep))
         path_elems += [self.metadata_dir, self.spec_file_name]
         pattern = os.path.join(self.root, *path_elems)
-        spec_files = glob.glob(pattern)
-        return [self.read_spec(s) for s in spec_files]
+        return glob.glob(pattern)
+
+    def prefix_for_spec_file(self, spec_file):
+        """Installation prefix of a spec file from ``all_spec_files()``."""
+        return os.path.dirname(os.path.dirname(spec_file))
+
+    def all_specs(self):
+        return [self.read_spec(s) for s in self.all_spec_files()]
 
     def specs_by_hash(self):
         by_hash = {}
@@ -718,7 +718,8 @@ class Environment(object):
                 "{0} does not have a view enabled".format(self.name))
 
         return YamlFilesystemView(
-            self._view_path, spack.store.layout, ignore_conflicts=True)
+            self._view_path, spack.store.layout, ignore_conflicts=True,
+            manifest=True)
 
     def update_view(self, view_path):
         if self._view_path and self._view_path != view_path:
@@ -732,27 +733,32 @@ class Environment(object):
                       " maintain a view")
             return
 
-        specs_for_view = []
-        for spec in self._get_environment_specs():
-            # The view does not store build deps, so if we want it to
-            # recognize environment specs (which do store build deps), then
-            # they need to be stripped
-            specs_for_view.append(spack.spec.Spec.from_dict(
-                spec.to_dict(all_deps=False)
-            ))
-        installed_specs_for_view = set(s for s in specs_for_view
-                                       if s.package.installed)
+        with spack.store.db.read_transaction():
+            installed = dict((s.dag_hash(), s)
+                             for s in self._get_environment_specs()
+                             if s.package.installed)
 
+        # The view's manifest lets us compare by hash, so only specs that
+        # actually change are read from or linked into the view.
         view = self.view()
         view.clean()
-        specs_in_view = set(view.get_all_specs())
+        hashes_in_view = view.get_all_hashes()
         tty.msg("Updating view at {0}".format(self._view_path))
 
-        rm_specs = specs_in_view - installed_specs_for_view
-        view.remove_specs(*rm_specs, with_dependents=False)
-
-        add_specs = installed_specs_for_view - specs_in_view
-        view.add_specs(*add_specs, with_dependencies=False)
+        rm_hashes = hashes_in_view - set(installed)
+        if rm_hashes:
+            rm_specs = [s for s in view.get_all_specs()
+                        if s.dag_hash() in rm_hashes]
+            view.remove_specs(*rm_specs, with_dependents=False)
+
+        # The view does not store build deps, so if we want it to
+        # recognize environment specs (which do store build deps), then
+        # they need to be stripped
+        add_specs = [spack.spec.Spec.from_dict(
+            installed[h].to_dict(all_deps=False))
+            for h in set(installed) - hashes_in_view]
+        if add_specs:
+            view.add_specs(*add_specs, with_dependencies=False)
 
     def _shell_vars(self):
         updates = [
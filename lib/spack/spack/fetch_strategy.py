@@ -26,6 +26,10 @@ import sys
 import re
 import shutil
 import copy
+import hashlib
+import stat
+import tempfile
+import time
 import xml.etree.ElementTree
 from functools import wraps
 from six import string_types, with_metaclass
@@ -33,11 +37,14 @@ from six import string_types, with_metaclass
 import llnl.util.tty as tty
 from llnl.util.filesystem import working_dir, mkdirp
 
+import spack.caches
 import spack.config
 import spack.error
 import spack.util.crypto as crypto
 import spack.util.pattern as pattern
+import spack.util.spack_json as sjson
 from spack.util.executable import which
+from spack.util.lock import Lock, WriteTransaction
 from spack.util.string import comma_and, quote
 from spack.version import Version, ver
 from spack.util.compression import decompressor_for, extension
@@ -247,9 +254,10 @@ class URLFetchStrategy(FetchStrategy):
         curl_args += self.extra_curl_options
 
         # Run curl but grab the mime type from the http headers
+        # Patches are fetched in threads, so don't change directories
         curl = self.curl
-        with working_dir(self.stage.path):
-            headers = curl(*curl_args, output=str, fail_on_error=False)
+        headers = curl(*curl_args, output=str, fail_on_error=False,
+                       cwd=self.stage.path)
 
         if curl.returncode != 0:
             # clean up archive on failure.
@@ -334,8 +342,7 @@ class URLFetchStrategy(FetchStrategy):
                                          "spack-expanded-archive")
 
         mkdirp(tarball_container)
-        with working_dir(tarball_container):
-            decompress(self.archive_file)
+        decompress(self.archive_file, cwd=tarball_container)
 
         # Check for an exploding tarball, i.e. one that doesn't expand
         # to a single directory.  If the tarball *didn't* explode,
@@ -438,9 +445,24 @@ class CacheURLFetchStrategy(URLFetchStrategy):
                 os.remove(self.archive_file)
                 raise
 
+        # Record the use for LRU eviction, see FsCache.evict()
+        _write_stamp(os.path.realpath(path))
+
         # Notify the user how we fetched.
         tty.msg('Using cached archive: %s' % path)
 
+    @_needs_stage
+    def check(self):
+        """Check the cached archive, unless it was already verified against
+        the same digest and has not changed since."""
+        path = os.path.realpath(self.archive_file)
+        if self.digest and self.digest in _read_stamp(path):
+            tty.debug('%s was already verified' % path)
+            return
+
+        super(CacheURLFetchStrategy, self).check()
+        _write_stamp(path, [self.digest])
+
 
 class VCSFetchStrategy(FetchStrategy):
     """Superclass for version control system fetch strategies.
@@ -642,7 +664,11 @@ class GitFetchStrategy(VCSFetchStrategy):
         tty.msg("Cloning git repository: {0}".format(self._repo_info()))
 
         git = self.git
-        if self.commit:
+        mirror = self._git_mirror()
+        if mirror and self._clone_git_mirror(mirror):
+            tty.debug('Cloned {0} from {1}'.format(self.url, mirror))
+
+        elif self.commit:
             # Need to do a regular clone and check out everything if
             # they asked for a particular commit.
             with working_dir(self.stage.path):
@@ -714,6 +740,89 @@ class GitFetchStrategy(VCSFetchStrategy):
                     git('submodule', '--quiet', 'update', '--init',
                         '--recursive')
 
+    def _has_commit(self, git_dir):
+        """Whether the repository in ``git_dir`` has the commit to check
+        out."""
+        self.git('--git-dir=' + git_dir, 'rev-parse', '--quiet', '--verify',
+                 self.commit + '^{commit}', output=os.devnull,
+                 error=os.devnull, fail_on_error=False)
+        return self.git.returncode == 0
+
+    def _git_mirror(self):
+        """Return the path of a bare mirror of the repository in the fetch
+        cache, created or updated so it has the commit to check out.
+
+        Only commits are checked out from mirrors, as they otherwise need
+        a full clone of the repository.  Tags and branches are cloned with
+        their history only, which is cheaper than mirroring all of it.
+
+        Returns None if the fetch is not for a commit, if there is no fetch
+        cache, if the mirror cache is disabled, or if the mirror cannot be
+        used: then the repository is cloned from its URL.
+        """
+        if not self.commit:
+            return None
+        if not spack.config.get('config:git_mirror_cache', True):
+            return None
+        path = spack.caches.fetch_cache.git_mirror_path(self.url)
+        if not path:
+            return None
+
+        quiet = [] if spack.config.get('config:debug') else ['--quiet']
+        try:
+            mkdirp(os.path.dirname(path))
+            with WriteTransaction(Lock(path + '.lock')):
+                if not os.path.isdir(path):
+                    tty.msg('Creating cached mirror of {0}'.format(self.url))
+                    tmp = '%s.%d.tmp' % (path, os.getpid())
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    self.git(*(['clone', '--mirror'] + quiet +
+                               [self.url, tmp]))
+                    os.rename(tmp, path)
+                elif not self._has_commit(path):
+                    tty.msg('Updating cached mirror of {0}'.format(self.url))
+                    self.git(*(['--git-dir=' + path, 'fetch', '--prune'] +
+                               quiet))
+        except (spack.error.SpackError, OSError) as e:
+            tty.debug('Cannot use a cached mirror of {0}: {1}'.format(
+                self.url, e))
+            return None
+
+        if not self._has_commit(path):
+            return None
+
+        # Record the use for LRU eviction, see FsCache.evict()
+        os.utime(path, None)
+        return path
+
+    def _clone_git_mirror(self, mirror):
+        """Check out the commit from a cached mirror of the repository.
+
+        The clone is a local clone, whose objects are hard links to those
+        of the mirror where possible, so this does not download anything.
+        It does not depend on the mirror, which can be evicted afterwards.
+        Its origin is the URL of the repository.
+
+        Returns:
+            bool: False if the mirror was removed in the meantime
+        """
+        quiet = [] if spack.config.get('config:debug') else ['--quiet']
+        name = os.path.basename(self.url.rstrip('/'))
+        if name.endswith('.git'):
+            name = name[:-len('.git')]
+
+        # Hold the lock of the mirror, so it isn't evicted while cloning
+        with WriteTransaction(Lock(mirror + '.lock')):
+            if not os.path.isdir(mirror):
+                return False
+            with working_dir(self.stage.path):
+                self.git(*(['clone'] + quiet + [mirror, name or 'src']))
+
+        with working_dir(self.stage.source_path):
+            self.git('remote', 'set-url', 'origin', self.url)
+            self.git(*(['checkout'] + quiet + [self.commit]))
+        return True
+
     def archive(self, destination):
         super(GitFetchStrategy, self).archive(destination, exclude='.git')
 
@@ -1090,11 +1199,106 @@ def from_list_url(pkg):
             tty.msg("Could not determine url from list_url.")
 
 
+#: Suffix of the stamps kept next to the archives in a FsCache
+_stamp_suffix = '.verified'
+
+
+def _read_stamp(path):
+    """Return the digests that the file at ``path`` was verified against,
+    or an empty list if it has no stamp or has changed since."""
+    try:
+        with open(path + _stamp_suffix) as f:
+            stamp = sjson.load(f)
+        st = os.stat(path)
+    except (IOError, OSError, ValueError):
+        return []
+
+    if (stamp.get('size'), stamp.get('mtime')) != (st.st_size, st.st_mtime):
+        return []
+    return stamp.get('digests', [])
+
+
+def _write_stamp(path, digests=()):
+    """Add ``digests`` to the stamp of the file at ``path``.
+
+    The stamp is written even if there are no new digests: its
+    modification time is the last use of the file.
+    """
+    digests = _read_stamp(path) + [d for d in digests if d]
+    tmp = '%s%s.%d.tmp' % (path, _stamp_suffix, os.getpid())
+    try:
+        st = os.stat(path)
+        with open(tmp, 'w') as f:
+            sjson.dump({
+                'size': st.st_size,
+                'mtime': st.st_mtime,
+                'digests': sorted(set(digests)),
+            }, f)
+        os.rename(tmp, path + _stamp_suffix)
+    except (IOError, OSError) as e:
+        # e.g. a cache shared read-only, which is then checksummed each time
+        tty.debug('Cannot write %s%s: %s' % (path, _stamp_suffix, e))
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
 class FsCache(object):
+    """Filesystem cache of fetched archives.
+
+    Archives are stored once, under the sha256 of their contents, in the
+    ``_objects`` directory.  Packages find them through symbolic links at
+    their mirror paths, e.g. ``zlib/zlib-1.2.11.tar.gz``, so packages and
+    resources that share sources share the archive.
+
+    Each archive has a stamp listing the digests it was verified against,
+    so that it is not checksummed again on each use, and the stamp is
+    rewritten on each use to evict the least recently used archives.
+    """
+
+    #: Directory of the archives, relative to the root of the cache
+    objects_dir = '_objects'
+
+    #: Directory of the bare mirrors of git repositories
+    git_dir = '_git'
 
     def __init__(self, root):
         self.root = os.path.abspath(root)
 
+    def object_path(self, sha256):
+        """Path of the archive whose contents have the digest ``sha256``"""
+        return os.path.join(self.root, self.objects_dir, sha256[:2], sha256)
+
+    def verified_object(self, sha256):
+        """Return the path of the file with contents ``sha256`` in the
+        cache if it was verified against it, or None otherwise.  The use
+        of the file is recorded."""
+        path = self.object_path(sha256)
+        if sha256 not in _read_stamp(path):
+            return None
+        _write_stamp(path)
+        return path
+
+    def store_file(self, path, sha256):
+        """Copy the file at ``path``, which was verified to have contents
+        ``sha256``, into the cache, and return the path of the copy."""
+        dst = self.object_path(sha256)
+        if sha256 in _read_stamp(dst):
+            return dst
+
+        mkdirp(os.path.dirname(dst))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst), prefix='.tmp-')
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp)
+            os.rename(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        _write_stamp(dst, [sha256])
+        return dst
+
     def store(self, fetcher, relative_dest):
         # skip fetchers that aren't cachable
         if not fetcher.cachable:
@@ -1104,18 +1308,166 @@ class FsCache(object):
         if isinstance(fetcher, CacheURLFetchStrategy):
             return
 
+        # An archive with a sha256 digest that is already in the cache and
+        # was verified against it does not need to be copied again.
+        digest = getattr(fetcher, 'digest', None)
+        if (digest and len(digest) == 64 and
+                digest in _read_stamp(self.object_path(digest))):
+            self._link(self.object_path(digest), relative_dest)
+            return
+
+        objects_dir = os.path.join(self.root, self.objects_dir)
+        mkdirp(objects_dir)
+        # Fetchers check the extension of the archive they write to
+        ext = extension(relative_dest)
+        fd, tmp = tempfile.mkstemp(
+            dir=objects_dir, prefix='.tmp-', suffix='.' + ext if ext else '')
+        os.close(fd)
+        try:
+            fetcher.archive(tmp)
+            sha256 = crypto.checksum(hashlib.sha256, tmp)
+            path = self.object_path(sha256)
+            if os.path.isfile(path):
+                os.remove(tmp)
+            else:
+                mkdirp(os.path.dirname(path))
+                os.rename(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        _write_stamp(path, [sha256])
+        self._link(path, relative_dest)
+
+    def _link(self, path, relative_dest):
+        """Point ``relative_dest`` to the archive at ``path``"""
         dst = os.path.join(self.root, relative_dest)
         mkdirp(os.path.dirname(dst))
-        fetcher.archive(dst)
+        target = os.path.relpath(path, os.path.dirname(dst))
+        if os.path.islink(dst) and os.readlink(dst) == target:
+            return
+
+        # replace what is there atomically
+        tmp = '%s.%d.tmp' % (dst, os.getpid())
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.symlink(target, tmp)
+        os.rename(tmp, dst)
 
     def fetcher(self, target_path, digest, **kwargs):
         path = os.path.join(self.root, target_path)
         return CacheURLFetchStrategy(path, digest, **kwargs)
 
+    def git_mirror_path(self, url):
+        """Path of the bare mirror of the git repository at ``url``"""
+        name = re.sub(r'[^\w.-]', '_', os.path.basename(url.rstrip('/')))
+        if name.endswith('.git'):
+            name = name[:-len('.git')]
+        url_hash = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(
+            self.root, self.git_dir, '%s-%s.git' % (name, url_hash))
+
+    def _git_mirror_entries(self):
+        git_root = os.path.join(self.root, self.git_dir)
+        if not os.path.isdir(git_root):
+            return
+        for name in os.listdir(git_root):
+            path = os.path.join(git_root, name)
+            if not name.endswith('.git') or not os.path.isdir(path):
+                continue
+            size = 0
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    size += os.lstat(os.path.join(dirpath, filename)).st_size
+            yield path, size, os.stat(path).st_mtime
+
+    def entries(self):
+        """Yield ``(path, size, last use)`` for each archive in the cache,
+        and for each mirror of a git repository.
+
+        Archives stored by older versions of Spack at their mirror paths
+        are included, and are last used when they were stored.
+        """
+        for entry in self._git_mirror_entries():
+            yield entry
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root and self.git_dir in dirnames:
+                dirnames.remove(self.git_dir)
+            for name in filenames:
+                if name.endswith(_stamp_suffix):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+
+                try:
+                    last_use = os.stat(path + _stamp_suffix).st_mtime
+                except OSError:
+                    last_use = st.st_mtime
+                yield path, st.st_size, last_use
+
+    def evict(self, max_size=None, max_age=None):
+        """Remove the least recently used archives, until the cache holds
+        at most ``max_size`` bytes and no archive was last used more than
+        ``max_age`` seconds ago.
+
+        Returns:
+            list: ``(path, size)`` of the removed archives
+        """
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+
+        removed = []
+        for path, size, last_use in entries:
+            too_big = max_size is not None and total > max_size
+            too_old = max_age is not None and now - last_use > max_age
+            if not (too_big or too_old):
+                break
+            if os.path.isdir(path):
+                _remove_git_mirror(path)
+            for p in (path, path + _stamp_suffix):
+                if os.path.lexists(p):
+                    os.remove(p)
+            total -= size
+            removed.append((path, size))
+
+        self._remove_dangling_links()
+        return removed
+
+    def _remove_dangling_links(self):
+        """Remove links to archives that were evicted, and directories that
+        are left empty."""
+        git_root = os.path.join(self.root, self.git_dir)
+        for dirpath, dirnames, filenames in os.walk(self.root, topdown=False):
+            if dirpath == git_root or dirpath.startswith(git_root + os.sep):
+                continue
+            for name in filenames + dirnames:
+                path = os.path.join(dirpath, name)
+                if os.path.islink(path) and not os.path.exists(path):
+                    os.remove(path)
+            if dirpath != self.root and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+
     def destroy(self):
+        # Don't remove git mirrors while stages are cloned from them
+        for path, _, _ in list(self._git_mirror_entries()):
+            _remove_git_mirror(path)
         shutil.rmtree(self.root, ignore_errors=True)
 
 
+def _remove_git_mirror(path):
+    """Remove the git mirror at ``path`` while holding its lock."""
+    with WriteTransaction(Lock(path + '.lock')):
+        shutil.rmtree(path, ignore_errors=True)
+
+
 class FetchError(spack.error.SpackError):
     """Superclass fo fetcher errors."""
 
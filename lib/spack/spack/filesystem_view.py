@@ -3,20 +3,21 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-import filecmp
 import functools as ft
 import os
 import re
 import shutil
 import sys
 
-from llnl.util.link_tree import LinkTree, MergeConflictError
+from llnl.util.link_tree import (
+    LinkTree, MergeConflictError, link_files, remove_files, remove_link)
 from llnl.util import tty
 from llnl.util.lang import match_predicate, index_by
 from llnl.util.tty.color import colorize
 from llnl.util.filesystem import (
-    mkdirp, remove_dead_links, remove_empty_directories)
+    mkdirp, remove_dead_links, remove_empty_directories, remove_if_dead_link)
 
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as s_yaml
 
 import spack.spec
@@ -38,6 +39,7 @@ __all__ = ["FilesystemView", "YamlFilesystemView"]
 
 
 _projections_path = '.spack/projections.yaml'
+_manifest_path = '.spack/manifest.json'
 
 
 class FilesystemView(object):
@@ -69,6 +71,9 @@ class FilesystemView(object):
         self.link = kwargs.get("link", os.symlink)
         self.verbose = kwargs.get("verbose", False)
 
+        # number of threads linking files (None for the LinkTree default)
+        self.jobs = kwargs.get("jobs", None)
+
     def add_specs(self, *specs, **kwargs):
         """
             Add given specs to view.
@@ -139,6 +144,27 @@ class FilesystemView(object):
         """
         raise NotImplementedError
 
+    def link_files(self, file_map):
+        """
+            Link the source files in `file_map` to their destinations in
+            this view with `self.link`, skipping destinations that exist.
+
+            Returns the list of skipped destinations.
+        """
+        return link_files(file_map, link=self.link, jobs=self.jobs)
+
+    def remove_files(self, file_map):
+        """
+            Remove the view files in `file_map` with `self.remove_file`.
+        """
+        remove_files(file_map, remove_file=self.remove_file, jobs=self.jobs)
+
+    def remove_file(self, src, dest):
+        """
+            Remove `dest`, the view file linked from `src`.
+        """
+        raise NotImplementedError
+
     def get_projection_for_spec(self, spec):
         """
            Get the projection in this view for a spec.
@@ -178,14 +204,143 @@ class FilesystemView(object):
         raise NotImplementedError
 
 
+class ViewManifest(object):
+    """
+        Record of the files each spec has linked into a view.
+
+        Entries are keyed by DAG hash and store, for each spec, its name,
+        the source prefix that was merged, the projection it was merged
+        into (relative to the view root) and the files it owns (relative
+        to the projection). An inverse index from view-relative file path
+        to owning hash, plus a reference count of the directories holding
+        those files, lets conflict checks be answered without touching the
+        filesystem.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, _manifest_path)
+        self._entries = {}
+        self._owners = {}
+        self._dirs = {}
+
+    def read(self):
+        with open(self.path, 'r') as f:
+            data = sjson.load(f)
+        for dag_hash, entry in data['manifest'].items():
+            self._index(dag_hash, entry)
+
+    def write(self):
+        """Atomically write the manifest, or remove it if it is empty."""
+        if not self._entries:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+
+        mkdirp(os.path.dirname(self.path))
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            sjson.dump({'manifest': self._entries}, f)
+        os.rename(tmp, self.path)
+
+    def __contains__(self, dag_hash):
+        return dag_hash in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hashes(self):
+        return set(self._entries)
+
+    def entry(self, dag_hash):
+        return self._entries.get(dag_hash)
+
+    def owner(self, path):
+        """Hash of the spec that linked ``path`` into the view, or None."""
+        return self._owners.get(os.path.relpath(path, self.root))
+
+    def is_dir(self, path):
+        """Whether ``path`` is a directory holding linked files."""
+        return os.path.relpath(path, self.root) in self._dirs
+
+    def file_map(self, dag_hash):
+        """Map of source files to view files for the spec with this hash."""
+        entry = self._entries[dag_hash]
+        dest = os.path.join(self.root, entry['projection'])
+        return dict((os.path.join(entry['prefix'], f), os.path.join(dest, f))
+                    for f in entry['files'])
+
+    def add(self, spec, source, dest, paths):
+        """Record ``paths`` (absolute, under ``dest``) as owned by ``spec``.
+
+        Paths already owned by another spec are left to their owner.
+        """
+        dag_hash = spec.dag_hash()
+        owned = []
+        for path in paths:
+            owner = self.owner(path)
+            if owner is None or owner == dag_hash:
+                owned.append(os.path.relpath(path, dest))
+
+        entry = self._entries.get(dag_hash)
+        if entry:
+            owned = sorted(set(entry['files']) | set(owned))
+            self._unindex(dag_hash)
+
+        self._index(dag_hash, {
+            'name': spec.name,
+            'prefix': source,
+            'projection': os.path.relpath(dest, self.root),
+            'files': sorted(owned)})
+
+    def remove(self, dag_hash):
+        """Forget a spec; returns its view file paths."""
+        files = list(self.file_map(dag_hash).values())
+        self._unindex(dag_hash)
+        return files
+
+    def _view_paths(self, entry):
+        projection = entry['projection']
+        return [os.path.normpath(os.path.join(projection, f))
+                for f in entry['files']]
+
+    def _index(self, dag_hash, entry):
+        self._entries[dag_hash] = entry
+        for path in self._view_paths(entry):
+            self._owners[path] = dag_hash
+            parent = os.path.dirname(path)
+            while parent:
+                self._dirs[parent] = self._dirs.get(parent, 0) + 1
+                parent = os.path.dirname(parent)
+
+    def _unindex(self, dag_hash):
+        entry = self._entries.pop(dag_hash)
+        for path in self._view_paths(entry):
+            if self._owners.get(path) == dag_hash:
+                del self._owners[path]
+            parent = os.path.dirname(path)
+            while parent:
+                self._dirs[parent] -= 1
+                if not self._dirs[parent]:
+                    del self._dirs[parent]
+                parent = os.path.dirname(parent)
+
+
 class YamlFilesystemView(FilesystemView):
     """
         Filesystem view to work with a yaml based directory layout.
+
+        If constructed with ``manifest=True``, the view keeps a manifest of
+        the files linked for each spec (see ``ViewManifest``), so that
+        adding and removing specs only touches the files of those specs.
     """
 
     def __init__(self, root, layout, **kwargs):
         super(YamlFilesystemView, self).__init__(root, layout, **kwargs)
 
+        self._use_manifest = kwargs.get('manifest', False)
+        self._manifest = None
+
         # Super class gets projections from the kwargs
         # YAML specific to get projections from YAML file
         projections_path = os.path.join(self._root, _projections_path)
@@ -239,9 +394,12 @@ class YamlFilesystemView(FilesystemView):
         standalones = specs - extensions
 
         set(map(self._check_no_ext_conflicts, extensions))
-        # fail on first error, otherwise link extensions as well
-        if all(map(self.add_standalone, standalones)):
-            all(map(self.add_extension, extensions))
+        try:
+            # fail on first error, otherwise link extensions as well
+            if all(map(self.add_standalone, standalones)):
+                all(map(self.add_extension, extensions))
+        finally:
+            self._write_manifest()
 
     def add_extension(self, spec):
         if not spec.package.is_extension:
@@ -302,6 +460,68 @@ class YamlFilesystemView(FilesystemView):
             tty.info(self._croot + 'Linked package: %s' % colorize_spec(spec))
         return True
 
+    @property
+    def manifest(self):
+        """The ``ViewManifest`` of this view, or None if it keeps none.
+
+        Views created before manifests existed get one built from the
+        specs found in the view the first time it is needed.
+        """
+        if not self._use_manifest:
+            return None
+
+        if self._manifest is None:
+            manifest = ViewManifest(self._root)
+            if os.path.exists(manifest.path):
+                manifest.read()
+            else:
+                self._rebuild_manifest(manifest)
+            self._manifest = manifest
+        return self._manifest
+
+    def _rebuild_manifest(self, manifest):
+        ignore_file = match_predicate(self.layout.hidden_file_paths)
+        for spec in self._find_all_specs():
+            view_source = spec.package.view_source()
+            if not os.path.exists(view_source):
+                continue
+            view_dst = spec.package.view_destination(self)
+            merge_map = LinkTree(view_source).get_file_map(
+                view_dst, ignore_file)
+            linked = [dst for dst in merge_map.values()
+                      if os.path.lexists(dst)]
+            manifest.add(spec, view_source, view_dst, linked)
+
+    def _write_manifest(self):
+        if self._manifest is not None:
+            self._manifest.write()
+
+    def _manifest_conflicts(self, spec, view_dst, merge_map):
+        """Conflicts for merging ``spec``, looked up in the manifest."""
+        manifest = self.manifest
+        dag_hash = spec.dag_hash()
+        conflicts = []
+        checked = set()
+        for dst in merge_map.values():
+            if manifest.is_dir(dst):
+                conflicts.append("Directory blocks directory: %s" % dst)
+                continue
+
+            owner = manifest.owner(dst)
+            if owner is not None and owner != dag_hash:
+                if not self.ignore_conflicts:
+                    conflicts.append(dst)
+                continue
+
+            parent = os.path.dirname(dst)
+            while parent not in checked and parent != view_dst:
+                checked.add(parent)
+                owner = manifest.owner(parent)
+                if owner is not None and owner != dag_hash:
+                    conflicts.append("File blocks directory: %s" % parent)
+                parent = os.path.dirname(parent)
+        return conflicts
+
     def merge(self, spec, ignore=None):
         pkg = spec.package
         view_source = pkg.view_source()
@@ -313,49 +533,82 @@ class YamlFilesystemView(FilesystemView):
         ignore_file = match_predicate(
             self.layout.hidden_file_paths, ignore)
 
-        # check for dir conflicts
-        conflicts = tree.find_dir_conflicts(view_dst, ignore_file)
+        # walk the package prefix once for everything below
+        plan = tree.plan(view_dst, ignore_file)
+        merge_map = tree.get_file_map(view_dst, ignore_file, plan=plan)
 
-        merge_map = tree.get_file_map(view_dst, ignore_file)
-        if not self.ignore_conflicts:
-            conflicts.extend(pkg.view_file_conflicts(self, merge_map))
+        if self.manifest is not None:
+            conflicts = self._manifest_conflicts(spec, view_dst, merge_map)
+        else:
+            # check for dir conflicts
+            conflicts = tree.find_dir_conflicts(
+                view_dst, ignore_file, plan=plan)
+            if not self.ignore_conflicts:
+                conflicts.extend(pkg.view_file_conflicts(self, merge_map))
 
         if conflicts:
             raise MergeConflictError(conflicts[0])
 
         # merge directories with the tree
-        tree.merge_directories(view_dst, ignore_file)
+        tree.merge_directories(view_dst, ignore_file, plan=plan)
 
         pkg.add_files_to_view(self, merge_map)
 
+        if self.manifest is not None:
+            self.manifest.add(
+                spec, view_source, view_dst, merge_map.values())
+
     def unmerge(self, spec, ignore=None):
         pkg = spec.package
         view_source = pkg.view_source()
         view_dst = pkg.view_destination(self)
 
+        manifest = self.manifest
+        if manifest is not None and spec.dag_hash() in manifest:
+            merge_map = manifest.file_map(spec.dag_hash())
+            pkg.remove_files_from_view(self, merge_map)
+            manifest.remove(spec.dag_hash())
+            self._remove_empty_parents(view_dst, merge_map.values())
+            return
+
         tree = LinkTree(view_source)
 
         ignore = ignore or (lambda f: False)
         ignore_file = match_predicate(
             self.layout.hidden_file_paths, ignore)
 
-        merge_map = tree.get_file_map(view_dst, ignore_file)
+        plan = tree.plan(view_dst, ignore_file)
+        merge_map = tree.get_file_map(view_dst, ignore_file, plan=plan)
         pkg.remove_files_from_view(self, merge_map)
 
         # now unmerge the directory tree
-        tree.unmerge_directories(view_dst, ignore_file)
+        tree.unmerge_directories(view_dst, ignore_file, plan=plan)
+
+    def _remove_empty_parents(self, view_dst, paths):
+        """Remove the directories holding ``paths`` that are now empty, up
+        to (and excluding) ``view_dst``.
+        """
+        parents = set()
+        for path in paths:
+            parent = os.path.dirname(path)
+            while parent not in parents and parent != view_dst:
+                parents.add(parent)
+                parent = os.path.dirname(parent)
+
+        # deepest directories first, so that their parents can empty out
+        for parent in sorted(parents, key=len, reverse=True):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                pass
 
     def remove_file(self, src, dest):
-        if not os.path.islink(dest):
-            raise ValueError("%s is not a link tree!" % dest)
-        # remove if dest is a hardlink/symlink to src; this will only
-        # be false if two packages are merged into a prefix and have a
-        # conflicting file
-        if filecmp.cmp(src, dest, shallow=True):
-            os.remove(dest)
+        remove_link(src, dest)
 
     def check_added(self, spec):
         assert spec.concrete
+        if self.manifest is not None:
+            return spec.dag_hash() in self.manifest
         return spec == self.get_spec(spec)
 
     def remove_specs(self, *specs, **kwargs):
@@ -405,10 +658,15 @@ class YamlFilesystemView(FilesystemView):
         remove_extension = ft.partial(self.remove_extension,
                                       with_dependents=with_dependents)
 
-        set(map(remove_extension, extensions))
-        set(map(self.remove_standalone, standalones))
+        try:
+            set(map(remove_extension, extensions))
+            set(map(self.remove_standalone, standalones))
+        finally:
+            self._write_manifest()
 
-        self._purge_empty_directories()
+        # with a manifest, unmerging already removed emptied directories
+        if self.manifest is None:
+            self._purge_empty_directories()
 
     def remove_extension(self, spec, with_dependents=True):
         """
@@ -464,6 +722,32 @@ class YamlFilesystemView(FilesystemView):
         return self._root
 
     def get_all_specs(self):
+        manifest = self.manifest
+        if manifest is None:
+            return self._find_all_specs()
+
+        specs = []
+        for dag_hash in manifest.hashes():
+            entry = manifest.entry(dag_hash)
+            filename = os.path.join(self._root, entry['projection'],
+                                    spack.store.layout.metadata_dir,
+                                    entry['name'],
+                                    spack.store.layout.spec_file_name)
+            spec = get_spec_from_file(filename)
+            if spec:
+                specs.append(spec)
+        return specs
+
+    def get_all_hashes(self):
+        """
+            Get the DAG hashes of all specs currently active in this view.
+        """
+        if self.manifest is not None:
+            return self.manifest.hashes()
+        return set(s.dag_hash() for s in self.get_all_specs())
+
+    def _find_all_specs(self):
+        """Find the specs in the view by searching it for metadata dirs."""
         md_dirs = []
         for root, dirs, files in os.walk(self._root):
             if spack.store.layout.metadata_dir in dirs:
@@ -584,9 +868,34 @@ class YamlFilesystemView(FilesystemView):
         remove_dead_links(self._root)
 
     def clean(self):
+        if self.manifest is not None:
+            self._purge_missing_specs()
+            return
+
         self._purge_broken_links()
         self._purge_empty_directories()
 
+    def _purge_missing_specs(self):
+        """Unlink the files of specs whose source prefix no longer exists,
+        e.g. because they were uninstalled.
+        """
+        manifest = self.manifest
+        for dag_hash in manifest.hashes():
+            entry = manifest.entry(dag_hash)
+            if os.path.isdir(entry['prefix']):
+                continue
+
+            view_dst = os.path.join(self._root, entry['projection'])
+            paths = manifest.remove(dag_hash)
+            for path in paths:
+                remove_if_dead_link(path)
+            self._remove_empty_parents(view_dst, paths)
+
+            meta_folder = os.path.join(
+                view_dst, spack.store.layout.metadata_dir, entry['name'])
+            shutil.rmtree(meta_folder, ignore_errors=True)
+        self._write_manifest()
+
     def unlink_meta_folder(self, spec):
         path = self.get_path_meta_folder(spec)
         assert os.path.exists(path)
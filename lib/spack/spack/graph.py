@@ -45,10 +45,10 @@ can take a number of specs as input.
 import sys
 
 from heapq import heapify, heappop, heappush
-from six import iteritems
 
 from llnl.util.tty.color import ColorStream
 
+import spack.repo
 from spack.spec import Spec
 from spack.dependency import all_deptypes, canonical_deptype
 
@@ -524,10 +524,12 @@ def graph_dot(specs, deptype='all', static=False, out=None):
     if not specs:
         raise ValueError("Must provide specs ot graph_dot")
 
-    # Static graph includes anything a package COULD depend on.
+    # Static graph includes anything a package COULD depend on.  It is
+    # computed from the metadata index, without importing packages.
     if static:
         names = set.union(*[
-            s.package.possible_dependencies(expand_virtuals=False)
+            spack.repo.path.get_metadata(s.name).possible_dependencies(
+                expand_virtuals=False)
             for s in specs])
         specs = [Spec(name) for name in names]
 
@@ -547,12 +549,15 @@ def graph_dot(specs, deptype='all', static=False, out=None):
             if spec.virtual:
                 continue
 
+            pkg = spack.repo.path.get_metadata(spec.name)
+
             # Add edges for each depends_on in the package.
-            for dep_name, dep in iteritems(spec.package.dependencies):
+            for dep_name in pkg.dependencies:
                 deps.add((spec.name, dep_name))
 
             # If the package provides something, add an edge for that.
-            for provider in set(s.name for s in spec.package.provided):
+            provided = set(Spec(s).name for s in pkg.provided)
+            for provider in provided:
                 deps.add((provider, spec.name))
 
         else:
@@ -15,17 +15,26 @@
       * pre_run()
       * pre_install(spec)
       * post_install(spec)
+      * post_install_visitor(spec)
       * pre_uninstall(spec)
       * post_uninstall(spec)
 
+   ``post_install_visitor(spec)`` hooks return a function, or None.  After
+   the ``post_install`` hooks, the returned functions are called on each
+   file, directory and link under the prefix of ``spec`` by a single
+   ``spack.util.prefix_scan.scan()``, with a ``PrefixEntry`` for it.
+
    This can be used to implement support for things like module
    systems (e.g. modules, dotkit, etc.) or to add other custom
    features.
 """
 import os.path
 
+import spack.config
 import spack.paths
 import spack.util.imp as simp
+import spack.util.prefix_scan
+import spack.util.timeline
 from llnl.util.lang import memoized, list_modules
 
 
@@ -51,7 +60,34 @@ class HookRunner(object):
             if hasattr(module, self.hook_name):
                 hook = getattr(module, self.hook_name)
                 if hasattr(hook, '__call__'):
-                    hook(*args, **kwargs)
+                    name = '{0}: {1}'.format(
+                        self.hook_name, module.__name__.split('.')[-1])
+                    with spack.util.timeline.span(name, 'hook'):
+                        hook(*args, **kwargs)
+
+
+class PostInstallHookRunner(HookRunner):
+    """Runs post_install hooks, then the visitors returned by
+    post_install_visitor hooks, with one scan of the prefix."""
+
+    def __init__(self):
+        super(PostInstallHookRunner, self).__init__('post_install')
+
+    def __call__(self, spec):
+        super(PostInstallHookRunner, self).__call__(spec)
+
+        visitors = []
+        for module in all_hook_modules():
+            make_visitor = getattr(module, 'post_install_visitor', None)
+            if hasattr(make_visitor, '__call__'):
+                visitor = make_visitor(spec)
+                if visitor is not None:
+                    visitors.append(visitor)
+
+        if visitors:
+            jobs = spack.config.get('config:build_jobs')
+            with spack.util.timeline.span('post_install: prefix scan', 'hook'):
+                spack.util.prefix_scan.scan(spec.prefix, visitors, jobs=jobs)
 
 
 #
@@ -60,7 +96,7 @@ class HookRunner(object):
 pre_run = HookRunner('pre_run')
 
 pre_install = HookRunner('pre_install')
-post_install = HookRunner('post_install')
+post_install = PostInstallHookRunner()
 
 pre_uninstall = HookRunner('pre_uninstall')
 post_uninstall = HookRunner('post_uninstall')
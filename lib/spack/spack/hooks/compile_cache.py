@@ -0,0 +1,17 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import llnl.util.tty as tty
+
+import spack.compile_cache
+
+
+def post_install(spec):
+    """Trim the shared cache of object files after each build."""
+    if not spack.compile_cache.enabled() or spec.external:
+        return
+    removed = spack.compile_cache.trim()
+    if removed:
+        tty.debug('Removed %d objects from the compile cache' % len(removed))
@@ -3,10 +3,11 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import grp
 import os
 import stat
 
-from llnl.util.filesystem import chmod_x, chgrp
+from llnl.util.filesystem import chmod_x
 
 from spack.package_prefs import get_package_permissions, get_package_group
 from spack.package_prefs import get_package_dir_permissions
@@ -30,27 +31,56 @@ def forall_files(path, fn, args, dir_args=None):
                 fn(os.path.join(root, f), *args)
 
 
+def _real_entry_permissions(mode, perms):
+    """Permissions to set on an entry with ``mode``: ``perms``, keeping
+    its suid, sgid and sticky bits."""
+    perms |= mode & (stat.S_ISUID | stat.S_ISGID | stat.S_ISVTX)
+    if perms & stat.S_ISUID and perms & stat.S_IWGRP:
+        raise InvalidPermissionsError(
+            'Attempting to set suid with world writable')
+    return perms
+
+
 def chmod_real_entries(path, perms):
     # Don't follow links so we don't change things outside the prefix
     if not os.path.islink(path):
         mode = os.stat(path).st_mode
-        perms |= mode & (stat.S_ISUID | stat.S_ISGID | stat.S_ISVTX)
-        if perms & stat.S_ISUID and perms & stat.S_IWGRP:
-            raise InvalidPermissionsError(
-                'Attempting to set suid with world writable')
-        chmod_x(path, perms)
+        chmod_x(path, _real_entry_permissions(mode, perms))
+
+
+_executable_bits = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+
+
+def post_install_visitor(spec):
+    """Set the permissions and group of each entry of the prefix, as
+    configured for the package."""
+    if spec.external:
+        return None
+
+    perms = get_package_permissions(spec)
+    dir_perms = get_package_dir_permissions(spec)
+    group = get_package_group(spec)
+    gid = grp.getgrnam(group).gr_gid if group else None
 
+    def set_permissions(entry):
+        # Don't follow links so we don't change things outside the prefix
+        if entry.is_link():
+            return
 
-def post_install(spec):
-    if not spec.external:
-        perms = get_package_permissions(spec)
-        dir_perms = get_package_dir_permissions(spec)
-        group = get_package_group(spec)
+        mode = entry.stat.st_mode
+        if entry.is_dir():
+            entry_perms = _real_entry_permissions(mode, dir_perms)
+        else:
+            entry_perms = _real_entry_permissions(mode, perms)
+            # like chmod_x(): only executables stay executable
+            if entry.is_file() and not mode & _executable_bits:
+                entry_perms &= ~_executable_bits
+        os.chmod(entry.path, entry_perms)
 
-        forall_files(spec.prefix, chmod_real_entries, [perms], [dir_perms])
+        if gid is not None:
+            os.chown(entry.path, -1, gid)
 
-        if group:
-            forall_files(spec.prefix, chgrp, [group])
+    return set_permissions
 
 
 class InvalidPermissionsError(SpackError):
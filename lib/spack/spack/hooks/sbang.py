@@ -23,12 +23,16 @@ def shebang_too_long(path):
         return False
 
     with open(path, 'rb') as script:
-        bytes = script.read(2)
-        if bytes != b'#!':
-            return False
+        return _head_has_long_shebang(script.read(shebang_limit + 1))
 
-        line = bytes + script.readline()
-        return len(line) > shebang_limit
+
+def _head_has_long_shebang(head):
+    """Whether a file starting with ``head``, its first
+    ``shebang_limit + 1`` bytes, has a shebang line that is too long."""
+    if not head.startswith(b'#!'):
+        return False
+    end = head.find(b'\n')
+    return (len(head) if end < 0 else end + 1) > shebang_limit
 
 
 def filter_shebang(path):
@@ -93,14 +97,23 @@ def filter_shebangs_in_directory(directory, filenames=None):
             filter_shebang(path)
 
 
-def post_install(spec):
+def filter_shebang_entry(entry):
+    """Filter an entry of a prefix scan if it has a long shebang.
+
+    Links are not followed: files in the prefix are filtered when the scan
+    visits them.
+    """
+    if entry.is_file() and _head_has_long_shebang(
+            entry.head(shebang_limit + 1)):
+        filter_shebang(entry.path)
+
+
+def post_install_visitor(spec):
     """This hook edits scripts so that they call /bin/bash
     $spack_prefix/bin/sbang instead of something longer than the
     shebang limit.
     """
     if spec.external:
         tty.debug('SKIP: shebang filtering [external package]')
-        return
-
-    for directory, _, filenames in os.walk(spec.prefix):
-        filter_shebangs_in_directory(directory, filenames)
+        return None
+    return filter_shebang_entry
@@ -32,6 +32,7 @@ import spack.paths
 import spack.repo
 import spack.store
 import spack.util.debug
+import spack.util.imp.bytecode_cache
 import spack.util.path
 from spack.error import SpackError
 
@@ -445,6 +446,8 @@ def _invoke_command(command, parser, args, unknown_args):
             tty.die('unrecognized arguments: %s' % ' '.join(unknown_args))
         return_val = command(parser, args)
 
+    tty.debug('Package files: %s' % spack.util.imp.bytecode_cache.stats)
+
     # Allow commands to return and error code if they want
     return 0 if return_val is None else return_val
 
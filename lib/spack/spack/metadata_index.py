@@ -0,0 +1,273 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""
+The ``metadata_index`` module records what the directives of each package
+compute (versions, variants, dependencies, etc.), so that read-only
+queries like ``spack info`` or ``spack dependents`` can be answered
+without importing any ``package.py`` file.
+"""
+import collections
+import re
+import textwrap
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from six import iteritems, string_types, StringIO
+
+import llnl.util.tty as tty
+
+import spack.error
+import spack.repo
+import spack.util.spack_json as sjson
+from spack.version import Version
+
+#: What the index records about a variant.
+VariantMetadata = collections.namedtuple(
+    'VariantMetadata', ['default', 'allowed_values', 'description', 'multi'])
+
+# Types of the values of version arguments that we keep in the index
+_json_types = string_types + (bool, int, float, type(None))
+
+
+class PackageMetadata(object):
+    """Static metadata of a package, as recorded in a ``MetadataIndex``.
+
+    Attributes have the same names as those of ``PackageBase``, so that
+    read-only commands can work with either, but names of specs are kept
+    as strings.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._versions = None
+
+        self.name = data['name']
+        self.namespace = data['namespace']
+        self.description = data['description']
+        self.homepage = data['homepage']
+        self.url = data['url']
+        self.list_url = data['list_url']
+        self.build_system_class = data['build_system_class']
+        self.maintainers = data['maintainers']
+        self.tags = data['tags']
+        self.phases = data['phases']
+
+        #: dependency name -> {when spec: [deptypes]}
+        self.dependencies = data['dependencies']
+        #: provided spec -> [when specs]
+        self.provided = data['provided']
+        #: extendee name -> extendee spec
+        self.extendees = data['extendees']
+        #: conflicting spec -> [[when spec, message]]
+        self.conflicts = data['conflicts']
+        #: version -> description of its fetch strategy
+        self.sources = data['sources']
+
+        self.variants = dict(
+            (name, VariantMetadata(*args))
+            for name, args in iteritems(data['variants']))
+
+    @classmethod
+    def from_package(cls, pkg):
+        """Record the metadata of the package instance ``pkg``."""
+        import spack.fetch_strategy as fs
+
+        versions, sources = {}, {}
+        for v, args in iteritems(pkg.versions):
+            versions[str(v)] = dict(
+                (key, value) for key, value in iteritems(args)
+                if isinstance(value, _json_types))
+            # Any error from the package's url_for_version() would stop
+            # the indexing of all packages, so record no source instead
+            try:
+                sources[str(v)] = str(fs.for_package_version(pkg, v))
+            except Exception as e:
+                tty.debug('No source for {0}@{1}: {2}'.format(
+                    pkg.name, v, e))
+                sources[str(v)] = None
+
+        dependencies = {}
+        for name, conditions in iteritems(pkg.dependencies):
+            dependencies[name] = dict(
+                (str(when), sorted(dep.type))
+                for when, dep in iteritems(conditions))
+
+        variants = dict(
+            (name, [v.default, v.allowed_values, v.description, v.multi])
+            for name, v in iteritems(pkg.variants))
+
+        return cls({
+            'name': pkg.name,
+            'namespace': pkg.namespace,
+            'description': pkg.__doc__,
+            'homepage': getattr(pkg, 'homepage', None),
+            'url': getattr(type(pkg), 'url', None),
+            'list_url': getattr(pkg, 'list_url', None),
+            'build_system_class': pkg.build_system_class,
+            'maintainers': list(pkg.maintainers),
+            'tags': list(getattr(pkg, 'tags', [])),
+            'phases': list(pkg.phases),
+            'versions': versions,
+            'sources': sources,
+            'variants': variants,
+            'dependencies': dependencies,
+            'provided': dict(
+                (str(spec), [str(w) for w in whens])
+                for spec, whens in iteritems(pkg.provided)),
+            'extendees': dict(
+                (name, str(args[0]))
+                for name, args in iteritems(pkg.extendees)),
+            'conflicts': dict(
+                (str(spec), [[str(when), msg] for when, msg in conditions])
+                for spec, conditions in iteritems(pkg.conflicts)),
+        })
+
+    def to_dict(self):
+        return self._data
+
+    @property
+    def fullname(self):
+        return '%s.%s' % (self.namespace, self.name)
+
+    @property
+    def versions(self):
+        """Map from ``Version`` objects to the arguments of ``version()``."""
+        if self._versions is None:
+            self._versions = dict(
+                (Version(v), args)
+                for v, args in iteritems(self._data['versions']))
+        return self._versions
+
+    def dependencies_of_type(self, *deptypes):
+        """Names of dependencies that may have any of the given types."""
+        return dict(
+            (name, conditions) for name, conditions in
+            iteritems(self.dependencies)
+            if any(t in deptypes
+                   for types in conditions.values() for t in types))
+
+    def possible_dependencies(
+            self, transitive=True, expand_virtuals=True, visited=None):
+        """Same as ``PackageBase.possible_dependencies()``."""
+        return possible_dependencies(
+            self.name, self.dependencies, transitive, expand_virtuals,
+            visited)
+
+    def format_doc(self, **kwargs):
+        """Wrap doc string at 72 characters and format nicely"""
+        indent = kwargs.get('indent', 0)
+
+        if not self.description:
+            return ""
+
+        doc = re.sub(r'\s+', ' ', self.description)
+        lines = textwrap.wrap(doc, 72)
+        results = StringIO()
+        for line in lines:
+            results.write((" " * indent) + line + "\n")
+        return results.getvalue()
+
+
+def possible_dependencies(pkg_name, dependencies, transitive=True,
+                          expand_virtuals=True, visited=None):
+    """Return the set of possible dependencies of a package.
+
+    Dependencies of dependencies are read from the metadata index, so no
+    package is imported.
+
+    Args:
+        pkg_name (str): name of the package
+        dependencies (iterable): names of its direct dependencies
+        transitive (bool): return all transitive dependencies if True,
+            only direct dependencies if False.
+        expand_virtuals (bool): expand virtual dependencies into all
+            possible implementations.
+        visited (set): set of names of dependencies visited so far.
+    """
+    if visited is None:
+        visited = set([pkg_name])
+
+    for name in dependencies:
+        if spack.repo.path.is_virtual(name):
+            if expand_virtuals:
+                providers = spack.repo.path.providers_for(name)
+                dep_names = [spec.name for spec in providers]
+            else:
+                visited.add(name)
+                continue
+        else:
+            dep_names = [name]
+
+        for dep_name in dep_names:
+            if dep_name not in visited:
+                visited.add(dep_name)
+                if transitive:
+                    pkg = spack.repo.path.get_metadata(dep_name)
+                    pkg.possible_dependencies(
+                        transitive, expand_virtuals, visited)
+
+    return visited
+
+
+class MetadataIndex(Mapping):
+    """Maps names of packages to their ``PackageMetadata``."""
+
+    def __init__(self):
+        self._packages = {}
+
+    def to_json(self, stream):
+        packages = dict(
+            (name, pkg.to_dict()) for name, pkg in iteritems(self._packages))
+        sjson.dump({'metadata_index': {'packages': packages}}, stream)
+
+    @staticmethod
+    def from_json(stream):
+        data = sjson.load(stream)
+
+        if not isinstance(data, dict) or 'metadata_index' not in data:
+            raise MetadataIndexError(
+                "JSON MetadataIndex does not start with 'metadata_index'")
+
+        index = MetadataIndex()
+        for name, pkg_data in iteritems(data['metadata_index']['packages']):
+            index._packages[name] = PackageMetadata(pkg_data)
+        return index
+
+    def __getitem__(self, pkg_name):
+        return self._packages[pkg_name]
+
+    def __iter__(self):
+        return iter(self._packages)
+
+    def __len__(self):
+        return len(self._packages)
+
+    def update_package(self, pkg_fullname):
+        """Record (or refresh) the metadata of a package.
+
+        Args:
+            pkg_fullname (str): name of the package, with its namespace
+        """
+        pkg_name = pkg_fullname.rpartition('.')[2]
+        try:
+            pkg = spack.repo.path.get(pkg_fullname)
+            self._packages[pkg_name] = PackageMetadata.from_package(pkg)
+        except Exception as e:
+            # Leave the package out rather than fail the whole index; its
+            # metadata is then computed, and the error raised, on demand
+            tty.debug('Cannot index {0}: {1}'.format(pkg_fullname, e))
+            self._packages.pop(pkg_name, None)
+
+    def remove_package(self, pkg_name):
+        """Forget the metadata of a package, if it is in the index."""
+        self._packages.pop(pkg_name, None)
+
+
+class MetadataIndexError(spack.error.SpackError):
+    """Raised when there is a problem with a MetadataIndex."""
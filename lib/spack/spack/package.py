@@ -39,10 +39,13 @@ import spack.directory_layout
 import spack.error
 import spack.fetch_strategy as fs
 import spack.hooks
+import spack.metadata_index
 import spack.mirror
 import spack.mixins
+import spack.patch
 import spack.repo
 import spack.url
+import spack.util.timeline
 import spack.util.web
 import spack.multimethod
 import spack.binary_distribution as binary_distribution
@@ -301,9 +304,7 @@ class PackageViewMixin(object):
         implementations may skip some files, for example if other packages
         linked into the view already include the file.
         """
-        for src, dst in merge_map.items():
-            if not os.path.exists(dst):
-                view.link(src, dst)
+        view.link_files(merge_map)
 
     def remove_files_from_view(self, view, merge_map):
         """Given a map of package files to files currently linked in the view,
@@ -312,8 +313,7 @@ class PackageViewMixin(object):
         example if two packages include the same file, it should only be
         removed when both packages are removed.
         """
-        for src, dst in merge_map.items():
-            view.remove_file(src, dst)
+        view.remove_files(merge_map)
 
 
 class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
@@ -537,30 +537,13 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
             expand_virtuals (bool): expand virtual dependencies into all
                 possible implementations.
             visited (set): set of names of dependencies visited so far.
-        """
-        if visited is None:
-            visited = set([self.name])
-
-        for i, name in enumerate(self.dependencies):
-            if spack.repo.path.is_virtual(name):
-                if expand_virtuals:
-                    providers = spack.repo.path.providers_for(name)
-                    dep_names = [spec.name for spec in providers]
-                else:
-                    visited.add(name)
-                    continue
-            else:
-                dep_names = [name]
-
-            for dep_name in dep_names:
-                if dep_name not in visited:
-                    visited.add(dep_name)
-                    if transitive:
-                        pkg = spack.repo.get(dep_name)
-                        pkg.possible_dependencies(
-                            transitive, expand_virtuals, visited)
 
-        return visited
+        Dependencies of dependencies are read from the metadata index, so
+        they are not imported.
+        """
+        return spack.metadata_index.possible_dependencies(
+            self.name, self.dependencies, transitive, expand_virtuals,
+            visited)
 
     # package_dir and module are *class* properties (see PackageMeta),
     # but to make them work on instances we need these defs as well.
@@ -960,16 +943,16 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
                                  self.spec.format('{name}{@version}'), ck_msg)
 
         self.stage.create()
-        self.stage.fetch(mirror_only)
-        self._fetch_time = time.time() - start_time
 
-        if checksum and self.version in self.versions:
-            self.stage.check()
+        # URL patches are fetched while the source is
+        with spack.patch.fetching(self.spec.patches, self.stage):
+            self.stage.fetch(mirror_only)
+            self._fetch_time = time.time() - start_time
 
-        self.stage.cache_local()
+            if checksum and self.version in self.versions:
+                self.stage.check()
 
-        for patch in self.spec.patches:
-            patch.fetch(self.stage)
+            self.stage.cache_local()
 
     def do_stage(self, mirror_only=False):
         """Unpacks and expands the fetched tarball."""
@@ -982,6 +965,7 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
         if not os.listdir(self.stage.path):
             raise FetchError("Archive was empty for %s" % self.name)
 
+    @spack.util.timeline.timed('patch', 'stage')
     def do_patch(self):
         """Applies patches if they haven't been applied already."""
         if not self.spec.concrete:
@@ -1022,6 +1006,10 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
             tty.msg("No patches needed for %s" % self.name)
             return
 
+        # Check all the patches first, so that the source is left as it is
+        # if some don't apply
+        spack.patch.check_patches(self.stage, patches)
+
         # Apply all the patches for specs that match this one
         patched = False
         for patch in patches:
@@ -1447,6 +1435,8 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
 
         # Then, install the package proper
         tty.msg(colorize('@*{Installing} @*g{%s}' % self.name))
+        install_start = time.time()
+        timeline_mark = spack.util.timeline.mark()
 
         if kwargs.get('use_cache', True):
             if self.try_install_from_binary_cache(explicit):
@@ -1454,6 +1444,7 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
                         % self.name)
                 print_pkg(self.prefix)
                 spack.hooks.post_install(self.spec)
+                self._record_install(install_start, timeline_mark)
                 return
 
             tty.msg('No binary for %s found: installing from source'
@@ -1511,10 +1502,13 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
 
                         # cache debug settings
                         debug_enabled = tty.is_debug()
+                        compress = spack.config.get(
+                            'config:compress_build_logs', False)
 
                         # Spawn a daemon that reads from a pipe and redirects
                         # everything to log_path
-                        with log_output(self.log_path, echo, True) as logger:
+                        with log_output(self.log_path, echo, True,
+                                        compress=compress) as logger:
                             for phase_name, phase_attr in zip(
                                     self.phases, self._InstallPhase_phases):
 
@@ -1527,7 +1521,9 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
 
                                 # Redirect stdout and stderr to daemon pipe
                                 phase = getattr(self, phase_attr)
-                                phase(self.spec, self.prefix)
+                                with spack.util.timeline.span(
+                                        phase_name, 'phase'):
+                                    phase(self.spec, self.prefix)
 
                     echo = logger.echo
                     self.log()
@@ -1582,6 +1578,7 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
             spack.store.db.add(
                 self.spec, spack.store.layout, explicit=explicit
             )
+            self._record_install(install_start, timeline_mark)
         except spack.directory_layout.InstallDirectoryAlreadyExistsError:
             # Abort install if install directory exists.
             # But do NOT remove it (you'd be overwriting someone else's stuff)
@@ -1604,6 +1601,24 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
             # check the filesystem for it.
             self.stage.created = False
 
+    def _record_install(self, start_time, timeline_mark):
+        """Record the install of this package in the timeline, and write
+        the part of the timeline recorded since ``timeline_mark`` in the
+        install prefix."""
+        if not spack.util.timeline.is_recording():
+            return
+
+        spack.util.timeline.record(
+            'install {0}'.format(self.name), start_time, time.time(),
+            'install', spec=self.spec.format('{name}{@version}/{hash:7}'))
+        path = spack.store.layout.build_timeline_path(self.spec)
+        try:
+            spack.util.timeline.write(
+                path, spack.util.timeline.events_since(timeline_mark))
+        except (IOError, OSError) as e:
+            tty.debug('Cannot write install timeline {0}: {1}'.format(
+                path, e))
+
     def unit_test_check(self):
         """Hook for unit tests to assert things about package internals.
 
@@ -1658,7 +1673,7 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
         stage_is_managed_in_spack = self.stage.path.startswith(
             spack.paths.stage_path)
         if restage and stage_is_managed_in_spack:
-            self.stage.destroy()
+            self.stage.destroy(keep_pristine=True)
             self.stage.create()
 
         return partial
@@ -1693,6 +1708,8 @@ class PackageBase(with_metaclass(PackageMeta, PackageViewMixin, object)):
 
         # Archive the whole stdout + stderr for the package
         install(self.log_path, log_install_path)
+        if os.path.exists(self.log_path + '.gz'):
+            install(self.log_path + '.gz', log_install_path + '.gz')
         # Archive the environment used for the build
         install(self.env_path, env_install_path)
         # Finally, archive files that are specific to each package
@@ -3,13 +3,16 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import contextlib
 import hashlib
+import multiprocessing.pool
 import os
 import os.path
 
 import llnl.util.filesystem
 import llnl.util.lang
 
+import spack.caches
 import spack.error
 import spack.fetch_strategy as fs
 import spack.repo
@@ -18,10 +21,13 @@ import spack.util.spack_json as sjson
 
 from spack.util.compression import allowed_archive
 from spack.util.crypto import checksum, Checker
-from spack.util.executable import which
+from spack.util.executable import which, ProcessError
 
+#: Maximum number of URL patches fetched at once
+fetch_jobs = 8
 
-def apply_patch(stage, patch_path, level=1, working_dir='.'):
+
+def apply_patch(stage, patch_path, level=1, working_dir='.', dry_run=False):
     """Apply the patch at patch_path to code in the stage.
 
     Args:
@@ -30,13 +36,94 @@ def apply_patch(stage, patch_path, level=1, working_dir='.'):
         level (int, optional): patch level (default 1)
         working_dir (str): relative path *within* the stage to change to
             (default '.')
+        dry_run (bool): only check that the patch applies
     """
     patch = which("patch", required=True)
+    args = ['-s', '-p', str(level), '-i', patch_path, '-d', working_dir]
+    if dry_run:
+        args.append('--dry-run')
     with llnl.util.filesystem.working_dir(stage.source_path):
-        patch('-s',
-              '-p', str(level),
-              '-i', patch_path,
-              '-d', working_dir)
+        patch(*args)
+
+
+def patched_files(patch_path, level=1, working_dir='.'):
+    """Return the files changed by a patch, relative to the source
+    directory, from the ``---`` and ``+++`` lines of its diffs."""
+    files = set()
+    with open(patch_path, 'rb') as f:
+        for line in f:
+            if not (line.startswith(b'--- ') or line.startswith(b'+++ ')):
+                continue
+            name = line[4:].split(b'\t')[0].strip()
+            name = name.decode('utf-8', 'replace')
+            parts = name.split('/')[level:]
+            if name != '/dev/null' and parts:
+                files.add(os.path.normpath(os.path.join(working_dir, *parts)))
+    return files
+
+
+def check_patches(stage, patches):
+    """Check that patches apply to the code in the stage, without
+    changing it, with ``patch --dry-run``.
+
+    The patches are all checked before any is applied, so that the code
+    needs no restage if one doesn't apply, and all the patches that don't
+    apply are reported at once.  A patch that changes files changed by an
+    earlier patch may depend on it, and is only checked when applied.
+
+    Args:
+        stage (spack.stage.Stage): stage with code that will be patched
+        patches (list): patches to apply, in order
+
+    Raises:
+        PatchDoesNotApplyError: if some of the patches don't apply
+    """
+    changed = set()
+    failed = []
+    for patch in patches:
+        if not patch.path or not os.path.isfile(patch.path):
+            break  # reported when applied
+        files = patched_files(patch.path, patch.level, patch.working_dir)
+        if not files:
+            break  # later patches may depend on it
+        if not files & changed:
+            try:
+                apply_patch(stage, patch.path, patch.level, patch.working_dir,
+                            dry_run=True)
+            except ProcessError:
+                failed.append(patch)
+        changed |= files
+
+    if failed:
+        raise PatchDoesNotApplyError(
+            "%d patches do not apply to %s" % (len(failed), stage.source_path),
+            "\n".join(patch.path_or_url for patch in failed))
+
+
+@contextlib.contextmanager
+def fetching(patches, stage):
+    """Fetch the URL patches among ``patches`` while a ``with`` block runs.
+
+    Patches are fetched in threads.  Their errors are raised at the end of
+    the block, unless the block raised an error itself.
+
+    Args:
+        patches (list): patches of the package being fetched
+        stage (spack.stage.Stage): stage of the package
+    """
+    url_patches = [p for p in patches if isinstance(p, UrlPatch)]
+    if not url_patches:
+        yield
+        return
+
+    pool = multiprocessing.pool.ThreadPool(min(len(url_patches), fetch_jobs))
+    try:
+        result = pool.map_async(lambda patch: patch.fetch(stage), url_patches)
+        yield
+    finally:
+        pool.close()
+        pool.join()
+    result.get()
 
 
 class Patch(object):
@@ -156,12 +243,23 @@ class UrlPatch(Patch):
         if not self.sha256:
             raise PatchDirectiveError("URL patches require a sha256 checksum")
 
+        self.stage = None
+
     def fetch(self, stage):
         """Retrieve the patch in a temporary stage and compute self.path
 
+        Patches fetched and verified before are used from the fetch cache,
+        where they are stored by their sha256.
+
         Args:
             stage: stage for the package that needs to be patched
         """
+        # Mirrors are filled with the patches fetched in stages
+        if not spack.caches.mirror_cache:
+            self.path = spack.caches.fetch_cache.verified_object(self.sha256)
+            if self.path:
+                return
+
         # use archive digest for compressed archives
         fetch_digest = self.sha256
         if self.archive_sha256:
@@ -206,9 +304,12 @@ class UrlPatch(Patch):
                 raise fs.ChecksumError(
                     "sha256 checksum failed for %s" % self.path,
                     "Expected %s but got %s" % (self.sha256, checker.sum))
+            self.path = spack.caches.fetch_cache.store_file(
+                self.path, self.sha256)
 
     def clean(self):
-        self.stage.destroy()
+        if self.stage:
+            self.stage.destroy()
 
     def to_dict(self):
         data = super(UrlPatch, self).to_dict()
@@ -378,5 +479,9 @@ class NoSuchPatchError(spack.error.SpackError):
     """Raised when a patch file doesn't exist."""
 
 
+class PatchDoesNotApplyError(spack.error.SpackError):
+    """Raised when patches don't apply to the code they patch."""
+
+
 class PatchDirectiveError(spack.error.SpackError):
     """Raised when the wrong arguments are suppled to the patch directive."""
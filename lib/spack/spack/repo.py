@@ -8,6 +8,7 @@ import collections
 import contextlib
 import errno
 import functools
+import glob
 import inspect
 import os
 import re
@@ -34,7 +35,9 @@ from llnl.util.filesystem import mkdirp, install
 import spack.config
 import spack.caches
 import spack.error
+import spack.metadata_index
 import spack.patch
+import spack.paths
 import spack.spec
 import spack.util.spack_json as sjson
 import spack.util.imp as simp
@@ -82,6 +85,15 @@ NOT_PROVIDED = object()
 _package_prepend = 'from spack.pkgkit import *'
 
 
+def _package_bytecode_dir():
+    """Directory where the compiled code of package files is cached, or
+    None if it is not cached.
+    """
+    if not spack.config.get('config:package_bytecode_cache', True):
+        return None
+    return spack.caches.misc_cache.cache_path('package-bytecode')
+
+
 def autospec(function):
     """Decorator that automatically converts the first argument of a
     function to a Spec.
@@ -272,6 +284,17 @@ class Indexer(object):
         """
         return False
 
+    def last_mtime(self):
+        """Time of the last change to files, other than package files, that
+        the index is computed from.
+
+        Returns:
+            (float): a modification time; the whole index is regenerated
+                when it is older than this.
+
+        """
+        return 0
+
     @abc.abstractmethod
     def read(self, stream):
         """Read this index from a provided file object."""
@@ -338,6 +361,29 @@ class PatchIndexer(Indexer):
         self.index.update_package(pkg_fullname)
 
 
+class MetadataIndexer(Indexer):
+    """Lifecycle methods for the static metadata of packages."""
+    def _create(self):
+        return spack.metadata_index.MetadataIndex()
+
+    def last_mtime(self):
+        # Packages inherit directives and defaults from Spack's base classes
+        paths = glob.glob(os.path.join(spack.paths.build_systems_path, '*.py'))
+        paths.extend(
+            os.path.join(spack.paths.module_path, f)
+            for f in ('package.py', 'directives.py', 'fetch_strategy.py'))
+        return max(os.stat(p).st_mtime for p in paths)
+
+    def read(self, stream):
+        self.index = spack.metadata_index.MetadataIndex.from_json(stream)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname)
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
+
 class RepoIndex(object):
     """Container class that manages a set of Indexers for a Repo.
 
@@ -380,7 +426,10 @@ class RepoIndex(object):
             raise KeyError('no such index: %s' % name)
 
         if name not in self.indexes:
-            self._build_all_indexes()
+            if self._needs_update(name):
+                self._build_all_indexes()
+            else:
+                self.indexes[name] = self._build_index(name, indexer)
 
         return self.indexes[name]
 
@@ -391,26 +440,38 @@ class RepoIndex(object):
         because the main bottleneck here is loading all the packages.  It
         can take tens of seconds to regenerate sequentially, and we'd
         rather only pay that cost once rather than on several
-        invocations.
+        invocations.  Indexes that are up to date are only read when
+        they are asked for.
 
         """
         for name, indexer in self.indexers.items():
-            self.indexes[name] = self._build_index(name, indexer)
+            if name not in self.indexes and self._needs_update(name):
+                self.indexes[name] = self._build_index(name, indexer)
+
+    def _cache_filename(self, name):
+        # Filename of the index cache (we assume they're all json).  It
+        # depends on the version, as indexes also record what Spack itself
+        # computes for packages.
+        return '{0}/{1}-index-{2}.json'.format(
+            name, self.namespace, spack.spack_version)
+
+    def _needs_update(self, name):
+        """Names of the packages that changed since the index was written."""
+        index_mtime = spack.caches.misc_cache.mtime(self._cache_filename(name))
+        if self.indexers[name].last_mtime() > index_mtime:
+            return list(self.checker)
+        return [
+            x for x, sinfo in self.checker.items()
+            if sinfo.st_mtime > index_mtime
+        ]
 
     def _build_index(self, name, indexer):
         """Determine which packages need an update, and update indexes."""
-
-        # Filename of the provider index cache (we assume they're all json)
-        cache_filename = '{0}/{1}-index.json'.format(name, self.namespace)
+        cache_filename = self._cache_filename(name)
 
         # Compute which packages needs to be updated in the cache
         misc_cache = spack.caches.misc_cache
-        index_mtime = misc_cache.mtime(cache_filename)
-
-        needs_update = [
-            x for x, sinfo in self.checker.items()
-            if sinfo.st_mtime > index_mtime
-        ]
+        needs_update = self._needs_update(name)
 
         index_existed = misc_cache.init_entry(cache_filename)
         if index_existed and not needs_update:
@@ -538,6 +599,18 @@ class RepoPath(object):
         for name in self.all_package_names():
             yield self.get(name)
 
+    def get_metadata(self, pkg_name):
+        """Get the ``PackageMetadata`` of a package, without importing it."""
+        return self.repo_for_pkg(pkg_name).get_metadata(pkg_name)
+
+    def all_package_metadata(self):
+        """Iterator over the metadata of all packages in all repositories.
+
+        Unlike ``all_packages()``, this doesn't import any package.
+        """
+        for name in self.all_package_names():
+            yield self.get_metadata(name)
+
     @property
     def provider_index(self):
         """Merged ProviderIndex from all Repos in the RepoPath."""
@@ -940,6 +1013,7 @@ class Repo(object):
             self._repo_index.add_indexer('providers', ProviderIndexer())
             self._repo_index.add_indexer('tags', TagIndexer())
             self._repo_index.add_indexer('patches', PatchIndexer())
+            self._repo_index.add_indexer('metadata', MetadataIndexer())
         return self._repo_index
 
     @property
@@ -957,6 +1031,34 @@ class Repo(object):
         """Index of patches and packages they're defined on."""
         return self.index['patches']
 
+    @property
+    def metadata_index(self):
+        """Index of the static metadata of packages in this repo."""
+        return self.index['metadata']
+
+    def get_metadata(self, pkg_name):
+        """Get the ``PackageMetadata`` of a package, without importing it.
+
+        Raises UnknownPackageError if the package is not in this repo.
+        """
+        namespace, _, pkg_name = pkg_name.rpartition('.')
+        if namespace and namespace != self.namespace:
+            raise UnknownPackageError(
+                "Repository %s does not contain package %s"
+                % (self.namespace, pkg_name))
+        if not self.exists(pkg_name):
+            raise UnknownPackageError(pkg_name)
+        if pkg_name not in self.metadata_index:
+            # The package could not be indexed; show why
+            return spack.metadata_index.PackageMetadata.from_package(
+                self.get(pkg_name))
+        return self.metadata_index[pkg_name]
+
+    def all_package_metadata(self):
+        """Iterator over the metadata of all packages in the repository."""
+        for name in self.all_package_names():
+            yield self.get_metadata(name)
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -1059,8 +1161,9 @@ class Repo(object):
             fullname = "%s.%s" % (self.full_namespace, pkg_name)
 
             try:
-                module = simp.load_source(fullname, file_path,
-                                          prepend=_package_prepend)
+                module = simp.load_cached_source(
+                    fullname, file_path, _package_bytecode_dir(),
+                    prepend=_package_prepend)
             except SyntaxError as e:
                 # SyntaxError strips the path from the filename so we need to
                 # manually construct the error message in order to give the
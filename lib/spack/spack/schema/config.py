@@ -25,6 +25,7 @@ properties = {
                     {'type': 'array',
                      'items': {'type': 'string'}}],
             },
+            'stage_pristine': {'type': 'boolean'},
             'extensions': {
                 'type': 'array',
                 'items': {'type': 'string'}
@@ -43,6 +44,7 @@ properties = {
                 },
             },
             'source_cache': {'type': 'string'},
+            'git_mirror_cache': {'type': 'boolean'},
             'misc_cache': {'type': 'string'},
             'verify_ssl': {'type': 'boolean'},
             'install_missing_compilers': {'type': 'boolean'},
@@ -53,6 +55,19 @@ properties = {
             'build_language': {'type': 'string'},
             'build_jobs': {'type': 'integer', 'minimum': 1},
             'ccache': {'type': 'boolean'},
+            'compile_cache': {'type': 'boolean'},
+            'compile_cache_dir': {'type': 'string'},
+            'compile_cache_size': {
+                'anyOf': [
+                    {'type': 'integer', 'minimum': 0},
+                    {'type': 'string',
+                     'pattern': r'^\s*\d+(\.\d*)?\s*[KMGTkmgt]?i?[Bb]?\s*$'}
+                ],
+            },
+            'compress_build_logs': {'type': 'boolean'},
+            'sourced_file_cache': {'type': 'boolean'},
+            'compiler_detection_threads': {'type': 'integer', 'minimum': 1},
+            'package_bytecode_cache': {'type': 'boolean'},
             'db_lock_timeout': {'type': 'integer', 'minimum': 1},
             'package_lock_timeout': {
                 'anyOf': [
@@ -89,6 +89,7 @@ from operator import attrgetter
 from six import StringIO
 from six import string_types
 from six import iteritems
+from six.moves import intern
 
 from llnl.util.filesystem import find_headers, find_libraries, is_exe
 from llnl.util.lang import key_ordering, HashableMap, ObjectWrapper, dedupe
@@ -189,6 +190,11 @@ _any_version = VersionList([':'])
 #: Max integer helps avoid passing too large a value to cyaml.
 maxint = 2 ** (ctypes.sizeof(ctypes.c_int) * 8 - 1) - 1
 
+#: Memoized results of ``Spec._satisfies_node()``, keyed on the
+#: ``_satisfies_key()`` of both nodes.  Cleared when it gets too large.
+_satisfies_cache = {}
+_satisfies_cache_size = 100000
+
 default_format = '{name}{@version}'
 default_format += '{%compiler.name}{@compiler.version}{compiler_flags}'
 default_format += '{variants}{arch=architecture}'
@@ -221,6 +227,7 @@ class ArchSpec(object):
         comprised of three elements: a platform (e.g. Linux), an OS (e.g.
         RHEL6), and a target (e.g. x86_64).
     """
+    __slots__ = ('_platform', '_os', '_target')
 
     # TODO: Formalize the specifications for architectures and then use
     # the appropriate parser here to read these specifications.
@@ -271,7 +278,7 @@ class ArchSpec(object):
             supported Spack platform before it's set to ensure all specs
             refer to valid platforms.
         """
-        value = str(value) if value is not None else None
+        value = intern(str(value)) if value is not None else None
         self._platform = value
 
     @property
@@ -286,7 +293,7 @@ class ArchSpec(object):
             information is only available for the host machine, the platform
             will assumed to be the host machine's platform.
         """
-        value = str(value) if value is not None else None
+        value = intern(str(value)) if value is not None else None
 
         if value in spack.architecture.Platform.reserved_oss:
             curr_platform = str(spack.architecture.platform())
@@ -315,7 +322,7 @@ class ArchSpec(object):
             information is only available for the host machine, the platform
             will assumed to be the host machine's platform.
         """
-        value = str(value) if value is not None else None
+        value = intern(str(value)) if value is not None else None
 
         if value in spack.architecture.Platform.reserved_targets:
             curr_platform = str(spack.architecture.platform())
@@ -423,6 +430,7 @@ class CompilerSpec(object):
     """The CompilerSpec field represents the compiler or range of compiler
        versions that a package should be built with.  CompilerSpecs have a
        name and a version list. """
+    __slots__ = ('name', 'versions')
 
     def __init__(self, *args):
         nargs = len(args)
@@ -510,7 +518,7 @@ class CompilerSpec(object):
     @staticmethod
     def from_dict(d):
         d = d['compiler']
-        return CompilerSpec(d['name'], VersionList.from_dict(d))
+        return CompilerSpec(intern(str(d['name'])), VersionList.from_dict(d))
 
     def __str__(self):
         out = self.name
@@ -538,6 +546,7 @@ class DependencySpec(object):
     - parent: Spec that depends on `spec`.
     - deptypes: list of strings, representing dependency relationships.
     """
+    __slots__ = ('parent', 'spec', 'deptypes')
 
     def __init__(self, parent, spec, deptypes):
         self.parent = parent
@@ -572,6 +581,7 @@ _valid_compiler_flags = [
 
 
 class FlagMap(HashableMap):
+    __slots__ = ('spec',)
 
     def __init__(self, spec):
         super(FlagMap, self).__init__()
@@ -632,6 +642,7 @@ class FlagMap(HashableMap):
 class DependencyMap(HashableMap):
     """Each spec has a DependencyMap containing specs for its dependencies.
        The DependencyMap is keyed by name. """
+    __slots__ = ()
 
     def __str__(self):
         return "{deps: %s}" % ', '.join(str(d) for d in sorted(self.values()))
@@ -899,6 +910,10 @@ class Spec(object):
     #: Cache for spec's prefix, computed lazily in the corresponding property
     _prefix = None
 
+    #: Cache for spec's patches, so that patches fetched for a spec are the
+    #: ones applied to it
+    _patches = None
+
     def __init__(self, spec_like=None,
                  normal=False, concrete=False, external_path=None,
                  external_module=None, full_hash=None):
@@ -1882,8 +1897,6 @@ class Spec(object):
                     changed = True
                 if spec._dup(replacement, deps=False, cleardeps=False):
                     changed = True
-
-                spec._dependencies.owner = spec
                 self_index.update(spec)
                 done = False
                 break
@@ -2590,7 +2603,52 @@ class Spec(object):
                             return True
             return False
 
-        # Otherwise, first thing we care about is whether the name matches
+        if not self._satisfies_node(other, strict=strict):
+            return False
+
+        # If we need to descend into dependencies, do it, otherwise we're done.
+        if deps:
+            deps_strict = strict
+            if self._concrete and not other.name:
+                # We're dealing with existing specs
+                deps_strict = True
+            return self.satisfies_dependencies(other, strict=deps_strict)
+        else:
+            return True
+
+    def _satisfies_node(self, other, strict=False):
+        """Whether the root node of this spec satisfies the constraints of
+        the root node of ``other``, regardless of their dependencies.
+
+        Concretization checks the same pairs of nodes over and over, so
+        results are memoized on snapshots of the compared attributes.
+        """
+        key = (self._satisfies_key(), other._satisfies_key(), strict)
+        result = _satisfies_cache.get(key)
+        if result is None:
+            result = self._check_satisfies_node(other, strict)
+            if len(_satisfies_cache) >= _satisfies_cache_size:
+                _satisfies_cache.clear()
+            _satisfies_cache[key] = result
+        return result
+
+    def _satisfies_key(self):
+        """Immutable snapshot of what ``_satisfies_node()`` reads from this
+        node.  Unlike ``_cmp_node()``, this records the type of variants,
+        which affects how they are satisfied.
+        """
+        compiler, arch = self.compiler, self.architecture
+        return (
+            self.name, self.namespace, self._concrete, tuple(self.versions),
+            (compiler.name, tuple(compiler.versions)) if compiler else None,
+            (arch.platform, arch.os, arch.target) if arch else None,
+            tuple(sorted((name, type(v), v.value)
+                         for name, v in iteritems(self.variants))),
+            tuple(sorted((name, tuple(flags))
+                         for name, flags in iteritems(self.compiler_flags))))
+
+    def _check_satisfies_node(self, other, strict):
+        # First thing we care about is whether the name matches
         if self.name != other.name and self.name and other.name:
             return False
 
@@ -2631,15 +2689,7 @@ class Spec(object):
                 strict=strict):
             return False
 
-        # If we need to descend into dependencies, do it, otherwise we're done.
-        if deps:
-            deps_strict = strict
-            if self._concrete and not other.name:
-                # We're dealing with existing specs
-                deps_strict = True
-            return self.satisfies_dependencies(other, strict=deps_strict)
-        else:
-            return True
+        return True
 
     def satisfies_dependencies(self, other, strict=False):
         """
@@ -2715,6 +2765,9 @@ class Spec(object):
         if 'patches' not in self.variants:
             return []
 
+        if self._patches is not None:
+            return self._patches
+
         # FIXME: _patches_in_order_of_appearance is attached after
         # FIXME: concretization to store the order of patches somewhere.
         # FIXME: Needs to be refactored in a cleaner way.
@@ -2726,6 +2779,7 @@ class Spec(object):
             patch = index.patch_for_package(sha256, self.package)
             patches.append(patch)
 
+        self._patches = patches
         return patches
 
     def _dup(self, other, deps=True, cleardeps=True, caches=None):
@@ -3776,9 +3830,8 @@ class SpecParser(spack.parse.Parser):
     def spec_by_hash(self):
         self.expect(ID)
 
-        specs = spack.store.db.query()
-        matches = [spec for spec in specs if
-                   spec.dag_hash()[:len(self.token.value)] == self.token.value]
+        matches = spack.store.db.get_by_hash(
+            self.token.value, default=[], installed=True)
 
         if not matches:
             raise NoSuchHashError(self.token.value)
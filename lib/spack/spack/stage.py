@@ -7,6 +7,7 @@ import os
 import stat
 import sys
 import errno
+import shutil
 import hashlib
 import tempfile
 import getpass
@@ -23,10 +24,13 @@ import spack.caches
 import spack.config
 import spack.error
 import spack.util.lock
+import spack.util.timeline
 import spack.fetch_strategy as fs
 import spack.util.pattern as pattern
+import spack.util.spack_json as sjson
+from spack.util.executable import which, ProcessError
 from spack.util.path import canonicalize_path
-from spack.util.crypto import prefix_bits, bit_length
+from spack.util.crypto import prefix_bits, bit_length, checksum
 
 _stage_prefix = 'spack-stage-'
 
@@ -57,6 +61,41 @@ def _first_accessible_path(paths):
 _tmp_root = None
 _use_tmp_stage = True
 
+#: Expected ratio of the size of a build to the size of its archive, used
+#: to place stages of archives that were not built before
+expansion_factor = 5
+
+#: Entry of ``misc_cache`` holding the sizes of previous builds
+_sizes_cache_file = 'stage/sizes.json'
+
+#: Manifest of the pristine sources of a stage
+_pristine_manifest_file = '.spack-pristine.json'
+
+
+def _build_stage_paths():
+    candidates = spack.config.get('config:build_stage')
+    if isinstance(candidates, string_types):
+        candidates = [candidates]
+    return candidates
+
+
+def _stage_root(path):
+    """Return the root of stages for the accessible ``build_stage`` path
+    ``path``, or None if it is ``spack.paths.stage_path``."""
+    if path == canonicalize_path(spack.paths.stage_path):
+        return None
+
+    # ensure that any temp path is unique per user, so users don't
+    # fight over shared temporary space.
+    user = getpass.getuser()
+    if user not in path:
+        path = os.path.join(path, user, 'spack-stage')
+    else:
+        path = os.path.join(path, 'spack-stage')
+
+    mkdirp(path)
+    return path
+
 
 def get_tmp_root():
     global _tmp_root, _use_tmp_stage
@@ -65,33 +104,145 @@ def get_tmp_root():
         return None
 
     if _tmp_root is None:
-        candidates = spack.config.get('config:build_stage')
-        if isinstance(candidates, string_types):
-            candidates = [candidates]
-
+        candidates = _build_stage_paths()
         path = _first_accessible_path(candidates)
         if not path:
             raise StageError("No accessible stage paths in %s", candidates)
 
         # Return None to indicate we're using a local staging area.
-        if path == canonicalize_path(spack.paths.stage_path):
+        path = _stage_root(path)
+        if path is None:
             _use_tmp_stage = False
             return None
 
-        # ensure that any temp path is unique per user, so users don't
-        # fight over shared temporary space.
-        user = getpass.getuser()
-        if user not in path:
-            path = os.path.join(path, user, 'spack-stage')
-        else:
-            path = os.path.join(path, 'spack-stage')
-
-        mkdirp(path)
         _tmp_root = path
 
     return _tmp_root
 
 
+def stage_roots():
+    """Roots that stages can be created in, in order of preference.
+
+    These are the roots of all accessible ``build_stage`` paths, where
+    None stands for building directly in ``spack.paths.stage_path``.
+    With a single ``build_stage`` path, this is ``[get_tmp_root()]``.
+    """
+    candidates = _build_stage_paths()
+    if not _use_tmp_stage or len(candidates) < 2:
+        return [get_tmp_root()]
+
+    roots = []
+    for candidate in candidates:
+        path = _first_accessible_path([candidate])
+        if path:
+            root = _stage_root(path)
+            if root not in roots:
+                roots.append(root)
+    if not roots:
+        raise StageError("No accessible stage paths in %s", candidates)
+    return roots
+
+
+def free_space(root):
+    """Space available to unprivileged users under a stage root, in
+    bytes."""
+    try:
+        st = os.statvfs(root or spack.paths.stage_path)
+    except OSError:
+        return 0
+    return st.f_bavail * st.f_frsize
+
+
+def select_stage_root(roots, size=None):
+    """Return the root of ``roots`` to create a stage of ``size`` bytes in.
+
+    This is the first root with at least ``size`` bytes free or, if none
+    has enough space, the root with the most free space.  Without an
+    estimated size, this is the first root.
+    """
+    if size is None or len(roots) < 2:
+        return roots[0]
+
+    best, best_space = None, -1
+    for root in roots:
+        space = free_space(root)
+        if space >= size:
+            return root
+        if space > best_space:
+            best, best_space = root, space
+
+    tty.debug('No stage root has %d bytes free, using %s' % (
+        size, best or spack.paths.stage_path))
+    return best
+
+
+def _read_sizes():
+    """Return a dict from mirror paths to the size of their builds."""
+    cache = spack.caches.misc_cache
+    try:
+        if not cache.init_entry(_sizes_cache_file):
+            return {}
+        with cache.read_transaction(_sizes_cache_file) as f:
+            return sjson.load(f)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot read stage sizes: %s' % e)
+        return {}
+
+
+def recorded_size(mirror_path):
+    """Size of the largest build of the archive at ``mirror_path``, or
+    None if it was not built before."""
+    if not mirror_path:
+        return None
+    return _read_sizes().get(mirror_path)
+
+
+def record_size(mirror_path, size):
+    """Record that a build of the archive at ``mirror_path`` used ``size``
+    bytes, unless a larger build was recorded."""
+    cache = spack.caches.misc_cache
+    try:
+        cache.init_entry(_sizes_cache_file)
+        with cache.write_transaction(_sizes_cache_file) as (old, new):
+            sizes = sjson.load(old) if old else {}
+            sizes[mirror_path] = max(size, sizes.get(mirror_path, 0))
+            sjson.dump(sizes, new)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot write stage sizes: %s' % e)
+
+
+def tree_size(path):
+    """Total size of the files under ``path``, not following links."""
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def copy_tree(src, dest):
+    """Copy the directory ``src`` to ``dest``, which must not exist.
+
+    GNU ``cp --reflink=auto`` is used where available, so that the copy
+    shares its blocks with ``src`` on copy-on-write file systems, e.g.
+    btrfs or XFS, and is a plain copy elsewhere.
+    """
+    cp = which('cp')
+    if cp:
+        try:
+            cp('-R', '-P', '-p', '--reflink=auto', src, dest,
+               output=str, error=str)
+            return
+        except ProcessError:
+            # not GNU cp, fall back to a copy in Python
+            if os.path.lexists(dest):
+                shutil.rmtree(dest, ignore_errors=True)
+    shutil.copytree(src, dest, symlinks=True)
+
+
 class Stage(object):
     """Manages a temporary stage directory for building.
 
@@ -265,14 +416,14 @@ class Stage(object):
 
         # Path looks ok, but need to check the target of the link.
         if os.path.islink(self.path):
-            tmp_root = get_tmp_root()
-            if tmp_root is not None:
+            tmp_roots = [r for r in stage_roots() if r is not None]
+            if tmp_roots:
                 real_path = os.path.realpath(self.path)
-                real_tmp = os.path.realpath(tmp_root)
 
                 # If we're using a tmp dir, it's a link, and it points at the
                 # right spot, then keep it.
-                if (real_path.startswith(real_tmp) and
+                if (any(real_path.startswith(os.path.realpath(r))
+                        for r in tmp_roots) and
                         os.path.exists(real_path)):
                     return False
                 else:
@@ -343,6 +494,7 @@ class Stage(object):
                 return p
         return None
 
+    @spack.util.timeline.timed('fetch', 'stage')
     def fetch(self, mirror_only=False):
         """Downloads an archive or checks out code from a repository."""
         fetchers = []
@@ -417,6 +569,7 @@ class Stage(object):
             self.fetcher = self.default_fetcher
             raise fs.FetchError(err_msg, None)
 
+    @spack.util.timeline.timed('checksum', 'stage')
     def check(self):
         """Check the downloaded archive against a checksum digest.
            No-op if this stage checks code out of a repository."""
@@ -431,28 +584,176 @@ class Stage(object):
         elif spack.config.get('config:checksum'):
             self.fetcher.check()
 
+    @spack.util.timeline.timed('cache source', 'stage')
     def cache_local(self):
         spack.caches.fetch_cache.store(self.fetcher, self.mirror_path)
 
         if spack.caches.mirror_cache:
             spack.caches.mirror_cache.store(self.fetcher, self.mirror_path)
 
+    @spack.util.timeline.timed('expand', 'stage')
     def expand_archive(self):
         """Changes to the stage directory and attempt to expand the downloaded
         archive.  Fail if the stage is not set up or if the archive is not yet
         downloaded."""
         archive_dir = self.source_path
         if not archive_dir:
-            self.fetcher.expand()
+            if not self._copy_pristine():
+                self.fetcher.expand()
+                self._save_pristine()
             tty.msg("Created stage in %s" % self.path)
         else:
             tty.msg("Already staged %s in %s" % (self.name, self.path))
 
     def restage(self):
         """Removes the expanded archive path if it exists, then re-expands
-           the archive.
+           the archive, or copies its pristine sources if they were kept.
+        """
+        if self._pristine_is_valid():
+            for filename in os.listdir(self.path):
+                path = os.path.join(self.path, filename)
+                if path != self.archive_file:
+                    shutil.rmtree(path, ignore_errors=True)
+            self._copy_pristine()
+        else:
+            self.fetcher.reset()
+            self._save_pristine()
+
+    @property
+    def pristine_path(self):
+        """Directory of the pristine expanded sources of this stage.
+
+        It lies next to the stage directory, in the same stage root, so
+        that it survives restages and can be copied cheaply."""
+        return os.path.join(os.path.dirname(os.path.realpath(self.path)),
+                            self.name + '.pristine')
+
+    def _pristine_digest(self):
+        """Digest of the archive whose pristine sources can be kept, or
+        None if they are not kept for this stage."""
+        if not spack.config.get('config:stage_pristine', False):
+            return None
+        fetcher = self.fetcher
+        if not (isinstance(fetcher, fs.URLFetchStrategy) and
+                fetcher.expand_archive):
+            return None
+        return fetcher.digest
+
+    def _pristine_is_valid(self):
+        """Whether the pristine sources were expanded from the archive of
+        this stage and are unchanged.
+
+        The manifest of the pristine sources holds the digest of their
+        archive and the checksum of each of their files, so sources that
+        were partially removed, e.g. by a cleaner of ``/tmp``, or modified
+        in place are not used."""
+        digest = self._pristine_digest()
+        manifest = os.path.join(self.pristine_path, _pristine_manifest_file)
+        if not digest or not os.path.isfile(manifest):
+            return False
+        try:
+            with open(manifest) as f:
+                expected = sjson.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        return expected == self._pristine_manifest(digest)
+
+    def _pristine_manifest(self, digest):
+        """Digest of the archive, and sha256 of each pristine file (or
+        target of each symbolic link, or None for other entries), by path
+        relative to the pristine sources."""
+        manifest_path = os.path.join(
+            self.pristine_path, _pristine_manifest_file)
+        entries = {}
+        for dirpath, dirnames, filenames in os.walk(self.pristine_path):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                if path == manifest_path:
+                    continue
+                mode = os.lstat(path).st_mode
+                if stat.S_ISLNK(mode):
+                    entry = 'link:' + os.readlink(path)
+                elif stat.S_ISREG(mode):
+                    entry = checksum(hashlib.sha256, path)
+                else:
+                    entry = None
+                entries[os.path.relpath(path, self.pristine_path)] = entry
+        return {'digest': digest, 'files': entries}
+
+    def _copy_pristine(self):
+        """Copy the pristine sources into the stage, if they are valid.
+
+        Returns:
+            True if the sources were copied, False otherwise
+        """
+        if not self._pristine_is_valid():
+            return False
+        tty.msg("Copying pristine sources of %s" % self.name)
+        for filename in os.listdir(self.pristine_path):
+            if filename != _pristine_manifest_file:
+                copy_tree(os.path.join(self.pristine_path, filename),
+                          os.path.join(self.path, filename))
+        return True
+
+    def _save_pristine(self):
+        """Keep a copy of the freshly expanded sources of this stage."""
+        digest = self._pristine_digest()
+        if not digest:
+            return
+
+        remove_linked_tree(self.pristine_path)
+        tmp = '%s.%d.tmp' % (self.pristine_path, os.getpid())
+        try:
+            mkdirp(tmp)
+            for filename in os.listdir(self.path):
+                path = os.path.join(self.path, filename)
+                if path != self.archive_file:
+                    copy_tree(path, os.path.join(tmp, filename))
+            os.rename(tmp, self.pristine_path)
+            with open(os.path.join(self.pristine_path,
+                                   _pristine_manifest_file), 'w') as f:
+                sjson.dump(self._pristine_manifest(digest), f)
+        except (IOError, OSError, ValueError, ProcessError) as e:
+            tty.debug('Cannot keep pristine sources: %s' % e)
+            for path in (tmp, self.pristine_path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def estimated_size(self):
+        """Estimate of the space a build in this stage needs, in bytes, or
+        None if it is unknown.
+
+        This is the size recorded for previous builds of the archive of
+        this stage, or else a multiple of the size of the archive, when it
+        is in the stage or in the fetch cache.
+        """
+        size = recorded_size(self.mirror_path)
+        if size is not None:
+            return size
+
+        archive = self.archive_file
+        if not archive:
+            digest = getattr(self.fetcher, 'digest', None)
+            if digest and len(digest) == 64:
+                archive = spack.caches.fetch_cache.verified_object(digest)
+        if archive:
+            return expansion_factor * os.path.getsize(archive)
+        return None
+
+    def _select_stage_root(self):
+        """Root to create this stage in, among ``stage_roots()``.
+
+        Stages go to the root holding their pristine sources, if any, and
+        otherwise to a root with enough space for their estimated size.
         """
-        self.fetcher.reset()
+        roots = stage_roots()
+        if len(roots) < 2:
+            return roots[0]
+        for root in roots:
+            pristine = os.path.join(root or spack.paths.stage_path,
+                                    self.name + '.pristine')
+            if os.path.isdir(pristine):
+                return root
+        return select_stage_root(roots, self.estimated_size())
 
     def create(self):
         """Creates the stage directory.
@@ -470,7 +771,7 @@ class Stage(object):
         # If a tmp_root exists then create a directory there and then link it
         # in the stage area, otherwise create the stage directory in self.path
         if self._need_to_create_path():
-            tmp_root = get_tmp_root()
+            tmp_root = self._select_stage_root()
             if tmp_root is not None:
                 # tempfile.mkdtemp already sets mode 0700
                 tmp_dir = tempfile.mkdtemp('', _stage_prefix, tmp_root)
@@ -483,8 +784,22 @@ class Stage(object):
         ensure_access(self.path)
         self.created = True
 
-    def destroy(self):
-        """Removes this stage directory."""
+    def destroy(self, keep_pristine=False):
+        """Removes this stage directory.
+
+        Args:
+            keep_pristine (bool): keep the pristine sources of the stage,
+                e.g. to restage it faster
+        """
+        # Record the size of the build to place later stages.  This scans
+        # the whole stage, so only do it when there is a choice of roots.
+        if (self.mirror_path and os.path.isdir(self.path) and
+                len(stage_roots()) > 1):
+            record_size(self.mirror_path, tree_size(
+                os.path.realpath(self.path)))
+
+        if not keep_pristine:
+            remove_linked_tree(self.pristine_path)
         remove_linked_tree(self.path)
 
         # Make sure we don't end up in a removed directory
@@ -625,7 +940,7 @@ class DIYStage(object):
     def create(self):
         self.created = True
 
-    def destroy(self):
+    def destroy(self, keep_pristine=False):
         # No need to destroy DIY stage.
         pass
 
@@ -652,6 +967,13 @@ def purge():
             stage_path = os.path.join(spack.paths.stage_path, stage_dir)
             remove_linked_tree(stage_path)
 
+    # Pristine sources of stages in temporary roots
+    for root in stage_roots():
+        if root is not None and os.path.isdir(root):
+            for name in os.listdir(root):
+                if name.endswith('.pristine'):
+                    remove_linked_tree(os.path.join(root, name))
+
 
 class StageError(spack.error.SpackError):
     """"Superclass for all errors encountered during staging."""
@@ -63,9 +63,9 @@ class Store(object):
         self.layout = spack.directory_layout.YamlDirectoryLayout(
             root, hash_len=hash_length, path_scheme=path_scheme)
 
-    def reindex(self):
+    def reindex(self, jobs=None):
         """Convenience function to reindex the store DB with its own layout."""
-        return self.db.reindex(self.layout)
+        return self.db.reindex(self.layout, jobs=jobs)
 
 
 def _store():
@@ -97,15 +97,40 @@ def retrieve_upstream_dbs():
     return _construct_upstream_dbs_from_install_roots(install_roots)
 
 
+#: Upstream databases read in this process, by install root.  Values are
+#: the database, and the stat of its index when it was read.
+_upstream_dbs = {}
+
+
+def _index_stat(db):
+    try:
+        st = os.stat(db._index_path)
+        return st.st_size, st.st_mtime
+    except OSError:
+        return None
+
+
 def _construct_upstream_dbs_from_install_roots(
         install_roots, _test=False):
     accumulated_upstream_dbs = []
     for install_root in reversed(install_roots):
         upstream_dbs = list(accumulated_upstream_dbs)
-        next_db = spack.database.Database(
-            install_root, is_upstream=True, upstream_dbs=upstream_dbs)
-        next_db._fail_when_missing_deps = _test
-        next_db._read()
+
+        # Reuse the database read for another store, unless its index or
+        # its own upstream databases changed since.
+        key = (install_root, _test)
+        next_db, stat = _upstream_dbs.get(key, (None, None))
+        if (next_db is None or _index_stat(next_db) != stat or
+                len(next_db.upstream_dbs) != len(upstream_dbs) or
+                any(a is not b for a, b in
+                    zip(next_db.upstream_dbs, upstream_dbs))):
+            next_db = spack.database.Database(
+                install_root, is_upstream=True, upstream_dbs=upstream_dbs)
+            next_db._fail_when_missing_deps = _test
+            stat = _index_stat(next_db)
+            next_db._read()
+            _upstream_dbs[key] = (next_db, stat)
+
         accumulated_upstream_dbs.insert(0, next_db)
 
     return accumulated_upstream_dbs
@@ -7,9 +7,12 @@
 This test checks that the Spack cc compiler wrapper is parsing
 arguments correctly.
 """
+import datetime
 import os
 import pytest
 
+import spack.compile_cache
+from spack.build_environment import wrapper_arguments
 from spack.paths import build_env_path
 from spack.util.environment import system_dirs, set_env
 from spack.util.executable import Executable
@@ -463,6 +466,84 @@ def test_ld_deps_partial():
             test_args_without_paths)
 
 
+def precomputed_args(include_dirs, link_dirs, rpath_dirs, extra_rpaths):
+    """Environment with the arguments that spack.build_environment
+    computes for the wrapper, and the variables they are computed from.
+    """
+    env = wrapper_arguments(
+        include_dirs, link_dirs, rpath_dirs, extra_rpaths,
+        dict((lang, '-Wl,-rpath,') for lang in ('CC', 'CXX', 'F77', 'FC')))
+    env.update(SPACK_INCLUDE_DIRS=':'.join(include_dirs),
+               SPACK_LINK_DIRS=':'.join(link_dirs),
+               SPACK_RPATH_DIRS=':'.join(rpath_dirs),
+               SPACK_COMPILER_EXTRA_RPATHS=':'.join(extra_rpaths))
+    return env
+
+
+@pytest.mark.parametrize('wrapper,args', [
+    (cc, test_args),
+    (cc, ['-c'] + test_args),
+    (cpp, test_args),
+    (ld, test_args),
+    (ld, ['-r'] + test_args),
+    (fc, test_args),
+])
+def test_precomputed_args(wrapper, args):
+    """Ensure the wrapper gives the same command line with arguments
+    precomputed by Spack, and ignores them if they are out of date.
+    """
+    env = precomputed_args(
+        ['xinc', 'yinc'], ['xlib', 'ylib'], ['xlib', 'zlib'], ['/extra'])
+    with set_env(SPACK_SHORT_SPEC='foo@1.2=darwin-x86_64',
+                 SPACK_TEST_COMMAND='dump-args'):
+        with set_env(**env):
+            precomputed = wrapper(*args, output=str)
+        with set_env(SPACK_INCLUDE_DIRS=env['SPACK_INCLUDE_DIRS'],
+                     SPACK_LINK_DIRS=env['SPACK_LINK_DIRS'],
+                     SPACK_RPATH_DIRS=env['SPACK_RPATH_DIRS'],
+                     SPACK_COMPILER_EXTRA_RPATHS='/extra'):
+            computed = wrapper(*args, output=str)
+        assert precomputed == computed
+        assert '-I/extra' not in computed
+
+        # e.g. a package changed the include directories after setup
+        with set_env(**env):
+            with set_env(SPACK_INCLUDE_DIRS='winc'):
+                outdated = wrapper(*args, output=str)
+        assert outdated == computed.replace(
+            '-Ixinc\n-Iyinc\n', '-Iwinc\n')
+
+
+@pytest.mark.maybeslow
+def test_wrapper_overhead_benchmark():
+    """Time calls of the compiler wrapper for a package with many
+    dependencies, with and without precomputed arguments.
+    """
+    ndeps, ncalls = 100, 50
+    env = precomputed_args(
+        ['/deps/%d/include' % i for i in range(ndeps)],
+        ['/deps/%d/lib' % i for i in range(ndeps)],
+        ['/deps/%d/lib' % i for i in range(ndeps)], [])
+    computed = dict((k, v) for k, v in env.items()
+                    if not k.endswith('_ARGS') and not k.endswith('_KEY'))
+
+    def time_calls(args):
+        start = datetime.datetime.now()
+        for i in range(ncalls):
+            cc(*args, output=str)
+        elapsed = (datetime.datetime.now() - start).total_seconds()
+        return 1000 * elapsed / ncalls
+
+    print('\nwrapper overhead with %d dependencies (ms/call):' % ndeps)
+    with set_env(SPACK_TEST_COMMAND='dump-args'):
+        for label, variables in (('precomputed', env),
+                                 ('computed', computed)):
+            with set_env(**variables):
+                print('  %-12s compile %.2f, link %.2f' % (
+                    label, time_calls(['-c'] + test_args),
+                    time_calls(test_args)))
+
+
 def test_ccache_prepend_for_cc():
     with set_env(SPACK_CCACHE_BINARY='ccache'):
         os.environ['SPACK_SHORT_SPEC'] = "foo@1.2=linux-x86_64"
@@ -506,3 +587,81 @@ def test_no_ccache_prepend_for_fc():
         test_library_paths +
         test_wl_rpaths +
         test_args_without_paths)
+
+
+#: A compiler that "preprocesses" a source by printing it after a line
+#: marker, and "compiles" it by copying it to the object file
+fake_compiler = """#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -E) preprocess=1 ;;
+        -o) shift; output="$1" ;;
+        -*) ;;
+        *) source="$1" ;;
+    esac
+    shift
+done
+if [ -n "$preprocess" ]; then
+    echo "# 1 \\"$source\\""
+    cat "$source"
+    exit
+fi
+echo "$source" >> %s
+echo "warning: compiling $source" >&2
+cat "$source" > "$output"
+"""
+
+
+@pytest.fixture()
+def compile_cache(tmpdir):
+    """Compile with a fake compiler, and return the sources compiled."""
+    log = tmpdir.join('compiled.log')
+    log.write('')
+    compiler = tmpdir.join('fake-cc')
+    compiler.write(fake_compiler % log)
+    compiler.chmod(0o755)
+
+    def compile(stage, *args):
+        stage = tmpdir.join(stage)
+        source = stage.ensure('src', 'foo.c')
+        if not source.read():
+            source.write('int foo;\n')
+        sed = spack.compile_cache.canonicalize_script(
+            [(str(stage), 'stage')])
+        with set_env(SPACK_COMPILE_CACHE_SED=sed):
+            err = cc('-c', '-I%s' % stage.join('include'), str(source),
+                     '-o', str(stage.join('foo.o')), *args,
+                     output=str, error=str)
+        assert 'warning: compiling' in err
+        assert stage.join('foo.o').read() == source.read()
+        return log.read().split()
+
+    with set_env(SPACK_CC=str(compiler),
+                 SPACK_COMPILE_CACHE_DIR=str(tmpdir.join('cache')),
+                 SPACK_COMPILE_CACHE_ID='gcc@4.4.7'):
+        yield compile
+
+
+def test_compile_cache(compile_cache, tmpdir):
+    foo = [str(tmpdir.join('stage-1', 'src', 'foo.c'))]
+    assert compile_cache('stage-1') == foo
+
+    # The same source compiled in another stage is not compiled again
+    bar = [str(tmpdir.join('stage-2', 'src', 'foo.c'))]
+    assert compile_cache('stage-2') == foo
+
+    # Changed sources and arguments are compiled
+    tmpdir.join('stage-2', 'src', 'foo.c').write('int bar;\n')
+    assert compile_cache('stage-2') == foo + bar
+    assert compile_cache('stage-2', '-O2') == foo + bar * 2
+    assert compile_cache('stage-2', '-O2') == foo + bar * 2
+
+    with set_env(SPACK_COMPILE_CACHE_ID='gcc@4.9.0'):
+        assert compile_cache('stage-2', '-O2') == foo + bar * 3
+
+
+def test_compile_cache_skips_other_outputs(compile_cache, tmpdir):
+    foo = str(tmpdir.join('stage', 'src', 'foo.c'))
+    assert compile_cache('stage', '-MD') == [foo]
+    assert compile_cache('stage', '-MD') == [foo] * 2
+    assert not tmpdir.join('cache').check()
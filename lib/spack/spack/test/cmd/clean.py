@@ -52,3 +52,26 @@ def test_function_calls(command_line, counters):
     assert spack.stage.purge.call_count == counters[1]
     assert spack.caches.fetch_cache.destroy.call_count == counters[2]
     assert spack.caches.misc_cache.destroy.call_count == counters[3]
+
+
+@pytest.mark.usefixtures(
+    'mock_packages', 'config', 'mock_calls_for_clean'
+)
+@pytest.mark.parametrize('command_line,max_size,max_age', [
+    (['-d', '--max-size', '2G'], 2 * 1024 ** 3, None),
+    (['--fetch-cache', '--max-age', '7'], None, 7 * 24 * 3600),
+    (['--max-size', '512M', '--max-age', '0.5'], 512 * 1024 ** 2, 43200),
+])
+def test_evict_fetch_cache(monkeypatch, command_line, max_size, max_age):
+    calls = []
+
+    def evict(*args):
+        calls.append(args)
+        return [('archive.tar.gz', 1024)]
+    monkeypatch.setattr(
+        spack.caches.fetch_cache, 'evict', evict, raising=False)
+
+    clean(*command_line)
+    assert calls == [(max_size, max_age)]
+    assert spack.caches.fetch_cache.destroy.call_count == 0
+    assert spack.stage.purge.call_count == 0
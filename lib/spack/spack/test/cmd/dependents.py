@@ -43,7 +43,8 @@ def test_immediate_installed_dependents(mock_packages, database):
                     for s in ['dyninst', 'libdwarf']])
 
     libelf = spack.store.db.query_one('libelf')
-    expected = set([d.dag_hash(7) for d in libelf.dependents()])
+    expected = set([d.dag_hash(7) for d in spack.store.db.installed_relatives(
+        libelf, 'parents', transitive=False)])
 
     assert expected == hashes
 
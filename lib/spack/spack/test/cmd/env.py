@@ -10,6 +10,7 @@ import pytest
 
 import llnl.util.filesystem as fs
 
+import spack.filesystem_view
 import spack.modules
 import spack.environment as ev
 from spack.cmd.env import _env_create
@@ -773,6 +774,81 @@ def test_env_updates_view_force_remove(
             os.listdir(str(view_dir.join('.spack'))) == ['projections.yaml'])
 
 
+def test_env_view_manifest(
+    tmpdir, mock_stage, mock_fetch, install_mockery
+):
+    view_dir = tmpdir.mkdir('view')
+    env('create', '--with-view=%s' % view_dir, 'test')
+    with ev.read('test'):
+        install('--fake', 'mpileaks')
+
+    assert os.path.exists(str(view_dir.join('.spack/manifest.json')))
+
+    e = ev.read('test')
+    view = e.view()
+    mpileaks = Spec('mpileaks').concretized()
+    assert view.get_all_hashes() == set(
+        s.dag_hash() for s in mpileaks.traverse(deptype=('link', 'run')))
+
+    # the manifest records the files linked for each spec
+    manifest = view.manifest
+    linked = str(view_dir.join('bin', 'mpileaks'))
+    assert manifest.owner(linked) == mpileaks.dag_hash()
+    assert manifest.is_dir(str(view_dir.join('bin')))
+
+
+def test_env_view_update_is_incremental(
+    tmpdir, mock_stage, mock_fetch, install_mockery, monkeypatch
+):
+    view_dir = tmpdir.mkdir('view')
+    env('create', '--with-view=%s' % view_dir, 'test')
+    with ev.read('test'):
+        install('--fake', 'mpileaks')
+
+    merged = []
+    original_merge = spack.filesystem_view.YamlFilesystemView.merge
+
+    def merge(view, spec, ignore=None):
+        merged.append(spec.name)
+        return original_merge(view, spec, ignore=ignore)
+
+    monkeypatch.setattr(
+        spack.filesystem_view.YamlFilesystemView, 'merge', merge)
+
+    # only the newly installed spec is merged into the view
+    with ev.read('test'):
+        install('--fake', 'trivial-install-test-package')
+    assert merged == ['trivial-install-test-package']
+    assert os.path.exists(
+        str(view_dir.join('.spack/trivial-install-test-package')))
+
+    # and only the removed spec is unmerged from it
+    with ev.read('test'):
+        remove('-f', 'trivial-install-test-package')
+    assert not os.path.exists(
+        str(view_dir.join('.spack/trivial-install-test-package')))
+    assert os.path.exists(str(view_dir.join('.spack/mpileaks')))
+    assert os.path.exists(str(view_dir.join('bin', 'mpileaks')))
+
+
+def test_env_view_manifest_rebuilt_for_old_views(
+    tmpdir, mock_stage, mock_fetch, install_mockery
+):
+    view_dir = tmpdir.mkdir('view')
+    env('create', '--with-view=%s' % view_dir, 'test')
+    with ev.read('test'):
+        install('--fake', 'mpileaks')
+
+    # views created before manifests existed don't have one
+    view_dir.join('.spack', 'manifest.json').remove()
+
+    view = ev.read('test').view()
+    mpileaks = Spec('mpileaks').concretized()
+    assert mpileaks.dag_hash() in view.get_all_hashes()
+    assert view.manifest.owner(
+        str(view_dir.join('bin', 'mpileaks'))) == mpileaks.dag_hash()
+
+
 def test_env_activate_view_fails(
     tmpdir, mock_stage, mock_fetch, install_mockery
 ):
@@ -135,3 +135,54 @@ def test_gpg(gpg, tmpdir, testing_gpg_directory):
 
     # Verification should now succeed again.
     gpg('verify', str(test_path))
+
+
+def test_signing_keys_are_listed_once(monkeypatch, testing_gpg_directory):
+    calls = []
+
+    def fake_gpg(*args, **kwargs):
+        calls.append(args)
+        return 'sec::4096\nfpr:::::::::ABCDEF:\n'
+    monkeypatch.setattr(gpg_util.Gpg, 'gpg', staticmethod(lambda: fake_gpg))
+
+    assert gpg_util.Gpg.signing_keys() == ['ABCDEF']
+    assert gpg_util.Gpg.signing_keys() == ['ABCDEF']
+    assert len(calls) == 1
+
+    # Changing the keyring lists the keys again
+    gpg_util.Gpg.trust('first.key', 'second.key')
+    assert calls[-1] == ('--import', 'first.key', 'second.key')
+    assert gpg_util.Gpg.signing_keys() == ['ABCDEF']
+    assert len(calls) == 3
+
+
+def test_verification_in_background():
+    def good_gpg(*args):
+        assert args == ('--verify', 'file.asc', 'file')
+
+    def bad_gpg(*args):
+        raise ProcessError('Command exited with status 1:')
+
+    gpg_util.Verification(good_gpg, 'file.asc', 'file').wait()
+    with pytest.raises(ProcessError):
+        gpg_util.Verification(bad_gpg, 'file.asc', 'file').wait()
+
+
+@pytest.mark.maybeslow
+@pytest.mark.skipif(not has_gnupg2(),
+                    reason='These tests require gnupg2')
+def test_start_verify(gpg, tmpdir, testing_gpg_directory):
+    gpg('create', 'Spack testing', 'spack@googlegroups.com')
+    keyfp = gpg_util.Gpg.signing_keys()[0]
+
+    test_path = tmpdir.join('to-sign.txt')
+    test_path.write('Test content for signing.\n')
+    signature = str(test_path) + '.asc'
+    gpg_util.Gpg.sign(keyfp, str(test_path), signature)
+
+    gpg_util.Gpg.start_verify(signature, str(test_path)).wait()
+
+    test_path.write('Tampered content.\n')
+    verification = gpg_util.Gpg.start_verify(signature, str(test_path))
+    with pytest.raises(ProcessError):
+        verification.wait()
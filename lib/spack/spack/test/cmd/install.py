@@ -6,6 +6,7 @@
 import argparse
 import os
 import filecmp
+import json
 import re
 from six.moves import builtins
 import time
@@ -423,6 +424,31 @@ def test_extra_files_are_archived(mock_packages, mock_archive, mock_fetch,
     assert os.path.exists(errors_txt)
 
 
+def test_install_timeline(tmpdir, mock_packages, mock_archive, mock_fetch,
+                          config, install_mockery):
+    timeline = str(tmpdir.join('timeline.json'))
+    install('--timeline', timeline, 'libdwarf')
+
+    with open(timeline) as f:
+        events = json.load(f)['traceEvents']
+    spans = [e for e in events if e['ph'] == 'X']
+    names = set(e['name'] for e in spans)
+
+    # builds are recorded by the forked build processes, and merged
+    assert set(['install libelf', 'install libdwarf', 'fetch',
+                'install']) <= names
+    build_pids = set(e['pid'] for e in spans if e['cat'] == 'phase')
+    assert build_pids and os.getpid() not in build_pids
+
+    # each installation keeps its own part of the timeline
+    s = Spec('libdwarf').concretized()
+    with open(spack.store.layout.build_timeline_path(s)) as f:
+        own_events = json.load(f)['traceEvents']
+    own_names = set(e['name'] for e in own_events)
+    assert 'install libdwarf' in own_names
+    assert 'install libelf' not in own_names
+
+
 @pytest.mark.disable_clean_stage_check
 def test_cdash_report_concretization_error(tmpdir, mock_fetch, install_mockery,
                                            capfd, conflict_spec):
@@ -36,6 +36,21 @@ def test_view_link_type(
     assert os.path.islink(package_prefix) == (not cmd.startswith('hard'))
 
 
+@pytest.mark.parametrize('cmd', ['hardlink', 'copy'])
+def test_view_remove_hardlink_and_copy(
+        tmpdir, mock_packages, mock_archive, mock_fetch, config,
+        install_mockery, cmd):
+    install('libdwarf')
+    viewpath = str(tmpdir.mkdir('view_{0}'.format(cmd)))
+    view(cmd, viewpath, 'libdwarf')
+    package_prefix = os.path.join(viewpath, 'libdwarf')
+    assert os.path.isfile(package_prefix)
+    assert not os.path.islink(package_prefix)
+
+    view('remove', viewpath, 'libdwarf')
+    assert not os.path.exists(package_prefix)
+
+
 @pytest.mark.parametrize('cmd', ['hardlink', 'symlink', 'hard', 'add'])
 def test_view_projections(
         tmpdir, mock_packages, mock_archive, mock_fetch, config,
@@ -0,0 +1,89 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for the shared cache of object files of the compiler wrapper."""
+import os
+import time
+
+import pytest
+
+import spack.build_environment
+import spack.compile_cache
+import spack.config
+import spack.spec
+from spack.util.environment import EnvironmentModifications
+from spack.util.executable import which
+
+
+@pytest.mark.skipif(not which('sed'), reason='requires sed')
+def test_canonicalize_script(tmpdir):
+    script = spack.compile_cache.canonicalize_script([
+        ('/opt/spack/foo-1.0+x', 'foo'),
+        ('/opt/spack/foo-1.0+x/lib/bar', 'bar'),
+        ('/tmp/stage/', 'stage')])
+
+    def canonical(text):
+        path = tmpdir.join('text')
+        path.write(text + '\n')
+        return which('sed')(script, str(path), output=str).strip()
+
+    assert canonical('-I/opt/spack/foo-1.0+x/include') == '-I@foo@/include'
+    assert canonical('/opt/spack/foo-1.0+x/lib/bar/a.h') == '@bar@/a.h'
+    assert canonical('/opt/spack/foo-1.0_x/a.h') == '/opt/spack/foo-1.0_x/a.h'
+    assert canonical('/tmp/stage/src') == '@stage@/src'
+
+
+def test_trim(tmpdir):
+    now = time.time()
+    for i, size in enumerate([1000, 2000, 3000]):
+        obj = tmpdir.ensure('ab', 'object-%d.o' % i)
+        obj.write('x' * size)
+        os.utime(str(obj), (now - i * 100, now - i * 100))
+    tmpdir.join('ab', 'object-0.err').write('x' * 500)
+
+    # the least recently used objects go first, with their diagnostics
+    removed = spack.compile_cache.trim(str(tmpdir), size=4000)
+    assert removed == [str(tmpdir.join('ab', 'object-2.o'))]
+
+    removed = spack.compile_cache.trim(str(tmpdir), size=2000)
+    assert removed == [str(tmpdir.join('ab', 'object-1.o'))]
+    assert sorted(os.listdir(str(tmpdir.join('ab')))) == \
+        ['object-0.err', 'object-0.o']
+
+
+def test_max_size(config):
+    assert spack.compile_cache.max_size() == 5 * 1024 ** 3
+    with spack.config.override('config:compile_cache_size', '500M'):
+        assert spack.compile_cache.max_size() == 500 * 1024 ** 2
+    with spack.config.override('config:compile_cache_size', 1000):
+        assert spack.compile_cache.max_size() == 1000
+
+
+def test_compile_cache_environment(config, mock_packages, working_env,
+                                   tmpdir):
+    spec = spack.spec.Spec('dt-diamond')
+    spec.concretize()
+    pkg = spec.package
+
+    def wrapper_environment():
+        env = EnvironmentModifications()
+        spack.build_environment.set_build_environment_variables(
+            pkg, env, dirty=False)
+        env.apply_modifications()
+        return os.environ
+
+    assert 'SPACK_COMPILE_CACHE_DIR' not in wrapper_environment()
+
+    cache_dir = str(tmpdir.join('cache'))
+    with spack.config.override(
+            'config', {'compile_cache': True, 'compile_cache_dir': cache_dir}):
+        env = wrapper_environment()
+
+    assert env['SPACK_COMPILE_CACHE_DIR'] == cache_dir
+    assert str(spec.compiler) in env['SPACK_COMPILE_CACHE_ID']
+    script = env['SPACK_COMPILE_CACHE_SED']
+    for placeholder in ('@stage@', '@prefix@', '@dt-diamond-left@',
+                        '@dt-diamond-bottom@'):
+        assert placeholder in script
@@ -10,6 +10,7 @@ import sys
 from copy import copy
 from six import iteritems
 
+import spack.caches
 import spack.spec
 import spack.compiler
 import spack.compilers as compilers
@@ -24,6 +25,7 @@ import spack.compilers.pgi
 import spack.compilers.xl
 import spack.compilers.xl_r
 import spack.compilers.fj
+import spack.util.file_cache
 
 from spack.compiler import Compiler
 
@@ -87,6 +89,58 @@ def test_version_detection_is_empty(
     assert error == expected_error
 
 
+@pytest.fixture()
+def detection_cache(tmpdir, monkeypatch):
+    """Stores the versions of detected compilers in a temporary
+    misc_cache.
+    """
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    return cache
+
+
+def test_find_compilers_uses_detection_cache(
+        config, tmpdir, monkeypatch, detection_cache):
+    bin_dir = tmpdir.mkdir('bin')
+    gcc = bin_dir.join('gcc')
+    gcc.write('#!/bin/sh\n')
+    gcc.chmod(0o755)
+
+    version = ['4.9']
+    gcc_cls = compilers.class_for_compiler_name('gcc')
+    monkeypatch.setattr(
+        gcc_cls, 'cc_version', staticmethod(lambda x: version[0]))
+
+    detected = []
+    detect_version = compilers.detect_version
+
+    def _detect_version(args):
+        detected.append(args.path)
+        return detect_version(args)
+    monkeypatch.setattr(compilers, 'detect_version', _detect_version)
+
+    def find():
+        del detected[:]
+        return set(str(c.spec) for c in
+                   compilers.find_compilers(str(bin_dir)))
+
+    # The executable is run once, even if several OSes look for it
+    assert find() == set(['gcc@4.9'])
+    assert detected == [str(gcc)]
+
+    # The second time, its version comes from the cache
+    assert find() == set(['gcc@4.9'])
+    assert detected == []
+
+    # Modified executables are detected again, and failures are cached
+    version[0] = None
+    gcc.write('#!/bin/sh\n# updated\n')
+    assert find() == set()
+    assert detected == [str(gcc)]
+    assert find() == set()
+    assert detected == []
+
+
 def test_compiler_flags_from_config_are_grouped():
     compiler_entry = {
         'spec': 'intel@17.0.2',
@@ -189,6 +189,15 @@ def mock_fetch_cache(monkeypatch):
         def fetcher(self, target_path, digest, **kwargs):
             return MockCacheFetcher()
 
+        def git_mirror_path(self, url):
+            return None
+
+        def verified_object(self, sha256):
+            return None
+
+        def store_file(self, path, sha256):
+            return path
+
     class MockCacheFetcher(object):
         def set_stage(self, stage):
             pass
@@ -9,6 +9,7 @@ both in memory and in its file
 """
 import datetime
 import functools
+import hashlib
 import multiprocessing
 import os
 import pytest
@@ -19,6 +20,7 @@ from llnl.util.tty.colify import colify
 import spack.repo
 import spack.store
 import spack.database
+import spack.database_snapshot
 import spack.spec
 from spack.test.conftest import MockPackage, MockPackageMultiRepo
 from spack.util.executable import Executable
@@ -200,6 +202,77 @@ def test_recursive_upstream_dbs(tmpdir_factory, test_store, gen_mock_layout):
         assert not dbs[2].installed_relatives(spec['z'], direction='parents')
 
 
+@pytest.fixture()
+def upstream_layers(tmpdir_factory, gen_mock_layout):
+    """Three install roots, for databases where each root is an upstream of
+    the previous one, with the DAG of package x (x -> y -> z).  y and z are
+    installed in the second root, and z in the third.
+    """
+    roots = [str(tmpdir_factory.mktemp(x)) for x in ['a', 'b', 'c']]
+    layouts = [gen_mock_layout(x) for x in ['/la/', '/lb/', '/lc/']]
+
+    default = ('build', 'link')
+    z = MockPackage('z', [], [])
+    y = MockPackage('y', [z], [default])
+    x = MockPackage('x', [y], [default])
+    w = MockPackage('w', [], [])
+    mock_repo = MockPackageMultiRepo([w, x, y, z])
+
+    with spack.repo.swap(mock_repo):
+        spec = spack.spec.Spec('x')
+        spec.concretize()
+        spack.database.Database(roots[2]).add(spec['z'], layouts[2])
+        spack.database.Database(roots[1]).add(spec['y'], layouts[1])
+
+        yield roots, layouts, spec
+
+
+@pytest.mark.usefixtures('config')
+def test_query_across_upstream_dbs(upstream_layers):
+    roots, layouts, spec = upstream_layers
+    db_c = spack.database.Database(roots[2])
+    db_b = spack.database.Database(roots[1], upstream_dbs=[db_c])
+    db_c._read()
+    db_b._read()
+    db = spack.database.Database(roots[0], upstream_dbs=[db_b, db_c])
+    db.add(spec, layouts[0])
+
+    # z is in both upstream databases, and is taken from the first one
+    z_hash = spec['z'].dag_hash()
+    assert db.db_for_spec_hash(z_hash) is db_b
+    assert db.query_by_spec_hash(z_hash) == (True, db_b._data[z_hash])
+    assert db._upstreams.hashes_for_name('z') == [z_hash]
+
+    assert db.query() == sorted([spec, spec['y'], spec['z']])
+    assert db.query('z') == [spec['z']]
+    assert db.query('y', installed=False) == []
+    assert db.get_by_hash(z_hash[:7]) == [spec['z']]
+
+    # upstream indexes follow changes of upstream records
+    db_b.remove(spec['z'])
+    assert db.query('z') == []
+    assert db.query('z', installed=False) == [spec['z']]
+
+
+@pytest.mark.usefixtures('config')
+def test_upstream_dbs_are_reused(upstream_layers):
+    roots, layouts, spec = upstream_layers
+    dbs = spack.store._construct_upstream_dbs_from_install_roots(roots[1:])
+    assert dbs == spack.store._construct_upstream_dbs_from_install_roots(
+        roots[1:])
+
+    # databases are read again if their index, or an upstream, changed
+    with spack.repo.swap(MockPackageMultiRepo([MockPackage('w', [], [])])):
+        w = spack.spec.Spec('w')
+        w.concretize()
+        spack.database.Database(roots[2]).add(w, layouts[2])
+
+    new_dbs = spack.store._construct_upstream_dbs_from_install_roots(
+        roots[1:])
+    assert not any(a is b for a, b in zip(dbs, new_dbs))
+    assert new_dbs[0].query('w') == [w]
+
+
 @pytest.fixture()
 def usr_folder_exists(monkeypatch):
     """The ``/usr`` folder is assumed to be existing in some tests. This
@@ -646,3 +719,276 @@ def test_old_external_entries_prefix(mutable_database):
     assert record.path is None
     assert record.spec._prefix is None
     assert record.spec.prefix == record.spec.external_path
+
+
+def _db_records(database):
+    with database.read_transaction():
+        return dict((key, (rec.path, rec.installed, rec.explicit,
+                           rec.ref_count))
+                    for key, rec in database._data.items())
+
+
+def test_reindex_in_parallel(mutable_database, monkeypatch):
+    """Spec files read by worker processes give the same DB."""
+    records = _db_records(mutable_database)
+
+    monkeypatch.setattr(spack.database, 'min_parallel_reindex', 1)
+    spack.store.db.reindex(spack.store.layout, jobs=2)
+    _check_db_sanity(mutable_database)
+    assert _db_records(mutable_database) == records
+
+
+def test_reindex_without_spec_json(mutable_database):
+    """Prefixes installed before spec.json files were written are read
+    from their spec.yaml files."""
+    records = _db_records(mutable_database)
+
+    layout = spack.store.layout
+    for spec_file in layout.all_spec_files():
+        json_file = os.path.join(
+            os.path.dirname(spec_file), layout.spec_json_file_name)
+        assert os.path.isfile(json_file)
+        os.remove(json_file)
+
+    spack.store.store.reindex()
+    _check_db_sanity(mutable_database)
+    assert _db_records(mutable_database) == records
+
+
+def _fresh_db():
+    """A new Database object for the test store, that reads its index."""
+    db = spack.database.Database(spack.store.db.root)
+    db._read()
+    return db
+
+
+def test_records_are_read_on_demand(database):
+    db = _fresh_db()
+    assert not db._data._records
+
+    with db.read_transaction():
+        # only the DAGs of mpileaks are read to answer the query
+        mpileaks = db.query_one('mpileaks ^mpich')
+        built = set(db._data._records)
+        assert built == set(s.dag_hash() for m in db.query('mpileaks')
+                            for s in m.traverse())
+        assert len(built) < len(db._data)
+
+        # specs are not built again
+        assert db.query_one('mpileaks ^mpich') is mpileaks
+        callpath = db.query_one('callpath ^mpich')
+        assert any(s is callpath for s in mpileaks.traverse())
+
+
+def test_dependents_of_records_read_on_demand(database):
+    expected = sorted(d.dag_hash() for d in database.installed_relatives(
+        'libelf', 'parents', transitive=False))
+    assert len(expected) > 1
+
+    # the dependents of a record are not built when it is read
+    db = _fresh_db()
+    libelf = db.query_one('libelf')
+    assert set(db._data._records) == set([libelf.dag_hash()])
+
+    db._data.read_dependents(libelf.dag_hash())
+    assert sorted(d.dag_hash() for d in libelf.dependents()) == expected
+
+    db = _fresh_db()
+    dependents = db.installed_relatives('libelf', 'parents', transitive=False)
+    assert sorted(d.dag_hash() for d in dependents) == expected
+
+
+def test_get_by_hash(database):
+    db = _fresh_db()
+    mpileaks = spack.store.db.query_one('mpileaks ^mpich')
+    dag_hash = mpileaks.dag_hash()
+
+    assert db.get_by_hash(dag_hash) == [mpileaks]
+    assert db.get_by_hash(dag_hash[:7]) == [mpileaks]
+    assert db.get_by_hash_local(dag_hash[:7]) == [mpileaks]
+    assert db.get_by_hash(dag_hash[:7], installed=False) is None
+    assert db.get_by_hash('zzzzzzz', default=[]) == []
+
+    # an empty prefix matches all hashes
+    assert len(db.get_by_hash('')) == len(db.query(installed=any))
+
+
+def test_write_records_read_on_demand(mutable_database):
+    records = _db_records(mutable_database)
+
+    db = _fresh_db()
+    db.query_one('mpileaks ^mpich')
+    with db.write_transaction():
+        pass
+
+    assert _db_records(_fresh_db()) == records
+
+
+@pytest.mark.maybeslow
+@pytest.mark.usefixtures('config', 'mock_packages', 'test_store')
+def test_reindex_benchmark():
+    """Time reindexing a synthetic store of many prefixes."""
+    nprefixes = 500
+    root, layout = spack.store.store.root, spack.store.store.layout
+
+    # prefixes of specs whose dependencies are installed elsewhere
+    base = spack.spec.Spec('mpileaks').concretized().to_dict()
+    for i in range(nprefixes):
+        node = base['spec'][0]['mpileaks']
+        node['version'] = '2.%d' % i
+        node.pop('hash', None)
+        spec = spack.spec.Spec.from_dict(base)
+        spec._mark_concrete()
+        layout.create_install_directory(spec)
+
+    def reindex(jobs):
+        db = spack.database.Database(root)
+        if os.path.exists(db._index_path):
+            os.remove(db._index_path)
+        start = datetime.datetime.now()
+        db.reindex(layout, jobs=jobs)
+        elapsed = (datetime.datetime.now() - start).total_seconds()
+        with db.read_transaction():
+            assert len(db.query('mpileaks')) == nprefixes
+        return elapsed
+
+    serial, parallel = reindex(1), reindex(4)
+    for spec_file in layout.all_spec_files():
+        os.remove(os.path.join(
+            os.path.dirname(spec_file), layout.spec_json_file_name))
+    yaml_serial, yaml_parallel = reindex(1), reindex(4)
+
+    print('\nreindex of %d prefixes:' % nprefixes)
+    print('  spec.json: %.2fs serial, %.2fs with 4 jobs' % (
+        serial, parallel))
+    print('  spec.yaml: %.2fs serial, %.2fs with 4 jobs' % (
+        yaml_serial, yaml_parallel))
+
+
+def _synthetic_index(copies):
+    """Contents of a database index with ``copies`` of the DAG of mpileaks,
+    where all nodes have distinct versions and hashes.
+    """
+    nodes = spack.spec.Spec('mpileaks').concretized().to_dict()['spec']
+
+    installs = {}
+    for i in range(copies):
+        def fake_hash(name):
+            return hashlib.md5(('%s-%d' % (name, i)).encode()).hexdigest()
+
+        for node in nodes:
+            name, node_dict = list(node.items())[0]
+            node_dict = dict(node_dict)
+            node_dict['version'] = '%s.%d' % (node_dict['version'], i)
+            node_dict.pop('hash', None)
+            node_dict['dependencies'] = dict(
+                (dep_name, dict(dep, hash=fake_hash(dep_name)))
+                for dep_name, dep in node_dict.get('dependencies', {}).items())
+            installs[fake_hash(name)] = {
+                'spec': {name: node_dict},
+                'path': '/path/to/%s-%d' % (name, i),
+                'installed': True,
+                'ref_count': 0,
+                'explicit': False,
+                'installation_time': 0.0,
+            }
+
+    return {'database': {
+        'installs': installs, 'version': str(spack.database._db_version)}}
+
+
+def _peak_rss():
+    """Peak resident set size of this process, in MB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024.0
+
+
+@pytest.mark.maybeslow
+@pytest.mark.skipif(not os.path.exists('/proc/self/status'),
+                    reason='needs /proc/self/status to measure memory')
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_read_memory_benchmark(tmpdir):
+    """Report the peak RSS of a process reading a large database."""
+    copies = 2000
+    index = _synthetic_index(copies)
+    index_file = str(tmpdir.join('index.json'))
+    with open(index_file, 'w') as f:
+        json.dump(index, f)
+
+    # read in a child process, so that we only see memory used for that
+    def read_index(queue):
+        before = _peak_rss()
+        start = datetime.datetime.now()
+        db = spack.database.Database(str(tmpdir))
+        db._read_from_file(index_file)
+        db._data.read_all()
+        elapsed = (datetime.datetime.now() - start).total_seconds()
+        queue.put((len(db._data), before, _peak_rss(), elapsed))
+
+    queue = multiprocessing.Queue()
+    p = multiprocessing.Process(target=read_index, args=(queue,))
+    p.start()
+    nrecords, before, after, elapsed = queue.get()
+    p.join()
+    assert nrecords == len(index['database']['installs'])
+
+    print('\nread of %d records in %.2fs:' % (nrecords, elapsed))
+    print('  peak RSS before: %.1f MB' % before)
+    print('  peak RSS after: %.1f MB' % after)
+
+
+@pytest.mark.maybeslow
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_lookup_by_hash_benchmark(tmpdir):
+    """Time reading a large database and looking up one of its specs."""
+    copies = 2000
+    index = _synthetic_index(copies)
+    index_file = str(tmpdir.join('index.json'))
+    with open(index_file, 'w') as f:
+        json.dump(index, f)
+    dag_hash = sorted(index['database']['installs'])[copies]
+
+    def read(lookup):
+        start = datetime.datetime.now()
+        db = spack.database.Database(str(tmpdir))
+        db._read_from_file(index_file)
+        lookup(db)
+        return (datetime.datetime.now() - start).total_seconds()
+
+    read_only = read(lambda db: None)
+    lookup = read(lambda db: db._get_by_hash_local(dag_hash[:7], None, any))
+    read_all = read(lambda db: db._data.read_all())
+
+    print('\nreading %d records:' % len(index['database']['installs']))
+    print('  index only: %.2fs' % read_only)
+    print('  and one lookup by hash: %.2fs' % lookup)
+    print('  and all specs: %.2fs' % read_all)
+
+
+@pytest.mark.maybeslow
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_snapshot_read_benchmark(tmpdir):
+    """Time reading large databases from index.json and from snapshots."""
+    print('\nrecords    index.json    snapshot')
+    for nrecords in (10000, 50000, 100000):
+        db = spack.database.Database(str(tmpdir.join(str(nrecords))))
+        index = _synthetic_index(nrecords // 6)
+        with open(db._index_path, 'w') as f:
+            json.dump(index, f)
+        spack.database_snapshot.write(
+            db._snapshot_path, index['database']['installs'],
+            index['database']['version'], db._index_path)
+
+        start = datetime.datetime.now()
+        db._read_from_file(db._index_path)
+        from_json = (datetime.datetime.now() - start).total_seconds()
+
+        start = datetime.datetime.now()
+        assert db._read_from_snapshot()
+        from_snapshot = (datetime.datetime.now() - start).total_seconds()
+
+        assert len(db._data) == len(index['database']['installs'])
+        print('%7d    %9.2fs    %7.2fs' % (
+            len(db._data), from_json, from_snapshot))
@@ -0,0 +1,166 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for binary snapshots of the install database."""
+import json
+import os
+import uuid
+
+import pytest
+
+import spack.database
+import spack.database_snapshot
+from spack.database_snapshot import DatabaseSnapshot
+
+pytestmark = pytest.mark.db
+
+
+def _read_db(root):
+    db = spack.database.Database(root)
+    with db.read_transaction():
+        specs = db.query(installed=any)
+        records = dict((s.dag_hash(), db.get_record(s).to_dict())
+                       for s in specs)
+    return db, records
+
+
+def _json_records(database):
+    db = spack.database.Database(database.root)
+    db._read_from_file(db._index_path)
+    return dict((key, rec.to_dict()) for key, rec in db._data.items())
+
+
+def test_read_from_snapshot(database):
+    assert os.path.isfile(database._snapshot_path)
+
+    db, records = _read_db(database.root)
+    assert isinstance(db._data._installs, DatabaseSnapshot)
+    assert records == _json_records(database)
+
+    # specs read from the snapshot are connected as usual
+    with db.read_transaction():
+        mpileaks = db.query_one('mpileaks ^mpich')
+        libelf = db.query_one('libelf')
+        assert any(s is libelf for s in mpileaks.traverse())
+        assert set(d.name for d in mpileaks['callpath'].dependents()) == \
+            set(['mpileaks'])
+
+
+def test_snapshot_contents(database):
+    snapshot = spack.database_snapshot.read(
+        database._snapshot_path, database._index_path)
+    assert snapshot.version == str(spack.database._db_version)
+
+    with database.read_transaction():
+        specs = database.query(installed=any)
+        assert len(snapshot) == len(specs)
+        for spec in specs:
+            name, deps = snapshot.dependency_hashes(spec.dag_hash())
+            assert name == snapshot.name(spec.dag_hash()) == spec.name
+            assert sorted(deps) == sorted(
+                (d.name, d.dag_hash()) for d in spec.dependencies())
+
+
+def test_stale_snapshot_is_ignored(mutable_database):
+    index_path = mutable_database._index_path
+    with open(index_path) as f:
+        index = f.read()
+
+    # a snapshot is stale as soon as index.json changes
+    with open(index_path, 'w') as f:
+        f.write(index.replace('"explicit": true', '"explicit": false'))
+
+    assert spack.database_snapshot.read(
+        mutable_database._snapshot_path, index_path) is None
+    db, records = _read_db(mutable_database.root)
+    assert not isinstance(db._data._installs, DatabaseSnapshot)
+    assert not any(rec['explicit'] for rec in records.values())
+
+    # and it is written again with the database
+    with mutable_database.write_transaction():
+        pass
+    assert spack.database_snapshot.read(
+        mutable_database._snapshot_path, index_path) is not None
+
+
+def test_snapshot_stale_with_same_size_and_mtime(mutable_database):
+    index_path = mutable_database._index_path
+    st = os.stat(index_path)
+    with open(index_path) as f:
+        index = f.read()
+
+    # a concurrent write that the mtime cannot tell apart
+    generation = spack.database_snapshot._index_generation(index_path)
+    assert generation
+    index = index.replace('"explicit": true', '"explicit": null')
+    index = index.replace(generation.decode('utf-8'), uuid.uuid4().hex)
+    with open(index_path, 'w') as f:
+        f.write(index)
+    os.utime(index_path, (st.st_atime, st.st_mtime))
+    assert os.path.getsize(index_path) == st.st_size
+
+    assert spack.database_snapshot.read(
+        mutable_database._snapshot_path, index_path) is None
+    db, records = _read_db(mutable_database.root)
+    assert not any(rec['explicit'] for rec in records.values())
+
+
+def test_snapshot_read_without_hashing_index(mutable_database, monkeypatch):
+    def _fail(index_path):
+        raise AssertionError('index.json was hashed')
+    monkeypatch.setattr(spack.database_snapshot, '_index_digest', _fail)
+
+    assert spack.database_snapshot.read(
+        mutable_database._snapshot_path,
+        mutable_database._index_path) is not None
+
+
+def test_snapshot_of_index_without_generation(mutable_database):
+    """Indexes written by older versions are compared by contents."""
+    index_path = mutable_database._index_path
+    snapshot_path = mutable_database._snapshot_path
+    with open(index_path) as f:
+        index = json.load(f)
+    del index['database']['generation']
+    with open(index_path, 'w') as f:
+        json.dump(index, f)
+    assert spack.database_snapshot._index_generation(index_path) is None
+
+    installs = index['database']['installs']
+    spack.database_snapshot.write(
+        snapshot_path, installs, index['database']['version'], index_path)
+    assert spack.database_snapshot.read(snapshot_path, index_path)
+
+    with open(index_path) as f:
+        text = f.read()
+    with open(index_path, 'w') as f:
+        f.write(text.replace('"explicit": true', '"explicit": null'))
+    assert spack.database_snapshot.read(snapshot_path, index_path) is None
+
+
+@pytest.mark.parametrize('contents', [b'', b'SPACKDB\0', b'x' * 100])
+def test_invalid_snapshot_is_ignored(mutable_database, contents):
+    records = _json_records(mutable_database)
+    with open(mutable_database._snapshot_path, 'wb') as f:
+        f.write(contents)
+
+    assert spack.database_snapshot.read(
+        mutable_database._snapshot_path,
+        mutable_database._index_path) is None
+    db, read_records = _read_db(mutable_database.root)
+    assert read_records == records
+
+
+def test_remove_after_reading_snapshot(mutable_database):
+    db = spack.database.Database(mutable_database.root)
+    with db.write_transaction():
+        assert isinstance(db._data._installs, DatabaseSnapshot)
+        db.remove('mpileaks ^mpich')
+
+    db, records = _read_db(mutable_database.root)
+    assert isinstance(db._data._installs, DatabaseSnapshot)
+    with db.read_transaction():
+        assert not db.query('mpileaks ^mpich')
+        assert len(db.query('mpileaks')) == 2
@@ -13,6 +13,7 @@ import spack.paths
 import spack.repo
 from spack.directory_layout import YamlDirectoryLayout
 from spack.directory_layout import InvalidDirectoryLayoutParametersError
+from spack.directory_layout import SpecReadError
 from spack.spec import Spec
 
 # number of packages to test (to reduce test time)
@@ -234,3 +235,26 @@ def test_find(layout_and_dir, config, mock_packages):
     for name, spec in found_specs.items():
         assert name in found_specs
         assert found_specs[name].eq_dag(spec)
+
+
+def test_read_spec_prefers_json(layout_and_dir, config, mock_packages):
+    """Spec files are written both as YAML and JSON, and the JSON file is
+    read when it exists."""
+    layout, tmpdir = layout_and_dir
+    spec = Spec('libelf').concretized()
+    layout.create_install_directory(spec)
+
+    spec_path = layout.spec_file_path(spec)
+    json_path = layout.spec_json_file_path(spec)
+    assert os.path.isfile(json_path)
+    assert layout.read_spec(json_path) == layout.read_spec(spec_path)
+
+    # the YAML file is not read if there is a JSON file
+    with open(spec_path, 'w') as f:
+        f.write('not: [a spec')
+    assert layout.read_spec(spec_path) == spec
+
+    # and it is read again when the JSON file is missing
+    os.remove(json_path)
+    with pytest.raises(SpecReadError):
+        layout.read_spec(spec_path)
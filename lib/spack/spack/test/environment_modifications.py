@@ -4,9 +4,13 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import subprocess
 
 import pytest
+import spack.caches
+import spack.config
 import spack.util.environment as environment
+import spack.util.file_cache
 from spack.paths import spack_root
 from spack.util.environment import EnvironmentModifications
 from spack.util.environment import RemovePath, PrependPath, AppendPath
@@ -80,6 +84,17 @@ def env(prepare_environment_for_tests):
     return EnvironmentModifications()
 
 
+@pytest.fixture()
+def sourced_file_cache(tmpdir, monkeypatch):
+    """Stores the modifications made by sourcing files in a temporary
+    misc_cache.
+    """
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    with spack.config.override('config:sourced_file_cache', True):
+        yield cache
+
+
 @pytest.fixture
 def miscellaneous_paths():
     """Returns a list of paths, including system ones."""
@@ -255,7 +270,8 @@ def test_extend(env):
         assert x is y
 
 
-@pytest.mark.usefixtures('prepare_environment_for_tests')
+@pytest.mark.usefixtures('prepare_environment_for_tests',
+                         'sourced_file_cache')
 def test_source_files(files_to_be_sourced):
     """Tests the construction of a list of environment modifications that are
     the result of sourcing a file.
@@ -303,6 +319,108 @@ def test_source_files(files_to_be_sourced):
     assert modifications['PATH_LIST'][2].value == '/path/first'
 
 
+@pytest.mark.usefixtures('prepare_environment_for_tests')
+def test_source_files_cache(files_to_be_sourced, sourced_file_cache,
+                            monkeypatch):
+    """Tests that modifications from sourcing a file are reused from the
+    cache, as long as the file and its input variables are unchanged.
+    """
+    filename = [f for f in files_to_be_sourced
+                if f.endswith('sourceme_first.sh')][0]
+
+    calls = []
+    popen = subprocess.Popen
+
+    def counting_popen(*args, **kwargs):
+        calls.append(args)
+        return popen(*args, **kwargs)
+    monkeypatch.setattr(subprocess, 'Popen', counting_popen)
+
+    def source(*args, **kwargs):
+        del calls[:]
+        env = EnvironmentModifications.from_sourcing_file(
+            filename, *args, **kwargs)
+        return sorted((type(x).__name__, x.name, getattr(x, 'value', None))
+                      for x in env), bool(calls)
+
+    first, sourced = source()
+    assert sourced
+    assert source() == (first, False)
+
+    # by default, the whole environment is an input
+    os.environ['PATH_LIST'] = '/path/other'
+    assert source() == (first, True)
+    assert source() == (first, False)
+
+    # unless the variables the file depends on are given
+    assert source(cache_env=['NEW_VAR']) == (first, True)
+    os.environ['PATH_LIST'] = '/path/second:/path/third'
+    assert source(cache_env=['NEW_VAR']) == (first, False)
+    os.environ['NEW_VAR'] = 'old'
+    assert source(cache_env=['NEW_VAR']) == (first, True)
+
+    # both results are kept for the same file
+    assert source(cache_env=['NEW_VAR']) == (first, False)
+    del os.environ['NEW_VAR']
+    assert source(cache_env=['NEW_VAR']) == (first, False)
+
+    # arguments are inputs
+    assert source('intel64')[1]
+
+    # caching can be disabled
+    assert source(cache=False) == (first, True)
+
+
+def test_source_files_cache_content(tmpdir, sourced_file_cache,
+                                    monkeypatch):
+    """Tests that the cache is keyed on the content of the sourced file."""
+    script = tmpdir.join('setup.sh')
+    script.write('export SOURCED_VALUE=one\n')
+    env = EnvironmentModifications.from_sourcing_file(str(script))
+    assert [x.value for x in env if x.name == 'SOURCED_VALUE'] == ['one']
+
+    script.write('export SOURCED_VALUE=two\n')
+    env = EnvironmentModifications.from_sourcing_file(str(script))
+    assert [x.value for x in env if x.name == 'SOURCED_VALUE'] == ['two']
+
+
+def test_source_files_cache_read_variables(
+        tmpdir, sourced_file_cache, working_env):
+    """Tests that variables the sourced file only reads are inputs."""
+    script = tmpdir.join('setup.sh')
+    script.write('if [ "$MODE" = a ]; then export XVAR=1; '
+                 'else export XVAR=2; fi\n')
+
+    def xvar(**kwargs):
+        env = EnvironmentModifications.from_sourcing_file(
+            str(script), **kwargs)
+        return [x.value for x in env if x.name == 'XVAR']
+
+    for kwargs in ({}, {'cache_env': ['MODE']}):
+        os.environ['MODE'] = 'a'
+        assert xvar(**kwargs) == ['1']
+        os.environ['MODE'] = 'b'
+        assert xvar(**kwargs) == ['2']
+
+
+def test_source_files_cache_nested_files(tmpdir, sourced_file_cache):
+    """Tests that the cache is keyed on the content of the files the
+    sourced file sources in turn, when they are given."""
+    nested = tmpdir.join('nested.sh')
+    script = tmpdir.join('setup.sh')
+    script.write('source %s\n' % nested)
+
+    def value():
+        env = EnvironmentModifications.from_sourcing_file(
+            str(script), cache_files=[str(nested)])
+        return [x.value for x in env if x.name == 'SOURCED_VALUE']
+
+    nested.write('export SOURCED_VALUE=one\n')
+    assert value() == ['one']
+    nested.write('export SOURCED_VALUE=two\n')
+    assert value() == ['two']
+
+
 @pytest.mark.regression('8345')
 def test_preserve_environment(prepare_environment_for_tests):
     # UNSET_ME is defined, and will be unset in the context manager,
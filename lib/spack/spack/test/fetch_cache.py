@@ -0,0 +1,204 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for the content-addressed cache of fetched archives."""
+import hashlib
+import os
+import shutil
+import time
+
+import pytest
+
+import spack.caches
+import spack.repo
+import spack.util.crypto as crypto
+from spack.fetch_strategy import FsCache, ChecksumError
+from spack.spec import Spec
+from spack.util.executable import which
+from spack.version import ver
+
+
+class ArchiveFetcher(object):
+    """Fetcher of an archive that was already downloaded."""
+    cachable = True
+
+    def __init__(self, path, digest=None):
+        self.path = path
+        self.digest = digest
+        self.archived = 0
+
+    def archive(self, destination):
+        self.archived += 1
+        shutil.copyfile(self.path, destination)
+
+
+class FakeStage(object):
+    def __init__(self, path):
+        self.save_filename = path
+
+    @property
+    def archive_file(self):
+        if os.path.exists(self.save_filename):
+            return self.save_filename
+
+
+def digest(path, algo='sha256'):
+    return crypto.checksum(getattr(hashlib, algo), path)
+
+
+@pytest.fixture()
+def cache(tmpdir):
+    return FsCache(str(tmpdir.join('cache')))
+
+
+@pytest.fixture()
+def archives(tmpdir):
+    """Three archives of different sizes."""
+    paths = []
+    for i in range(3):
+        path = tmpdir.join('archive-%d.tar.gz' % i)
+        path.write('x' * 1000 * (i + 1))
+        paths.append(str(path))
+    return paths
+
+
+def fetch_from_cache(cache, name, digest, stage_dir):
+    fetcher = cache.fetcher(name, digest)
+    fetcher.stage = FakeStage(os.path.join(str(stage_dir), 'archive.tar.gz'))
+    fetcher.fetch()
+    return fetcher
+
+
+def test_identical_archives_are_stored_once(cache, archives):
+    cache.store(ArchiveFetcher(archives[0]), 'foo/foo-1.0.tar.gz')
+    cache.store(ArchiveFetcher(archives[0]), 'bar/bar-2.0.tar.gz')
+
+    foo = os.path.join(cache.root, 'foo', 'foo-1.0.tar.gz')
+    bar = os.path.join(cache.root, 'bar', 'bar-2.0.tar.gz')
+    assert os.path.islink(foo) and os.path.islink(bar)
+    assert os.path.realpath(foo) == os.path.realpath(bar) == \
+        cache.object_path(digest(archives[0]))
+    assert [path for path, _, _ in cache.entries()] == \
+        [cache.object_path(digest(archives[0]))]
+
+    # Storing another archive under the same name replaces the link
+    cache.store(ArchiveFetcher(archives[1]), 'foo/foo-1.0.tar.gz')
+    assert os.path.realpath(foo) == cache.object_path(digest(archives[1]))
+
+
+@pytest.mark.skipif(not which('git'), reason='requires git to be installed')
+def test_store_vcs_fetcher(cache, mock_git_repository, config,
+                           mutable_mock_packages, monkeypatch):
+    monkeypatch.setattr(spack.caches, 'fetch_cache', cache)
+    spec = Spec('git-test')
+    spec.concretize()
+    pkg = spack.repo.get(spec)
+    pkg.versions[ver('git')] = mock_git_repository.checks['commit'].args
+
+    # VCS fetchers archive their checkout to a tarball
+    with pkg.stage:
+        pkg.do_stage()
+        pkg.stage.cache_local()
+        mirror_path = pkg.stage[0].mirror_path
+
+    objects_dir = os.path.join(cache.root, cache.objects_dir)
+    paths = [path for path, _, _ in cache.entries()
+             if path.startswith(objects_dir)]
+    assert len(paths) == 1
+    path = paths[0]
+    link = os.path.join(cache.root, mirror_path)
+    assert os.path.realpath(link) == os.path.realpath(path)
+    assert path == cache.object_path(digest(path))
+
+
+def test_verified_archives_are_not_copied_again(cache, archives):
+    fetcher = ArchiveFetcher(archives[0], digest(archives[0]))
+    cache.store(fetcher, 'foo/foo-1.0.tar.gz')
+    cache.store(fetcher, 'bar/bar-2.0.tar.gz')
+    assert fetcher.archived == 1
+    assert os.path.exists(os.path.join(cache.root, 'bar', 'bar-2.0.tar.gz'))
+
+
+def test_cached_archives_are_checksummed_once(
+        cache, archives, tmpdir, monkeypatch):
+    cache.store(ArchiveFetcher(archives[0]), 'foo/foo-1.0.tar.gz')
+    md5 = digest(archives[0], 'md5')
+
+    checked = []
+    check = crypto.Checker.check
+
+    def counting_check(self, filename):
+        checked.append(filename)
+        return check(self, filename)
+    monkeypatch.setattr(crypto.Checker, 'check', counting_check)
+
+    fetcher = fetch_from_cache(cache, 'foo/foo-1.0.tar.gz', md5, tmpdir)
+    fetcher.check()
+    assert len(checked) == 1
+
+    fetch_from_cache(cache, 'foo/foo-1.0.tar.gz', md5, tmpdir).check()
+    assert len(checked) == 1
+
+    # A modified archive is checksummed again, and fails
+    path = cache.object_path(digest(archives[0]))
+    with open(path, 'a') as f:
+        f.write('corrupted')
+    with pytest.raises(ChecksumError):
+        fetch_from_cache(cache, 'foo/foo-1.0.tar.gz', md5, tmpdir)
+    assert len(checked) == 2
+
+
+def test_evict_least_recently_used(cache, archives, tmpdir):
+    names = ['pkg-%d/pkg-%d-1.0.tar.gz' % (i, i) for i in range(3)]
+    for archive, name in zip(archives, names):
+        cache.store(ArchiveFetcher(archive), name)
+
+    # archive 1 was used last, archive 0 before and archive 2 first
+    now = time.time()
+    for archive, age in zip(archives, [100, 10, 1000]):
+        stamp = cache.object_path(digest(archive)) + '.verified'
+        os.utime(stamp, (now - age, now - age))
+
+    # archives hold 1000, 2000 and 3000 bytes
+    removed = cache.evict(max_size=3500)
+    assert [size for _, size in removed] == [3000]
+    assert not os.path.exists(os.path.join(cache.root, 'pkg-2'))
+    assert os.path.exists(os.path.join(cache.root, names[0]))
+
+    removed = cache.evict(max_age=50)
+    assert [size for _, size in removed] == [1000]
+    assert [size for _, size, _ in cache.entries()] == [2000]
+    assert os.listdir(cache.root) == ['_objects', 'pkg-1']
+
+
+def test_evict_archives_of_older_caches(cache, archives):
+    old = os.path.join(cache.root, 'foo', 'foo-1.0.tar.gz')
+    os.makedirs(os.path.dirname(old))
+    shutil.copyfile(archives[0], old)
+
+    assert [path for path, _, _ in cache.entries()] == [old]
+    assert cache.evict(max_size=0) == [(old, 1000)]
+    assert not os.path.exists(os.path.dirname(old))
+
+
+def test_evict_git_mirrors(cache, archives):
+    cache.store(ArchiveFetcher(archives[0]), 'foo/foo-1.0.tar.gz')
+
+    mirror = cache.git_mirror_path('https://example.com/org/bar.git')
+    assert os.path.basename(mirror).startswith('bar-')
+    os.makedirs(os.path.join(mirror, 'objects'))
+    with open(os.path.join(mirror, 'objects', 'pack'), 'w') as f:
+        f.write('x' * 5000)
+
+    # git mirrors are one entry, last used when they were updated
+    entries = sorted(cache.entries())
+    assert [(path, size) for path, size, _ in entries] == \
+        [(mirror, 5000), (cache.object_path(digest(archives[0])), 1000)]
+
+    old = time.time() - 1000
+    os.utime(mirror, (old, old))
+    assert cache.evict(max_age=100) == [(mirror, 5000)]
+    assert not os.path.exists(mirror)
+    assert os.path.exists(os.path.join(cache.root, 'foo', 'foo-1.0.tar.gz'))
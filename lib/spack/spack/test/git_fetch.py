@@ -4,16 +4,18 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import shutil
 
 import pytest
 
 from llnl.util.filesystem import working_dir, touch
 
+import spack.caches
 import spack.repo
 import spack.config
 from spack.spec import Spec
 from spack.version import ver
-from spack.fetch_strategy import GitFetchStrategy
+from spack.fetch_strategy import GitFetchStrategy, FsCache
 from spack.util.executable import which
 
 
@@ -101,3 +103,111 @@ def test_fetch(type_of_test,
             assert os.path.isfile(file_path)
 
             assert h('HEAD') == h(t.revision)
+
+
+@pytest.mark.parametrize("type_of_test", ['master', 'branch', 'tag', 'commit'])
+def test_fetch_from_git_mirror_cache(type_of_test,
+                                     mock_git_repository,
+                                     config,
+                                     mutable_mock_packages,
+                                     tmpdir,
+                                     monkeypatch):
+    """Checks that commits are checked out from a bare mirror in the fetch
+    cache, also without the repository, and that tags and branches are
+    cloned from the repository without a mirror.
+    """
+    cache = FsCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'fetch_cache', cache)
+
+    # Fetch from a copy of the repository, which is removed afterwards
+    repo = str(tmpdir.join('mock-git-repo'))
+    shutil.copytree(mock_git_repository.path, repo)
+
+    t = mock_git_repository.checks[type_of_test]
+    h = mock_git_repository.hash
+    git = which('git', required=True)
+
+    spec = Spec('git-test')
+    spec.concretize()
+    pkg = spack.repo.get(spec)
+    args = dict(t.args)
+    args['git'] = repo
+    pkg.versions[ver('git')] = args
+
+    with pkg.stage:
+        pkg.do_stage()
+        assert (os.path.isdir(cache.git_mirror_path(repo)) ==
+                (type_of_test == 'commit'))
+
+        with working_dir(pkg.stage.source_path):
+            assert h('HEAD') == h(t.revision)
+            assert os.path.isfile(t.file)
+
+            # the checkout does not depend on the mirror
+            assert not os.path.isfile(
+                os.path.join('.git', 'objects', 'info', 'alternates'))
+            origin = git('config', 'remote.origin.url', output=str)
+            assert origin.strip() == repo
+
+    if type_of_test != 'commit':
+        return
+
+    # Without the repository, and its archive in the cache, commits are
+    # checked out from the mirror
+    shutil.rmtree(repo)
+    shutil.rmtree(os.path.join(cache.root, 'git-test'))
+    with pkg.stage:
+        pkg.do_stage()
+        with working_dir(pkg.stage.source_path):
+            assert h('HEAD') == h(t.revision)
+            assert os.path.isfile(t.file)
+
+
+def test_git_mirror_cache_disabled(mock_git_repository,
+                                   config,
+                                   mutable_mock_packages,
+                                   tmpdir,
+                                   monkeypatch):
+    cache = FsCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'fetch_cache', cache)
+
+    spec = Spec('git-test')
+    spec.concretize()
+    pkg = spack.repo.get(spec)
+    pkg.versions[ver('git')] = mock_git_repository.checks['commit'].args
+
+    with spack.config.override('config:git_mirror_cache', False):
+        with pkg.stage:
+            pkg.do_stage()
+            assert os.path.isfile(pkg.stage.source_path + '/.git/config')
+    assert not os.path.exists(os.path.join(cache.root, cache.git_dir))
+
+
+def test_stage_outlives_git_mirror(mock_git_repository,
+                                   config,
+                                   mutable_mock_packages,
+                                   tmpdir,
+                                   monkeypatch):
+    """Checks that stages cloned from a mirror can be restaged after the
+    mirror was removed from the fetch cache."""
+    cache = FsCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'fetch_cache', cache)
+
+    t = mock_git_repository.checks['commit']
+    spec = Spec('git-test')
+    spec.concretize()
+    pkg = spack.repo.get(spec)
+    pkg.versions[ver('git')] = t.args
+
+    with pkg.stage:
+        pkg.do_stage()
+        cache.destroy()
+        assert not os.path.exists(cache.root)
+
+        with working_dir(pkg.stage.source_path):
+            touch('untracked')
+            pkg.do_restage()
+            assert not os.path.exists('untracked')
+            assert mock_git_repository.hash('HEAD') == \
+                mock_git_repository.hash(t.revision)
+            assert os.path.isfile(t.file)
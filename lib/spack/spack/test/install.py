@@ -58,9 +58,9 @@ class MockStage(object):
         if exc_type is None:
             self.destroy()
 
-    def destroy(self):
+    def destroy(self, **kwargs):
         self.test_destroyed = True
-        self.wrapped_stage.destroy()
+        self.wrapped_stage.destroy(**kwargs)
 
     def create(self):
         self.wrapped_stage.create()
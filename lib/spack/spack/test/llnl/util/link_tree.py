@@ -7,7 +7,8 @@ import os
 
 import pytest
 from llnl.util.filesystem import working_dir, mkdirp, touchp
-from llnl.util.link_tree import LinkTree
+import llnl.util.link_tree
+from llnl.util.link_tree import LinkTree, copy_file
 from spack.stage import Stage
 
 
@@ -166,3 +167,76 @@ def test_ignore(stage, link_tree):
 
         assert os.path.isfile('source/.spec')
         assert os.path.isfile('dest/.spec')
+
+
+def test_plan(stage, link_tree):
+    with working_dir(stage.path):
+        mkdirp('dest/c')
+        plan = link_tree.plan('dest', ignore=lambda x: x == 'a')
+
+        assert [d for s, d in plan.directories] == [
+            'dest', 'dest/c', 'dest/c/d', 'dest/c/d/e']
+        assert sorted(plan.files.values()) == [
+            'dest/1', 'dest/c/4', 'dest/c/d/5', 'dest/c/d/6', 'dest/c/d/e/7']
+
+        state = plan.dest_state()
+        assert state['dest'] == 'dir'
+        assert state['dest/c'] == 'dir'
+        assert state['dest/c/d'] is None
+        assert state['dest/c/d/e'] is None
+
+
+def test_find_conflicts(stage, link_tree):
+    with working_dir(stage.path):
+        touchp('dest/c/4')
+        touchp('dest/a')
+        conflict = link_tree.find_conflict('dest')
+        assert conflict == 'File blocks directory: dest/a'
+        assert link_tree.find_conflict(
+            'dest', ignore=lambda x: x == 'a') == 'dest/c/4'
+        assert link_tree.find_conflict(
+            'dest', ignore=lambda x: x == 'a',
+            ignore_file_conflicts=True) is None
+
+
+@pytest.mark.parametrize('link', [os.link, copy_file])
+def test_merge_hardlink_and_copy(stage, link_tree, link):
+    with working_dir(stage.path):
+        link_tree.merge('dest', link=link)
+
+        for f in ('1', 'a/b/2', 'c/d/e/7'):
+            dest = os.path.join('dest', f)
+            assert os.path.isfile(dest)
+            assert not os.path.islink(dest)
+
+        link_tree.unmerge('dest')
+        assert not os.path.exists('dest')
+
+
+def test_merge_parallel(stage, link_tree, monkeypatch):
+    monkeypatch.setattr(llnl.util.link_tree, 'min_parallel_files', 0)
+    with working_dir(stage.path):
+        link_tree.merge('dest', jobs=4)
+
+        check_file_link('dest/1',       'source/1')
+        check_file_link('dest/a/b/2',   'source/a/b/2')
+        check_file_link('dest/c/d/e/7', 'source/c/d/e/7')
+
+        link_tree.unmerge('dest', jobs=4)
+        assert not os.path.exists('dest')
+
+
+def test_merge_linked_directory(stage, link_tree):
+    with working_dir(stage.path):
+        touchp('source/lib/libfoo.so')
+        os.symlink('lib', 'source/lib64')
+
+        plan = link_tree.plan('dest')
+        assert 'dest/lib64' not in [d for s, d in plan.directories]
+
+        link_tree.merge('dest')
+        assert os.path.islink('dest/lib64')
+        assert os.path.isfile('dest/lib64/libfoo.so')
+
+        link_tree.unmerge('dest')
+        assert not os.path.lexists('dest')
@@ -42,10 +42,14 @@ node-local filesystem, and multi-node tests will fail if the locks aren't
 actually on a shared filesystem.
 
 """
+import errno
+import fcntl
 import os
+import signal
 import socket
 import shutil
 import tempfile
+import time
 import traceback
 import glob
 import getpass
@@ -201,11 +205,18 @@ def lock_path(lock_dir):
         os.unlink(lock_file)
 
 
-def test_poll_interval_generator():
-    interval_iter = iter(
-        lk.Lock._poll_interval_generator(_wait_times=[1, 2, 3]))
+def test_backoff_intervals():
+    interval_iter = iter(lk.Lock._backoff_intervals(base=1, cap=8))
     intervals = list(next(interval_iter) for i in range(100))
-    assert intervals == [1] * 20 + [2] * 40 + [3] * 40
+
+    # the ceiling doubles at each request, up to the cap
+    ceilings = [1, 2, 4] + [8] * 97
+    assert all(1 <= i <= c for i, c in zip(intervals, ceilings))
+
+
+def test_invalid_wait_strategy(lock_path):
+    with pytest.raises(ValueError):
+        lk.Lock(lock_path, wait_strategy='spin')
 
 
 def local_multiproc_test(*functions, **kwargs):
@@ -1029,6 +1040,148 @@ def test_lock_debug_output(lock_path):
     local_multiproc_test(p2, p1, extra_args=(q1, q2))
 
 
+@pytest.mark.parametrize('strategy', ['blocking', 'poll'])
+def test_timeout_with_wait_strategy(lock_path, strategy):
+    def hold_write(barrier):
+        lock = lk.Lock(lock_path)
+        lock.acquire_write()
+        barrier.wait()
+        barrier.wait()
+
+    def timeout_write(barrier):
+        lock = lk.Lock(lock_path, wait_strategy=strategy)
+        barrier.wait()
+        with pytest.raises(lk.LockTimeoutError):
+            lock.acquire_write(lock_fail_timeout)
+        with pytest.raises(lk.LockTimeoutError):
+            lock.acquire_read(lock_fail_timeout)
+        barrier.wait()
+
+    multiproc_test(hold_write, timeout_write)
+
+
+def test_blocking_wait_keeps_armed_timer(lock_path):
+    def hold_write(barrier):
+        lock = lk.Lock(lock_path)
+        lock.acquire_write()
+        barrier.wait()
+        barrier.wait()
+
+    def timeout_write(barrier):
+        def handler(signum, frame):
+            raise AssertionError('timer fired during the wait')
+        signal.signal(signal.SIGALRM, handler)
+        signal.setitimer(signal.ITIMER_REAL, 60)
+
+        lock = lk.Lock(lock_path, wait_strategy='blocking')
+        barrier.wait()
+        with pytest.raises(lk.LockTimeoutError):
+            lock.acquire_write(lock_fail_timeout)
+
+        assert signal.getsignal(signal.SIGALRM) is handler
+        assert 0 < signal.getitimer(signal.ITIMER_REAL)[0] < 60
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        barrier.wait()
+
+    local_multiproc_test(hold_write, timeout_write)
+
+
+def test_timer_firing_after_blocking_lock_is_granted(lock_path, monkeypatch):
+    """The lock is tracked when the timeout fires just as it is granted."""
+    lockf = fcntl.lockf
+
+    class LateTimerFcntl(object):
+        """Makes the first attempt look contended, and fires the timer
+        right after the blocking attempt is granted."""
+        contended = True
+
+        def __getattr__(self, name):
+            return getattr(fcntl, name)
+
+        def lockf(self, f, op, *args):
+            if op & fcntl.LOCK_NB and self.contended:
+                self.contended = False
+                raise IOError(errno.EAGAIN, 'contended')
+            lockf(f, op, *args)
+            if not op & fcntl.LOCK_NB:
+                os.kill(os.getpid(), signal.SIGALRM)
+
+    monkeypatch.setattr(lk, 'fcntl', LateTimerFcntl())
+    lock = lk.Lock(lock_path, wait_strategy='blocking')
+    old_handler = signal.getsignal(signal.SIGALRM)
+
+    lock.acquire_write(60)
+    monkeypatch.undo()
+    assert lock._writes == 1
+    assert signal.getsignal(signal.SIGALRM) is old_handler
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+    lock.release_write()
+
+
+@pytest.mark.parametrize('strategy', ['blocking', 'poll'])
+def test_wait_statistics(lock_path, strategy):
+    def hold_write(barrier):
+        lock = lk.Lock(lock_path)
+        lock.acquire_write()
+        barrier.wait()  # ---------------------------------------- 1
+        time.sleep(0.2)
+        lock.release_write()
+
+    def wait_write(barrier):
+        lock = lk.Lock(lock_path, wait_strategy=strategy)
+        barrier.wait()  # ---------------------------------------- 1
+        lock.acquire_write()
+        lock.release_write()
+        lock.acquire_read()
+        lock.release_read()
+
+        stats = lock.wait_stats
+        assert stats['acquired'] == 2
+        assert stats['contended'] == 1
+        assert stats['attempts'] >= 3
+        assert 0 < stats['wait_time'] == stats['max_wait_time']
+
+    local_multiproc_test(hold_write, wait_write)
+
+
+def increment_counter(lock_path, counter_path, iterations, strategy):
+    def fn(barrier):
+        lock = lk.Lock(lock_path, wait_strategy=strategy)
+        barrier.wait()
+        for i in range(iterations):
+            with lk.WriteTransaction(lock):
+                with open(counter_path) as f:
+                    count = int(f.read())
+                with open(counter_path, 'w') as f:
+                    f.write(str(count + 1))
+    return fn
+
+
+@pytest.mark.maybeslow
+@pytest.mark.parametrize('strategy', ['blocking', 'poll'])
+def test_lock_contention_benchmark(tmpdir, strategy):
+    """Benchmark N processes hammering one lock file with short write
+    transactions.  Also checks that no update of the counter was lost.
+    """
+    nprocs, iterations = 8, 50
+    lock_path = str(tmpdir.join('lockfile'))
+    counter_path = str(tmpdir.join('counter'))
+    with open(counter_path, 'w') as f:
+        f.write('0')
+
+    fn = increment_counter(lock_path, counter_path, iterations, strategy)
+    start = time.time()
+    local_multiproc_test(*([fn] * nprocs))
+    elapsed = time.time() - start
+
+    with open(counter_path) as f:
+        assert int(f.read()) == nprocs * iterations
+
+    print('{0}: {1} lock handoffs in {2:.2f}s ({3:.1f} handoffs/s)'.format(
+        strategy, nprocs * iterations, elapsed,
+        nprocs * iterations / elapsed))
+
+
 def test_lock_with_no_parent_directory(tmpdir):
     """Make sure locks work even when their parent directory does not exist."""
     with tmpdir.as_cwd():
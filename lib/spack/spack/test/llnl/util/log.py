@@ -4,8 +4,14 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 from __future__ import print_function
+import gzip
+import os
+import sys
+import time
+
 import pytest
 
+import llnl.util.tty.log
 from llnl.util.tty.log import log_output
 from spack.util.executable import which
 
@@ -79,3 +85,85 @@ def test_log_subproc_and_echo_output(capfd, tmpdir):
 
         with open('foo.txt') as f:
             assert f.read() == 'logged\n'
+
+
+def test_log_strips_escapes_in_chunks(capfd, tmpdir, monkeypatch):
+    # use small reads so that lines and escapes straddle chunk boundaries
+    monkeypatch.setattr(llnl.util.tty.log, 'read_chunk_size', 7)
+    with tmpdir.as_cwd():
+        with log_output('foo.txt') as logger:
+            print('\x1b[1mbold\x1b[0m line')
+            with logger.force_echo():
+                print('echo a very long line')
+            print('logged')
+
+        assert capfd.readouterr() == ('echo a very long line\n', '')
+
+        with open('foo.txt') as f:
+            assert f.read() == 'bold line\necho a very long line\nlogged\n'
+
+
+def test_log_keeps_lines_after_other_escapes(capfd, tmpdir):
+    # sequences other than colors are not stripped, and must not make
+    # stripping skip to the next color in the following lines
+    text = 'progress 10%\x1b[K\nchecking for gcc... yes\nmake \x1b[1mall\n'
+    with tmpdir.as_cwd():
+        with log_output('foo.txt'):
+            sys.stdout.write(text)
+
+        with open('foo.txt') as f:
+            assert f.read() == (
+                'progress 10%\x1b[K\nchecking for gcc... yes\nmake all\n')
+
+        assert capfd.readouterr() == ('', '')
+
+
+def test_log_compressed_output(capfd, tmpdir, monkeypatch):
+    monkeypatch.setattr(llnl.util.tty.log, 'tail_lines', 10)
+    lines = ['line %d\n' % i for i in range(1000)]
+    with tmpdir.as_cwd():
+        with log_output('foo.txt', compress=True):
+            sys.stdout.write(''.join(lines))
+
+        with open('foo.txt') as f:
+            assert f.read() == ''.join(lines[-10:])
+
+        f = gzip.open('foo.txt.gz', 'rb')
+        try:
+            assert f.read().decode('utf-8') == ''.join(lines)
+        finally:
+            f.close()
+
+        assert capfd.readouterr() == ('', '')
+
+
+@pytest.mark.parametrize('text,lines,expected', [
+    (['a\nb\n', 'c\n', 'd'], 2, 'c\nd'),
+    (['a\nb\n', 'c\n', 'd\n'], 2, 'c\nd\n'),
+    (['a\nb', '\nc\n'], 5, 'a\nb\nc\n'),
+    (['a\n', 'b\n', 'c\n'], 1, 'c\n'),
+])
+def test_log_tail(text, lines, expected):
+    tail = llnl.util.tty.log._LogTail(lines)
+    for chunk in text:
+        tail.append(chunk)
+    assert tail.getvalue() == expected
+
+
+@pytest.mark.maybeslow
+def test_log_output_throughput(capfd, tmpdir):
+    """Throughput of the log daemon for a verbose build."""
+    line = '\x1b[1m' + 'x' * 100 + '\x1b[0m\n'
+    count = 200000
+    with tmpdir.as_cwd():
+        start = time.time()
+        with log_output('foo.txt'):
+            for _ in range(count // 1000):
+                sys.stdout.write(line * 1000)
+        elapsed = time.time() - start
+
+        assert os.path.getsize('foo.txt') == count * 101
+
+    with capfd.disabled():
+        print('\nlogged %d lines in %.2fs (%.0f lines/s)' % (
+            count, elapsed, count / elapsed))
@@ -3,10 +3,48 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import ast
+import hashlib
+
+import pytest
+
+import spack.caches
+import spack.repo
+import spack.util.file_cache
+import spack.util.package_hash as ph
 from spack.util.package_hash import package_hash, package_content
 from spack.spec import Spec
 
 
+@pytest.fixture()
+def hash_cache(tmpdir, monkeypatch):
+    """Caches package hashes in a temporary misc_cache, and starts from
+    empty in-process caches."""
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    monkeypatch.setattr(ph, '_parsed_packages', {})
+    monkeypatch.setattr(ph, '_hash_cache_entries', {})
+    return cache
+
+
+def package_text(name):
+    filename = spack.repo.path.filename_for_package_name(name)
+    with open(filename) as f:
+        return f.read()
+
+
+def uncached_package_hash(spec, text=None):
+    """Hash a package as package_hash() does, without any caching."""
+    root = ast.parse(text or package_text(spec.name))
+    root = ph.RemoveDocstrings().visit(root)
+    ph.RemoveDirectives(spec).visit(root)
+    fmm = ph.TagMultiMethods(spec)
+    fmm.visit(root)
+    root = ph.ResolveMultiMethods(fmm.methods).visit(root)
+    return hashlib.sha256(
+        ast.dump(root).encode('utf-8')).digest().lower()
+
+
 def test_hash(tmpdir, mock_packages, config):
     package_hash("hash-test1@1.2")
 
@@ -63,3 +101,36 @@ def compare_sans_name(eq, spec1, spec2):
         assert content1 == content2
     else:
         assert content1 != content2
+
+
+@pytest.mark.usefixtures('mock_packages', 'config')
+def test_cached_hashes_are_identical(hash_cache, monkeypatch):
+    specs = [Spec('hash-test1@1.2'), Spec('hash-test1@1.5'),
+             Spec('hash-test2@1.2'), Spec('hash-test2@1.5')]
+    expected = [uncached_package_hash(s) for s in specs]
+    assert expected[0] != expected[1]
+
+    # computed and cached
+    assert [package_hash(s) for s in specs] == expected
+    assert [package_hash(s) for s in specs] == expected
+
+    # read from misc_cache, without parsing anything
+    monkeypatch.setattr(ph, '_hash_cache_entries', {})
+    monkeypatch.setattr(ph, '_parsed_packages', {})
+    monkeypatch.setattr(ast, 'parse', None)
+    assert [package_hash(s) for s in specs] == expected
+    assert not ph._parsed_packages
+
+
+@pytest.mark.usefixtures('mock_packages', 'config')
+def test_modified_package_is_hashed_again(hash_cache, monkeypatch):
+    spec = Spec('hash-test1@1.2')
+    text = package_text(spec.name)
+    before = package_hash(spec)
+
+    text = text.replace('print("install 1")', 'print("changed")')
+    monkeypatch.setattr(ph, '_package_source',
+                        lambda name: ph._PackageSource(name, text))
+    after = package_hash(spec)
+    assert before != after
+    assert after == uncached_package_hash(spec, text)
@@ -12,6 +12,7 @@ import sys
 import shutil
 import pytest
 import argparse
+import json
 
 from llnl.util.filesystem import mkdirp
 
@@ -19,6 +20,7 @@ import spack.repo
 import spack.store
 import spack.binary_distribution as bindist
 import spack.cmd.buildcache as buildcache
+import spack.util.spack_yaml as syaml
 from spack.spec import Spec
 from spack.paths import mock_gpg_keys_path
 from spack.fetch_strategy import URLFetchStrategy, FetchStrategyComposite
@@ -235,6 +237,86 @@ echo $PATH"""
     bindist._cached_specs = None
 
 
+@pytest.fixture()
+def check_mirror(tmpdir, mock_packages, config):
+    """A mirror with an up-to-date libelf, an out-of-date libdwarf and no
+    mpileaks, and the specs to check against it.
+
+    A spec that is missing from a mirror is an error, which is a reason to
+    rebuild with ``rebuild_on_errors``.
+    """
+    specs = [Spec(s).concretized() for s in ('libelf', 'libdwarf', 'mpileaks')]
+    build_cache_dir = bindist.build_cache_directory(str(tmpdir))
+    mkdirp(build_cache_dir)
+    for spec, full_hash in zip(specs[:2], [specs[0].full_hash(), 'outdated']):
+        spec_dict = spec.to_dict()
+        spec_dict['full_hash'] = full_hash
+        path = os.path.join(build_cache_dir,
+                            bindist.tarball_name(spec, '.spec.yaml'))
+        with open(path, 'w') as f:
+            f.write(syaml.dump(spec_dict))
+    return 'file://' + str(tmpdir), specs
+
+
+def check_report(mirror_url, specs, tmpdir, jobs=None):
+    output_file = str(tmpdir.join('rebuilds.json'))
+    result = bindist.check_specs_against_mirrors(
+        {'test': mirror_url}, specs, output_file, rebuild_on_errors=True,
+        jobs=jobs)
+    with open(output_file) as f:
+        report = json.load(f)
+    return result, report
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+@pytest.mark.parametrize('index', [False, True])
+def test_check_specs_against_mirrors(check_mirror, tmpdir, jobs, index):
+    mirror_url, specs = check_mirror
+    if index:
+        bindist.generate_package_index(
+            bindist.build_cache_directory(mirror_url.replace('file://', '')))
+
+    result, report = check_report(mirror_url, specs, tmpdir, jobs)
+
+    assert result == 1
+    rebuilds = report[mirror_url]['rebuildSpecs']
+    assert [r['hash'] for r in rebuilds] == \
+        [s.dag_hash() for s in specs[1:]]
+    assert [r['hash'] for r in rebuilds] == \
+        [s.dag_hash() for s in specs
+         if bindist.needs_rebuild(s, mirror_url, rebuild_on_errors=True)]
+
+
+def test_check_specs_against_mirror_index(check_mirror, tmpdir, monkeypatch):
+    mirror_url, specs = check_mirror
+    bindist.generate_package_index(
+        bindist.build_cache_directory(mirror_url.replace('file://', '')))
+
+    # only specs that are not in the index are read from the mirror
+    read = []
+
+    def read_spec_yaml(url):
+        read.append(url)
+        return None
+    monkeypatch.setattr(bindist, '_read_spec_yaml', read_spec_yaml)
+
+    result, report = check_report(mirror_url, specs, tmpdir)
+    assert len(read) == 1 and 'mpileaks' in read[0]
+    assert [r['hash'] for r in report[mirror_url]['rebuildSpecs']] == \
+        [s.dag_hash() for s in specs[1:]]
+
+
+def test_spec_yaml_full_hash(mock_packages, config):
+    spec = Spec('libdwarf').concretized()
+    spec_dict = spec.to_dict(all_deps=True)
+    yaml_without_hash = syaml.dump(spec_dict)
+    assert bindist._spec_yaml_full_hash(yaml_without_hash) is None
+
+    spec_dict['full_hash'] = spec.full_hash()
+    assert bindist._spec_yaml_full_hash(syaml.dump(spec_dict)) == \
+        spec.full_hash()
+
+
 def test_relocate_text(tmpdir):
     with tmpdir.as_cwd():
         # Validate the text path replacement
@@ -5,14 +5,19 @@
 
 import os
 import filecmp
+import shutil
+import threading
+
 import pytest
 
 from llnl.util.filesystem import working_dir, mkdirp
 
+import spack.caches
 import spack.patch
 import spack.paths
 import spack.repo
 import spack.util.compression
+from spack.fetch_strategy import FsCache
 from spack.util.executable import Executable
 from spack.stage import Stage
 from spack.spec import Spec
@@ -41,7 +46,7 @@ def mock_stage(tmpdir, monkeypatch):
 data_path = os.path.join(spack.paths.test_path, 'data', 'patch')
 
 
-@pytest.mark.parametrize('filename, sha256, archive_sha256', [
+url_patch_files = [
     # compressed patch -- needs sha256 and archive_256
     (os.path.join(data_path, 'foo.tgz'),
      '252c0af58be3d90e5dc5e0d16658434c9efa5d20a5df6c10bf72c2d77f780866',
@@ -50,7 +55,10 @@ data_path = os.path.join(spack.paths.test_path, 'data', 'patch')
     (os.path.join(data_path, 'foo.patch'),
      '252c0af58be3d90e5dc5e0d16658434c9efa5d20a5df6c10bf72c2d77f780866',
      None)
-])
+]
+
+
+@pytest.mark.parametrize('filename, sha256, archive_sha256', url_patch_files)
 def test_url_patch(mock_stage, filename, sha256, archive_sha256):
     # Make a patch object
     url = 'file://' + filename
@@ -314,3 +322,140 @@ def test_write_and_read_sub_dags_with_patched_deps(mock_packages, config):
         libelf, libdwarf, fake,
         'builtin.mock.patch-several-dependencies',
         spec.package.package_dir)
+
+
+@pytest.mark.parametrize('filename, sha256, archive_sha256', url_patch_files)
+def test_url_patch_from_fetch_cache(mock_stage, tmpdir_factory, monkeypatch,
+                                    filename, sha256, archive_sha256):
+    tmpdir = tmpdir_factory.mktemp('url-patch')
+    cache = FsCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'fetch_cache', cache)
+
+    # fetch the patch from a copy, which is removed afterwards
+    copy = str(tmpdir.join(os.path.basename(filename)))
+    shutil.copy(filename, copy)
+    pkg = spack.repo.get('patch')
+
+    def fetch():
+        patch = spack.patch.UrlPatch(pkg, 'file://' + copy, sha256=sha256,
+                                     archive_sha256=archive_sha256)
+        with Stage('file://' + copy) as stage:
+            stage.mirror_path = mock_stage
+            patch.fetch(stage)
+            with open(patch.path) as f:
+                assert 'zeroth line' in f.read()
+            patch.clean()
+        return patch
+
+    assert fetch().stage is not None
+    os.remove(copy)
+
+    # the patch is used from the cache, where it is stored by its sha256
+    patch = fetch()
+    assert patch.stage is None
+    assert patch.path == cache.object_path(sha256)
+
+
+class MockPatch(object):
+    def __init__(self, path, level=1, working_dir='.'):
+        self.path = self.path_or_url = path
+        self.level = level
+        self.working_dir = working_dir
+
+
+@pytest.fixture()
+def patches_dir(tmpdir_factory):
+    # tmpdir is the stage directory in this module
+    return tmpdir_factory.mktemp('patches')
+
+
+@pytest.fixture()
+def source(patches_dir):
+    """A source to patch, with patches that apply to it or not."""
+    tmpdir = patches_dir
+    source = tmpdir.ensure('source', dir=True)
+    source.join('foo.txt').write('first line\nsecond line\n')
+    source.join('bar.txt').write('first line\nsecond line\n')
+    for name in ('foo', 'bar'):
+        tmpdir.join('bad-%s.patch' % name).write("""\
+--- a/%s.txt
++++ b/%s.txt
+@@ -1,2 +1,2 @@
+ first line
+-fourth line
++fifth line
+""" % (name, name))
+    # applies after foo.patch
+    tmpdir.join('after-foo.patch').write("""\
+--- a/foo.txt
++++ b/foo.txt
+@@ -1,3 +1,2 @@
+-zeroth line
+ first line
+ third line
+""")
+    return source
+
+
+def check(source, *patch_paths, **kwargs):
+    class MockStage(object):
+        source_path = str(source)
+    patches = [MockPatch(p, **kwargs) for p in patch_paths]
+    spack.patch.check_patches(MockStage(), patches)
+
+
+def test_check_patches(source, patches_dir):
+    foo = os.path.join(data_path, 'foo.patch')
+    bad_foo = str(patches_dir.join('bad-foo.patch'))
+    bad_bar = str(patches_dir.join('bad-bar.patch'))
+
+    check(source, foo)
+    with pytest.raises(spack.patch.PatchDoesNotApplyError) as e:
+        check(source, bad_foo, bad_bar)
+    assert e.value.long_message == '\n'.join([bad_foo, bad_bar])
+
+    # the source is left as it is
+    assert source.join('foo.txt').read() == 'first line\nsecond line\n'
+    assert sorted(os.listdir(str(source))) == ['bar.txt', 'foo.txt']
+
+
+def test_check_patches_on_patched_files(source, patches_dir):
+    foo = os.path.join(data_path, 'foo.patch')
+    after_foo = str(patches_dir.join('after-foo.patch'))
+
+    # patches of files changed by earlier patches are not checked
+    with pytest.raises(spack.patch.PatchDoesNotApplyError):
+        check(source, after_foo)
+    check(source, foo, after_foo)
+
+    assert spack.patch.patched_files(after_foo, level=0) == \
+        set(['a/foo.txt', 'b/foo.txt'])
+    assert spack.patch.patched_files(foo, level=1, working_dir='src') == \
+        set([os.path.join('src', 'foo.txt')])
+
+
+def test_patches_fetched_while_source_is(monkeypatch):
+    fetching = threading.Event()
+    fetched = []
+
+    def fetch(patch, stage):
+        fetching.wait(10)
+        fetched.append(patch)
+
+    monkeypatch.setattr(spack.patch.UrlPatch, 'fetch', fetch)
+    pkg = spack.repo.get('patch')
+    patches = [spack.patch.UrlPatch(pkg, 'http://example.com/%d.patch' % i,
+                                    sha256=str(i)) for i in range(3)]
+
+    with spack.patch.fetching(patches, stage=None):
+        fetching.set()
+    assert sorted(fetched, key=lambda p: p.url) == patches
+
+    # errors of patch fetches are raised at the end of the block
+    def fail(patch, stage):
+        raise spack.patch.NoSuchPatchError(patch.url)
+
+    monkeypatch.setattr(spack.patch.UrlPatch, 'fetch', fail)
+    with pytest.raises(spack.patch.NoSuchPatchError):
+        with spack.patch.fetching(patches, stage=None):
+            pass
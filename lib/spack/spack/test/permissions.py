@@ -6,9 +6,11 @@
 import os
 import pytest
 import stat
+import sys
 
+import spack.util.prefix_scan
 from spack.hooks.permissions_setters import (
-    chmod_real_entries, InvalidPermissionsError
+    chmod_real_entries, post_install_visitor, InvalidPermissionsError
 )
 import llnl.util.filesystem as fs
 
@@ -33,3 +35,29 @@ def test_chmod_rejects_group_writable_suid(tmpdir):
     perms = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
     with pytest.raises(InvalidPermissionsError):
         chmod_real_entries(path, perms)
+
+
+def test_post_install_visitor_sets_permissions(tmpdir, monkeypatch):
+    tmpdir.ensure('bin', 'tool').chmod(0o700)
+    tmpdir.ensure('share', 'doc').chmod(0o600)
+    os.symlink('doc', str(tmpdir.join('share', 'link')))
+    tmpdir.join('share').chmod(0o700)
+
+    hook = sys.modules[post_install_visitor.__module__]
+    monkeypatch.setattr(hook, 'get_package_permissions', lambda s: 0o775)
+    monkeypatch.setattr(hook, 'get_package_dir_permissions', lambda s: 0o755)
+    monkeypatch.setattr(hook, 'get_package_group', lambda s: None)
+
+    class Spec(object):
+        external = False
+
+    visitor = hook.post_install_visitor(Spec())
+    spack.util.prefix_scan.scan(str(tmpdir), [visitor], jobs=2)
+
+    def mode(*path):
+        return stat.S_IMODE(os.lstat(str(tmpdir.join(*path))).st_mode)
+
+    assert mode('bin') == mode('share') == 0o755
+    assert mode('bin', 'tool') == 0o775
+    assert mode('share', 'doc') == 0o664  # not executable
+    assert mode('share', 'link') == 0o777  # links are left alone
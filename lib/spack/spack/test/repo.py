@@ -4,10 +4,17 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import time
 import pytest
 
+from six import StringIO
+
+import spack.cmd.dependents
+import spack.fetch_strategy
 import spack.repo
 import spack.paths
+import spack.spec
+from spack.metadata_index import MetadataIndex, PackageMetadata
 
 
 # Unlike the repo_path fixture defined in conftest, this has a test-level
@@ -64,3 +71,100 @@ def test_repo_last_mtime():
     latest_mtime = max(os.path.getmtime(p.module.__file__)
                        for p in spack.repo.path.all_packages())
     assert spack.repo.path.last_mtime() == latest_mtime
+
+
+@pytest.mark.parametrize('pkg_name', [
+    'mpileaks', 'mpich', 'multivalue_variant', 'conflict', 'extension1'
+])
+def test_metadata_matches_package(mock_packages, pkg_name):
+    pkg = spack.repo.get(pkg_name)
+    metadata = spack.repo.path.get_metadata(pkg_name)
+
+    assert metadata.fullname == pkg.fullname
+    assert metadata.homepage == pkg.homepage
+    assert metadata.format_doc() == pkg.format_doc()
+    assert set(metadata.versions) == set(pkg.versions)
+    assert set(metadata.variants) == set(pkg.variants)
+    for name, variant in pkg.variants.items():
+        assert metadata.variants[name].default == variant.default
+
+    assert set(metadata.dependencies) == set(pkg.dependencies)
+    for deptype in ('build', 'link', 'run'):
+        assert (set(metadata.dependencies_of_type(deptype)) ==
+                set(pkg.dependencies_of_type(deptype)))
+    assert (set(spack.spec.Spec(s) for s in metadata.provided) ==
+            set(pkg.provided))
+    assert set(metadata.extendees) == set(pkg.extendees)
+    assert set(metadata.conflicts) == set(pkg.conflicts)
+    assert metadata.possible_dependencies() == pkg.possible_dependencies()
+
+
+def test_metadata_index_json(mock_packages):
+    index = spack.repo.path.first_repo().metadata_index
+
+    stream = StringIO()
+    index.to_json(stream)
+    stream.seek(0)
+    copy = MetadataIndex.from_json(stream)
+
+    assert sorted(copy) == sorted(index)
+    for name in index:
+        assert copy[name].to_dict() == index[name].to_dict()
+
+
+def test_metadata_queries_do_not_import(mock_packages, monkeypatch):
+    # build the indexes first, as that needs the packages
+    spack.repo.path.provider_index
+    spack.repo.path.get_metadata('mpileaks')
+
+    def _fail(self, pkg_name):
+        raise AssertionError('%s was imported' % pkg_name)
+    monkeypatch.setattr(spack.repo.Repo, 'get_pkg_class', _fail)
+
+    ideps = spack.cmd.dependents.inverted_dependencies()
+    assert 'mpileaks' in ideps['callpath']
+    assert 'mpileaks' in ideps['mpi']
+
+    mpileaks = spack.repo.path.get_metadata('mpileaks')
+    assert 'zmpi' in mpileaks.possible_dependencies()
+    assert 'mpi' in mpileaks.possible_dependencies(expand_virtuals=False)
+
+    with pytest.raises(spack.repo.UnknownPackageError):
+        spack.repo.path.get_metadata('nonexistentpackage')
+
+
+def test_metadata_index_survives_package_errors(mock_packages, monkeypatch):
+    def _fail(pkg, version):
+        raise RuntimeError('url_for_version failed')
+    monkeypatch.setattr(spack.fetch_strategy, 'for_package_version', _fail)
+
+    metadata = PackageMetadata.from_package(spack.repo.get('mpileaks'))
+    assert metadata.versions
+    assert all(s is None for s in metadata.sources.values())
+
+    def _fail_pkg(cls, pkg):
+        if pkg.name == 'mpileaks':
+            raise RuntimeError('mpileaks is broken')
+        return PackageMetadata(dict(pkg_data, name=pkg.name))
+    pkg_data = metadata.to_dict()
+    monkeypatch.setattr(PackageMetadata, 'from_package',
+                        classmethod(_fail_pkg))
+
+    index = MetadataIndex()
+    index.update_package('builtin.mock.mpileaks')
+    index.update_package('builtin.mock.mpich')
+    assert 'mpileaks' not in index
+    assert 'mpich' in index
+
+
+def test_metadata_index_outdated_by_spack(mock_packages, monkeypatch):
+    repo = spack.repo.path.first_repo()
+    repo.index['metadata']
+    assert not repo.index._needs_update('metadata')
+
+    # base classes of packages changed after the index was written
+    monkeypatch.setattr(spack.repo.MetadataIndexer, 'last_mtime',
+                        lambda self: time.time() + 1000)
+    assert (sorted(repo.index._needs_update('metadata')) ==
+            sorted(repo.all_package_names()))
+    assert not repo.index._needs_update('providers')
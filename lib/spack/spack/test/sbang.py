@@ -16,7 +16,9 @@ import filecmp
 from llnl.util.filesystem import mkdirp
 
 import spack.paths
+import spack.util.prefix_scan
 from spack.hooks.sbang import shebang_too_long, filter_shebangs_in_directory
+from spack.hooks.sbang import filter_shebang_entry
 from spack.util.executable import which
 
 
@@ -111,7 +113,18 @@ def test_shebang_handling(script_dir):
     assert not shebang_too_long(script_dir.directory)
 
     filter_shebangs_in_directory(script_dir.tempdir)
+    check_shebangs_filtered(script_dir)
 
+
+def test_shebang_filtering_in_prefix_scan(script_dir):
+    os.symlink(script_dir.long_shebang,
+               os.path.join(script_dir.directory, 'link'))
+    spack.util.prefix_scan.scan(
+        script_dir.tempdir, [filter_shebang_entry], jobs=4)
+    check_shebangs_filtered(script_dir)
+
+
+def check_shebangs_filtered(script_dir):
     # Make sure this is untouched
     with open(script_dir.short_shebang, 'r') as f:
         assert f.readline() == short_line
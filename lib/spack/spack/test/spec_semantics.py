@@ -4,6 +4,8 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import sys
+import time
+
 import pytest
 
 from spack.spec import Spec, UnsatisfiableSpecError, SpecError
@@ -15,6 +17,7 @@ from spack.variant import MultipleValuesInExclusiveVariantError
 import spack.architecture
 import spack.directives
 import spack.error
+import spack.spec
 
 
 def target_factory(spec_string, target_concrete):
@@ -947,3 +950,44 @@ class TestSpecSematics(object):
 
         with pytest.raises(SpecError):
             spec.prefix
+
+    def test_satisfies_memoized_by_variant_type(self):
+        other = Spec('multivalue_variant foo=baz')
+        assert Spec('multivalue_variant foo=bar').satisfies(other)
+
+        # equal to the spec above, but its variant is multi-valued now
+        spec = Spec('multivalue_variant foo=bar')
+        substitute_abstract_variants(spec)
+        assert not spec.satisfies(other)
+
+    def test_satisfies_after_constrain(self):
+        spec = Spec('libelf@1.0:2.0')
+        assert spec.satisfies('libelf@1.5')
+
+        spec.constrain('libelf@1.8:')
+        assert not spec.satisfies('libelf@1.5')
+
+
+@pytest.mark.maybeslow
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_satisfies_benchmark():
+    """Time node satisfaction checks, with and without memoized results."""
+    nodes = list(Spec('mpileaks').concretized().traverse())
+    constraints = [Spec(s) for s in (
+        'mpileaks@2.3', 'mpileaks@1:3 %gcc', 'callpath@0.9 ~debug',
+        'mpich@3:', 'dyninst%gcc@4.5:', 'libelf cflags=-O3')]
+
+    def check(cached, iterations=100):
+        start = time.time()
+        for i in range(iterations):
+            if not cached:
+                spack.spec._satisfies_cache.clear()
+            for node in nodes:
+                for constraint in constraints:
+                    node.satisfies(constraint, deps=False)
+        return (time.time() - start) / iterations
+
+    uncached, cached = check(False), check(True)
+    print('\n%d node satisfaction checks:' % (len(nodes) * len(constraints)))
+    print('  uncached: %.5fs' % uncached)
+    print('  cached: %.5fs' % cached)
@@ -5,15 +5,20 @@
 
 """Test that the Stage class works correctly."""
 import os
+import hashlib
 import collections
 
 import pytest
 
 from llnl.util.filesystem import working_dir
 
+import spack.caches
+import spack.config
 import spack.paths
 import spack.stage
+import spack.util.crypto
 import spack.util.executable
+import spack.util.file_cache
 
 from spack.resource import Resource
 from spack.stage import Stage, StageComposite, ResourceStage
@@ -406,3 +411,148 @@ class TestStage(object):
         except ThisMustFailHere:
             path = get_stage_path(stage, self.stage_name)
             assert os.path.isdir(path)
+
+
+@pytest.fixture()
+def sizes_cache(tmpdir, monkeypatch):
+    """Records the sizes of builds in a temporary misc_cache."""
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    return cache
+
+
+@pytest.fixture()
+def pristine_stage(mock_archive):
+    """A stage of the mock archive that keeps its pristine sources."""
+    digest = spack.util.crypto.checksum(
+        hashlib.md5, mock_archive.url[len('file://'):])
+    fetcher = spack.fetch_strategy.URLFetchStrategy(mock_archive.url, digest)
+    with spack.config.override('config:stage_pristine', True):
+        yield Stage(fetcher, name='spack-test-stage')
+
+
+def test_select_stage_root(monkeypatch):
+    space = {'/small': 100, '/large': 1000, None: 500}
+    monkeypatch.setattr(spack.stage, 'free_space', lambda r: space[r])
+    roots = ['/small', None, '/large']
+
+    assert spack.stage.select_stage_root(roots) == '/small'
+    assert spack.stage.select_stage_root(roots, 50) == '/small'
+    assert spack.stage.select_stage_root(roots, 400) is None
+    assert spack.stage.select_stage_root(roots, 800) == '/large'
+
+    # without enough space anywhere, use the root with the most
+    assert spack.stage.select_stage_root(roots, 5000) == '/large'
+
+
+@pytest.mark.usefixtures('mock_packages')
+def test_stage_placed_by_recorded_size(
+        mock_archive, sizes_cache, tmpdir, monkeypatch):
+    roots = ['small', 'large']
+    for root in roots:
+        tmpdir.ensure(root, dir=True)
+    monkeypatch.setattr(spack.stage, 'free_space',
+                        lambda r: 10000 if 'large' in r else 1000)
+    mirror_path = 'test-files/test-files-1.0.tar.gz'
+
+    def stage_root():
+        with Stage(mock_archive.url, name='spack-test-stage',
+                   mirror_path=mirror_path) as stage:
+            stage.fetch()
+            stage.expand_archive()
+            real_path = os.path.realpath(stage.path)
+        for root in roots:
+            if real_path.startswith(str(tmpdir.join(root))):
+                return root
+
+    with spack.config.override('config:build_stage',
+                               [str(tmpdir.join(r)) for r in roots]):
+        # without an estimate, the first root is used
+        assert stage_root() == 'small'
+
+        # the size of the build is recorded when its stage is destroyed
+        size = spack.stage.recorded_size(mirror_path)
+        assert size > os.path.getsize(mock_archive.url[len('file://'):])
+        assert spack.stage.recorded_size('other/other-1.0.tar.gz') is None
+
+        spack.stage.record_size(mirror_path, 5000)
+        spack.stage.record_size(mirror_path, 10)
+        assert spack.stage.recorded_size(mirror_path) == 5000
+        assert stage_root() == 'large'
+
+
+def test_sizes_not_recorded_with_one_root(
+        mock_archive, sizes_cache, monkeypatch):
+    mirror_path = 'test-files/test-files-1.0.tar.gz'
+    monkeypatch.setattr(spack.stage, '_build_stage_paths',
+                        lambda: [str(mock_archive.test_tmp_dir)])
+    with Stage(mock_archive.url, name='spack-test-stage',
+               mirror_path=mirror_path) as stage:
+        stage.fetch()
+        stage.expand_archive()
+    assert spack.stage.recorded_size(mirror_path) is None
+
+
+def test_restage_from_pristine_sources(pristine_stage, monkeypatch):
+    stage = pristine_stage
+    stage.create()
+    stage.fetch()
+    stage.check()
+    stage.expand_archive()
+    assert os.path.isdir(stage.pristine_path)
+    assert os.path.dirname(stage.pristine_path) == \
+        os.path.dirname(os.path.realpath(stage.path))
+
+    def fail():
+        raise AssertionError('archive expanded again')
+    monkeypatch.setattr(stage.fetcher, 'expand', fail)
+
+    with open(os.path.join(stage.source_path, 'foobar'), 'w') as f:
+        f.write('this file is to be destroyed.')
+    stage.restage()
+    assert sorted(os.listdir(stage.source_path)) == ['README.txt']
+
+    # the pristine sources survive a stage that is created again
+    stage.destroy(keep_pristine=True)
+    stage.create()
+    stage.fetch()
+    stage.expand_archive()
+    with open(os.path.join(stage.source_path, 'README.txt')) as f:
+        assert f.read() == 'hello world!\n'
+
+    stage.destroy()
+    assert not os.path.exists(stage.pristine_path)
+
+
+def test_modified_pristine_sources_are_not_used(pristine_stage):
+    stage = pristine_stage
+    with stage:
+        stage.fetch()
+        stage.expand_archive()
+
+        # an edit in place that keeps the size of the file
+        readme = os.path.join(
+            stage.pristine_path, 'test-files', 'README.txt')
+        with open(readme, 'r+') as f:
+            f.write('HELLO')
+        stage.restage()
+        with open(os.path.join(stage.source_path, 'README.txt')) as f:
+            assert f.read() == 'hello world!\n'
+        with open(readme) as f:
+            assert f.read() == 'hello world!\n'
+
+
+def test_incomplete_pristine_sources_are_not_used(pristine_stage):
+    stage = pristine_stage
+    with stage:
+        stage.fetch()
+        stage.expand_archive()
+        os.remove(os.path.join(
+            stage.pristine_path, 'test-files', 'README.txt'))
+
+        stage.restage()
+        assert os.path.isfile(os.path.join(stage.source_path, 'README.txt'))
+        # the pristine sources were saved again
+        assert os.path.isfile(os.path.join(
+            stage.pristine_path, 'test-files', 'README.txt'))
+    assert not os.path.exists(stage.pristine_path)
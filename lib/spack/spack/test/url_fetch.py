@@ -10,6 +10,7 @@ from llnl.util.filesystem import working_dir, is_exe
 
 import spack.repo
 import spack.config
+import spack.stage
 from spack.fetch_strategy import from_list_url, URLFetchStrategy
 from spack.spec import Spec
 from spack.version import ver
@@ -135,3 +136,19 @@ def test_hash_detection(checksum_type):
 def test_unknown_hash(checksum_type):
     with pytest.raises(ValueError):
         crypto.Checker('a')
+
+
+def test_fetch_and_expand_keep_cwd(mock_archive, monkeypatch):
+    """URL patches are fetched and expanded in threads, so fetching and
+    expanding archives must not change the working directory of the
+    process."""
+    def chdir(path):
+        raise AssertionError('changed directory to %s' % path)
+
+    fetcher = URLFetchStrategy(mock_archive.url)
+    with spack.stage.Stage(fetcher) as stage:
+        monkeypatch.setattr(os, 'chdir', chdir)
+        stage.fetch()
+        stage.expand_archive()
+        monkeypatch.undo()
+        assert os.path.isfile(os.path.join(stage.source_path, 'configure'))
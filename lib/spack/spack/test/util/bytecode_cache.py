@@ -0,0 +1,87 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Test Spack's bytecode cache for imported source files."""
+import sys
+
+import pytest
+
+import spack.util.imp.bytecode_cache as bytecode_cache
+from spack.util.imp import load_cached_source
+
+module_name = 'spack_test_bytecode_cache_module'
+
+
+@pytest.fixture()
+def source_file(tmpdir):
+    """A source file to import, and the cache directory to use."""
+    source = tmpdir.join('source.py')
+    source.write('value = a + 1\n')
+    yield source, str(tmpdir.join('cache'))
+    sys.modules.pop(module_name, None)
+
+
+def load(source, cache_dir):
+    return load_cached_source(
+        module_name, str(source), cache_dir, prepend='a = 1')
+
+
+def test_load_from_cache(source_file, monkeypatch):
+    source, cache_dir = source_file
+    monkeypatch.setattr(
+        bytecode_cache, 'stats', bytecode_cache.LoadStatistics())
+
+    module = load(source, cache_dir)
+    assert module.value == 2
+    assert module.__file__ == str(source)
+    assert sys.modules[module_name] is module
+    assert bytecode_cache.stats.cached == 0
+
+    module = load(source, cache_dir)
+    assert module.value == 2
+    assert bytecode_cache.stats.loaded == 2
+    assert bytecode_cache.stats.cached == 1
+
+    # modified sources are compiled again
+    source.write('value = a + 2\n')
+    assert load(source, cache_dir).value == 3
+    assert bytecode_cache.stats.cached == 1
+
+
+def test_invalid_cache_entry(source_file):
+    source, cache_dir = source_file
+    load(source, cache_dir)
+
+    cache_file = bytecode_cache.cache_file_for(
+        cache_dir, str(source), b'a = 1\n' + source.read('rb'))
+    with open(cache_file, 'wb') as f:
+        f.write(b'not bytecode')
+
+    assert load(source, cache_dir).value == 2
+    assert bytecode_cache._read_code(cache_file) is not None
+
+
+def test_no_cache_dir(source_file, tmpdir):
+    source, cache_dir = source_file
+    assert load(source, None).value == 2
+    assert not tmpdir.join('cache').check()
+
+
+def test_failed_load_is_not_in_sys_modules(source_file):
+    source, cache_dir = source_file
+    source.write('raise ValueError("failed")\n')
+    with pytest.raises(ValueError):
+        load(source, cache_dir)
+    assert module_name not in sys.modules
+
+
+def test_code_has_the_path_of_its_source(source_file, tmpdir):
+    source, cache_dir = source_file
+    source.write('def f():\n    pass\n')
+    copy = tmpdir.ensure('other', dir=True).join('source.py')
+    source.copy(copy)
+
+    assert load(source, cache_dir).f.__code__.co_filename == str(source)
+    assert load(copy, cache_dir).f.__code__.co_filename == str(copy)
@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
 import sys
 
 import llnl.util.filesystem as fs
@@ -19,6 +20,7 @@ def test_read_unicode(tmpdir):
         with open(script_name, 'w') as f:
             f.write('''#!{0}
 from __future__ import print_function
+import os
 import sys
 if sys.version_info < (3, 0, 0):
     reload(sys)
@@ -32,3 +34,10 @@ print(u'\\xc3')
         # read the unicode back in and see whether things work
         script = ex.Executable('./%s' % script_name)
         assert u'\xc3' == script(output=str).strip()
+
+
+def test_cwd(tmpdir):
+    cwd = tmpdir.ensure('cwd', dir=True)
+    pwd = ex.which('pwd', required=True)
+    assert os.path.realpath(pwd(output=str, cwd=str(cwd)).strip()) == \
+        os.path.realpath(str(cwd))
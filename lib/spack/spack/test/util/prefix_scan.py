@@ -0,0 +1,91 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for scanning install prefixes on behalf of several visitors."""
+import os
+import threading
+
+import pytest
+
+import spack.util.prefix_scan as prefix_scan
+
+
+@pytest.fixture()
+def prefix(tmpdir):
+    """A prefix with nested directories, links and hard links."""
+    tmpdir.ensure('bin', 'tool').write('#!/bin/sh\n')
+    tmpdir.ensure('lib', 'pkgconfig', 'foo.pc').write('prefix=/foo\n')
+    tmpdir.ensure('lib', 'libfoo.so.1').write('\x7fELF')
+    os.symlink('libfoo.so.1', str(tmpdir.join('lib', 'libfoo.so')))
+    os.symlink(str(tmpdir.join('lib')), str(tmpdir.join('lib64')))
+    os.link(str(tmpdir.join('bin', 'tool')), str(tmpdir.join('bin', 'alias')))
+    return tmpdir
+
+
+def scanned_paths(root, jobs):
+    paths, lock = [], threading.Lock()
+
+    def visitor(entry):
+        with lock:
+            paths.append(os.path.relpath(entry.path, root))
+
+    prefix_scan.scan(root, [visitor], jobs=jobs)
+    return paths
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_scan_visits_each_entry_once(prefix, jobs):
+    paths = scanned_paths(str(prefix), jobs)
+
+    # links are visited, but not followed, and hard links are visited once
+    assert len(paths) == len(set(paths))
+    assert len([p for p in paths if p in ('bin/tool', 'bin/alias')]) == 1
+    assert sorted(p for p in paths if p not in ('bin/tool', 'bin/alias')) \
+        == ['bin', 'lib', 'lib/libfoo.so', 'lib/libfoo.so.1',
+            'lib/pkgconfig', 'lib/pkgconfig/foo.pc', 'lib64']
+
+
+def test_scan_entries(prefix):
+    entries = dict((os.path.relpath(e.path, str(prefix)), e)
+                   for e in prefix_scan.entries(str(prefix)))
+
+    assert entries['bin'].is_dir()
+    assert entries['lib64'].is_link() and not entries['lib64'].is_dir()
+    assert entries['lib/libfoo.so'].is_link()
+    assert entries['lib/libfoo.so.1'].is_file()
+
+    head = entries['lib/pkgconfig/foo.pc']
+    assert head.head(6) == b'prefix'
+    assert head.head(3) == b'pre'
+    assert head.head(100) == b'prefix=/foo\n'
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_scan_visitors_in_order(prefix, jobs):
+    visits = {}
+
+    def first(entry):
+        visits[entry.path] = ['first']
+
+    def second(entry):
+        visits[entry.path].append('second')
+
+    prefix_scan.scan(str(prefix), [first, second], jobs=jobs)
+    assert visits
+    assert all(v == ['first', 'second'] for v in visits.values())
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_scan_reraises_visitor_errors(prefix, jobs):
+    def visitor(entry):
+        if entry.path.endswith('foo.pc'):
+            raise ValueError(entry.path)
+
+    with pytest.raises(ValueError):
+        prefix_scan.scan(str(prefix), [visitor], jobs=jobs)
+
+
+def test_scan_missing_root(tmpdir):
+    assert scanned_paths(str(tmpdir.join('missing')), 1) == []
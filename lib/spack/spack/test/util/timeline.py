@@ -0,0 +1,86 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for recording timelines in the Trace Event Format."""
+import json
+import os
+
+import pytest
+
+import spack.util.timeline as timeline
+
+
+@pytest.fixture()
+def recording():
+    timeline.start()
+    yield
+    timeline.stop()
+
+
+def spans(events):
+    return [e for e in events if e['ph'] == 'X']
+
+
+def test_spans_are_not_recorded_by_default():
+    assert not timeline.is_recording()
+    with timeline.span('nothing'):
+        pass
+    assert timeline.take_events() == []
+
+
+def test_nested_spans(recording):
+    @timeline.timed('inner', 'test')
+    def inner():
+        return 42
+
+    with timeline.span('outer', 'test', spec='foo'):
+        assert inner() == 42
+
+    inner_event, outer_event = spans(timeline.take_events())
+    assert inner_event['name'] == 'inner'
+    assert outer_event['name'] == 'outer'
+    assert outer_event['args'] == {'spec': 'foo'}
+    assert outer_event['pid'] == inner_event['pid'] == os.getpid()
+
+    # the inner span lies within the outer one
+    assert outer_event['ts'] <= inner_event['ts']
+    assert (inner_event['ts'] + inner_event['dur'] <=
+            outer_event['ts'] + outer_event['dur'])
+
+
+def test_spans_are_recorded_on_errors(recording):
+    with pytest.raises(ValueError):
+        with timeline.span('failing'):
+            raise ValueError()
+    assert [e['name'] for e in timeline.take_events()] == ['failing']
+
+
+def test_events_since_mark(recording):
+    with timeline.span('before'):
+        pass
+    marker = timeline.mark()
+    with timeline.span('after'):
+        pass
+    timeline.add_events([{'name': 'child', 'ph': 'X', 'pid': 1}])
+
+    names = [e['name'] for e in timeline.events_since(marker)]
+    assert names == ['after', 'child']
+    assert len(timeline.take_events()) == 3
+    assert timeline.take_events() == []
+
+
+def test_recording_writes_trace(tmpdir):
+    path = str(tmpdir.join('trace.json'))
+    with pytest.raises(ValueError):
+        with timeline.recording(path):
+            with timeline.span('work'):
+                raise ValueError()
+    assert not timeline.is_recording()
+
+    with open(path) as f:
+        trace = json.load(f)
+    assert [e['ph'] for e in trace['traceEvents']] == ['M', 'X']
+    assert trace['traceEvents'][0]['args'] == {'name': 'spack'}
+    assert trace['traceEvents'][1]['name'] == 'work'
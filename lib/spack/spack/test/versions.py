@@ -7,6 +7,8 @@
 We try to maintain compatibility with RPM's version semantics
 where it makes sense.
 """
+import time
+
 import pytest
 
 from spack.version import Version, ver
@@ -372,6 +374,49 @@ def test_intersect_with_containment():
     check_intersection('1.6:1.6.5', '1.6', ':1.6.5')
 
 
+def test_intersection_of_long_lists():
+    evens = ['%d' % i for i in range(0, 100, 2)]
+    ranges = ['%d:%d' % (i, i + 1) for i in range(0, 100, 10)]
+    expected = ['%d' % i for i in range(0, 100, 10)]
+    check_intersection(expected, evens, ranges)
+    check_intersection(expected, ranges, evens)
+
+    check_intersection(['1.5', '30:30.5', '99'],
+                       ['1.5', '30:31', '99:'], ['1:1.6', '30:30.5', '99'])
+
+
+def test_in_long_list():
+    versions = ['%d' % i for i in range(0, 100, 2)]
+    assert_in(['0', '12.5', '98:98.5'], versions)
+    assert_in(['0.1:0.2', '50.1', '98'], versions)
+    assert_not_in(['0', '13', '98'], versions)
+    assert_not_in(['12:14'], versions)
+
+
+@pytest.mark.maybeslow
+def test_version_list_benchmark():
+    """Time intersections and containment checks of long version lists."""
+    n = 2000
+    versions = ver(['1.%d' % i for i in range(n)])
+    ranges = ver(['1.%d:1.%d.5' % (i, i) for i in range(0, n, 3)])
+
+    start = time.time()
+    for i in range(10):
+        isection = versions.intersection(ranges)
+    intersection_time = time.time() - start
+    assert len(isection) == len(ranges)
+
+    start = time.time()
+    for i in range(10):
+        assert isection in versions
+    contains_time = time.time() - start
+
+    print('\nversion lists of %d and %d elements:' % (
+        len(versions), len(ranges)))
+    print('  intersection: %.4fs' % (intersection_time / 10))
+    print('  containment: %.4fs' % (contains_time / 10))
+
+
 def test_union_with_containment():
     check_union(':1.6', '1.6.5', ':1.6')
     check_union(':1.6', ':1.6', '1.6.5')
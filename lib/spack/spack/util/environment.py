@@ -6,6 +6,7 @@
 """Utilities for setting and modifying environment variables."""
 import collections
 import contextlib
+import hashlib
 import inspect
 import json
 import os
@@ -18,6 +19,7 @@ import llnl.util.tty as tty
 
 from llnl.util.lang import dedupe
 
+import six
 from six.moves import shlex_quote as cmd_quote
 from six.moves import cPickle
 
@@ -504,6 +506,14 @@ class EnvironmentModifications(object):
                 variables (default: []). Has precedence over blacklist.
             clean (bool): In addition to removing empty entries,
                 also remove duplicate entries (default: False).
+            cache (bool): Reuse and store the modifications in Spack's
+                ``misc_cache`` (default: ``config:sourced_file_cache``)
+            cache_env ([str]): Variables that determine the modifications
+                made by the file.  Cached modifications are reused only
+                while these variables have the same value (default: the
+                whole environment)
+            cache_files ([str]): Other files sourced or read by the file,
+                whose content is part of the cache key (default: [])
 
         Returns:
             EnvironmentModifications: an object that, if executed, has
@@ -520,9 +530,27 @@ class EnvironmentModifications(object):
         source_command         = kwargs.get('source_command', 'source')
         suppress_output        = kwargs.get('suppress_output', '&> /dev/null')
         concatenate_on_success = kwargs.get('concatenate_on_success', '&&')
-        blacklist              = kwargs.get('blacklist', [])
+        blacklist              = list(kwargs.get('blacklist', []))
         whitelist              = kwargs.get('whitelist', [])
         clean                  = kwargs.get('clean', False)
+        cache                  = kwargs.get('cache', None)
+        cache_env              = kwargs.get('cache_env', None)
+        cache_files            = kwargs.get('cache_files', [])
+
+        if cache is None:
+            import spack.config
+            cache = spack.config.get('config:sourced_file_cache', False)
+
+        if cache:
+            cache_key = _sourced_file_cache_key(
+                [filename] + list(cache_files), args, [
+                    shell, shell_options, source_command, suppress_output,
+                    concatenate_on_success, blacklist, whitelist, clean,
+                    cache_env])
+            cache_inputs = _sourced_file_inputs(cache_env)
+            env = _read_sourced_file_cache(cache_key, cache_inputs)
+            if env is not None:
+                return env
 
         source_file = [source_command, filename]
         source_file.extend(args)
@@ -687,9 +715,112 @@ class EnvironmentModifications(object):
                 # We just need to set the variable to the new value
                 env.set(x, after)
 
+        if cache:
+            _write_sourced_file_cache(cache_key, cache_inputs, env)
+
         return env
 
 
+#: Modifications made by sourcing files, by class name.
+_sourced_file_actions = dict((cls.__name__, cls) for cls in (
+    SetEnv, UnsetEnv, AppendPath, PrependPath, RemovePath))
+
+#: Maximum number of cached results for the same sourced file and
+#: arguments, that differ by the values of input variables.
+sourced_file_cache_entries = 16
+
+
+def _sourced_file_cache_key(filenames, args, options):
+    """Key of the ``misc_cache`` entry for the modifications made by
+    sourcing ``filenames[0]`` with ``args``.
+
+    The key covers the content and location of the file and of the other
+    files it reads, its arguments and the options used to source it.
+    """
+    contents = []
+    for filename in filenames:
+        try:
+            with open(filename, 'rb') as f:
+                content = hashlib.sha256(f.read()).hexdigest()
+        except (IOError, OSError):
+            content = None
+        contents.append([content, os.path.realpath(filename)])
+    key = json.dumps([contents, [str(a) for a in args], repr(options)])
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join('sourced-files', digest + '.json')
+
+
+def _sourced_file_inputs(variables=None):
+    """Values of the variables that determine the modifications made by
+    sourcing a file.
+
+    Files can branch on any variable they read, so without a list of
+    ``variables`` the input is a digest of the whole environment.
+    """
+    if variables is None:
+        environ = repr(sorted(os.environ.items())).encode('utf-8')
+        return {'': hashlib.sha256(environ).hexdigest()}
+    return dict((v, os.environ.get(v)) for v in variables)
+
+
+def _read_sourced_file_cache(key, inputs):
+    """Return cached modifications for ``key`` that were computed from
+    the same ``inputs``, or None.
+    """
+    import spack.caches
+    cache = spack.caches.misc_cache
+    try:
+        if not cache.init_entry(key):
+            return None
+        with cache.read_transaction(key) as f:
+            entries = json.load(f)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot read sourced file cache: {0}'.format(e))
+        return None
+
+    for entry in entries:
+        if entry['inputs'] == inputs:
+            env = EnvironmentModifications()
+            for action, item_args in entry['modifications']:
+                cls = _sourced_file_actions[action]
+                item_args = _native_strings(item_args)
+                env.env_modifications.append(cls(**item_args))
+            return env
+    return None
+
+
+def _write_sourced_file_cache(key, inputs, env):
+    """Add the modifications in ``env``, computed from ``inputs``, to the
+    cache entry for ``key``."""
+    import spack.caches
+    entry = {
+        'inputs': inputs,
+        'modifications': [[type(x).__name__, x.args] for x in env],
+    }
+
+    cache = spack.caches.misc_cache
+    try:
+        cache.init_entry(key)
+        with cache.write_transaction(key) as (old, new):
+            entries = json.load(old) if old else []
+            entries = [e for e in entries if e['inputs'] != entry['inputs']]
+            entries.insert(0, entry)
+            json.dump(entries[:sourced_file_cache_entries], new)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot write sourced file cache: {0}'.format(e))
+
+
+def _native_strings(args):
+    """Convert the unicode strings json gives us to str on Python 2, so
+    that they can be used as kwargs and put in os.environ.
+    """
+    if sys.version_info[0] >= 3:
+        return args
+    return dict((k.encode('utf-8'), v.encode('utf-8')
+                 if isinstance(v, six.text_type) else v)
+                for k, v in args.items())
+
+
 def concatenate_paths(paths, separator=':'):
     """Concatenates an iterable of paths into a string of paths separated by
     separator, defaulting to colon.
@@ -88,6 +88,10 @@ class Executable(object):
             input: Where to read stdin from
             output: Where to send stdout
             error: Where to send stderr
+            cwd (str): Directory to run the executable in, instead of the
+                current working directory.  Unlike ``working_dir``, this
+                does not change the working directory of the process, so
+                it is safe to use from threads
 
         Accepted values for input, output, and error:
 
@@ -125,6 +129,7 @@ class Executable(object):
         input  = kwargs.pop('input',  None)
         output = kwargs.pop('output', None)
         error  = kwargs.pop('error',  None)
+        cwd    = kwargs.pop('cwd',    None)
 
         if input is str:
             raise ValueError('Cannot use `str` as input stream.')
@@ -164,7 +169,8 @@ class Executable(object):
                 stdin=istream,
                 stderr=estream,
                 stdout=ostream,
-                env=env)
+                env=env,
+                cwd=cwd)
             out, err = proc.communicate()
 
             result = None
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import threading
 
 import spack.paths
 from spack.util.executable import Executable
@@ -11,6 +12,9 @@ from spack.util.executable import Executable
 
 GNUPGHOME = spack.paths.gpg_path
 
+#: Fingerprints of the signing keys in each GNUPGHOME, see signing_keys()
+_signing_keys = {}
+
 
 class Gpg(object):
     @staticmethod
@@ -40,29 +44,40 @@ class Gpg(object):
         %%commit
         ''' % kwargs)
         w.close()
+        _signing_keys.pop(GNUPGHOME, None)
         cls.gpg()('--gen-key', '--batch', input=r)
         r.close()
 
     @classmethod
     def signing_keys(cls):
-        keys = []
-        output = cls.gpg()('--list-secret-keys', '--with-colons',
-                           '--fingerprint', output=str)
-        for line in output.split('\n'):
-            if line.startswith('fpr'):
-                keys.append(line.split(':')[9])
-        return keys
+        """Fingerprints of the secret keys.
+
+        They are listed once per process, and listed again after keys
+        are created, trusted or untrusted through this class.
+        """
+        if GNUPGHOME not in _signing_keys:
+            keys = []
+            output = cls.gpg()('--list-secret-keys', '--with-colons',
+                               '--fingerprint', output=str)
+            for line in output.split('\n'):
+                if line.startswith('fpr'):
+                    keys.append(line.split(':')[9])
+            _signing_keys[GNUPGHOME] = keys
+        return list(_signing_keys[GNUPGHOME])
 
     @classmethod
     def export_keys(cls, location, *keys):
         cls.gpg()('--armor', '--export', '--output', location, *keys)
 
     @classmethod
-    def trust(cls, keyfile):
-        cls.gpg()('--import', keyfile)
+    def trust(cls, *keyfiles):
+        """Import keys from one or more files, with a single gpg process."""
+        _signing_keys.pop(GNUPGHOME, None)
+        cls.gpg()('--import', *keyfiles)
 
     @classmethod
     def untrust(cls, signing, *keys):
+        _signing_keys.pop(GNUPGHOME, None)
         args = [
             '--yes',
             '--batch',
@@ -92,9 +107,46 @@ class Gpg(object):
     def verify(cls, signature, file):
         cls.gpg()('--verify', signature, file)
 
+    @classmethod
+    def start_verify(cls, signature, file):
+        """Start verifying ``file`` against ``signature`` in the background.
+
+        Returns:
+            Verification: wait() on it to get the result
+        """
+        return Verification(cls.gpg(), signature, file)
+
     @classmethod
     def list(cls, trusted, signing):
         if trusted:
             cls.gpg()('--list-public-keys')
         if signing:
             cls.gpg()('--list-secret-keys')
+
+
+class Verification(object):
+    """A signature verification running in the background.
+
+    This lets callers go on with work that does not depend on the
+    signature, e.g. checksumming and extracting the files, while gpg
+    starts up and reads the keyring.
+    """
+
+    def __init__(self, gpg, signature, file):
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._verify, args=(gpg, signature, file))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _verify(self, gpg, signature, file):
+        try:
+            gpg('--verify', signature, file)
+        except Exception as e:
+            self.error = e
+
+    def wait(self):
+        """Wait for the verification, and raise its error if it failed."""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
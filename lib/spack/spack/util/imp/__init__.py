@@ -13,10 +13,13 @@ Python version to Python version, and we should be able to adapt our
 approach to the underlying implementation.
 
 Currently, this uses ``importlib.machinery`` where available and ``imp``
-when ``importlib`` is not completely usable.
+when ``importlib`` is not completely usable.  ``load_cached_source`` is
+an importer that stores compiled bytecode in a cache directory.
 """
 
 try:
     from .importlib_importer import load_source  # noqa
 except ImportError:
     from .imp_importer import load_source        # noqa
+
+from .bytecode_cache import load_cached_source  # noqa
@@ -0,0 +1,159 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Imports of Python source files through a cache of compiled bytecode.
+
+Package files are imported under synthetic module names, so they never
+benefit from ``__pycache__``, and package repositories are often
+read-only anyway.  The loader here compiles a source file once, and
+stores its code object in a user-writable directory, in a file named
+after a hash of the source, of its absolute path and of the bytecode
+version of the running interpreter.  Stale entries are never used: a
+modified source has a new hash.  The path is part of the hash because
+code objects record the file they were compiled from, for tracebacks
+and ``inspect``.
+"""
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import time
+import types
+
+import llnl.util.tty as tty
+from llnl.util.filesystem import mkdirp
+
+try:
+    from importlib.util import MAGIC_NUMBER as _magic
+except ImportError:  # Python < 3.4
+    import imp
+    _magic = imp.get_magic()
+
+
+class LoadStatistics(object):
+    """Counts the modules loaded by ``load_cached_source()``."""
+
+    def __init__(self):
+        #: number of modules loaded
+        self.loaded = 0
+        #: how many of them were loaded from the bytecode cache
+        self.cached = 0
+        #: total time spent loading them, in seconds
+        self.seconds = 0.0
+
+    def __str__(self):
+        return '%d modules loaded in %.3fs (%d from bytecode cache)' % (
+            self.loaded, self.seconds, self.cached)
+
+
+#: Statistics on the modules loaded in this process
+stats = LoadStatistics()
+
+
+def cache_file_for(cache_dir, path, source):
+    """Path of the bytecode cache entry for ``source`` (bytes), read from
+    the file at ``path``."""
+    path = os.path.abspath(path)
+    if not isinstance(path, bytes):
+        path = path.encode('utf-8')
+    digest = hashlib.sha256(_magic + path + b'\0' + source).hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest[2:] + '.pyc')
+
+
+def _read_code(cache_file):
+    """Return the code object stored in ``cache_file``, or None if there
+    is no valid entry there.
+    """
+    try:
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+
+    if not data.startswith(_magic):
+        return None
+    try:
+        code = marshal.loads(data[len(_magic):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, types.CodeType) else None
+
+
+def _write_code(cache_file, code):
+    """Atomically store ``code`` in ``cache_file``, if possible."""
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        mkdirp(cache_dir)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_magic + marshal.dumps(code))
+            os.rename(tmp, cache_file)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    except (IOError, OSError) as e:
+        tty.debug('Cannot write bytecode cache: {0}'.format(e))
+
+
+def load_cached_source(full_name, path, cache_dir, prepend=None):
+    """Import a Python module from source, using a bytecode cache.
+
+    Load the source file and add it to ``sys.modules``, like
+    ``load_source()``, but reuse the code compiled by previous loads of
+    the same source.
+
+    Args:
+        full_name (str): full name of the module to be loaded
+        path (str): path to the file that should be loaded
+        cache_dir (str or None): directory where compiled code is stored;
+            if None, the source is compiled and nothing is cached
+        prepend (str, optional): some optional code to prepend to the
+            loaded module; e.g., can be used to inject import statements
+
+    Returns:
+        (ModuleType): the loaded module
+    """
+    start = time.time()
+
+    with open(path, 'rb') as f:
+        source = f.read()
+    if prepend is not None:
+        source = prepend.encode('utf-8') + b'\n' + source
+    if not source.endswith(b'\n'):
+        source += b'\n'
+
+    code = None
+    if cache_dir is not None:
+        cache_file = cache_file_for(cache_dir, path, source)
+        code = _read_code(cache_file)
+
+    if code is not None:
+        stats.cached += 1
+    else:
+        code = compile(source, path, 'exec', 0, True)
+        if cache_dir is not None:
+            _write_code(cache_file, code)
+
+    # Like the import system, re-execute modules that were already loaded
+    # in place, and only clean up after modules that are new.
+    module = sys.modules.get(full_name)
+    is_new = module is None
+    if is_new:
+        module = types.ModuleType(full_name)
+        sys.modules[full_name] = module
+    module.__file__ = path
+
+    try:
+        exec(code, module.__dict__)
+    except BaseException:
+        if is_new:
+            del sys.modules[full_name]
+        raise
+
+    stats.loaded += 1
+    stats.seconds += time.time() - start
+    return module
@@ -13,6 +13,7 @@ from llnl.util.lock import *  # noqa
 import spack.config
 import spack.error
 import spack.paths
+import spack.util.timeline
 
 
 class Lock(llnl.util.lock.Lock):
@@ -28,7 +29,8 @@ class Lock(llnl.util.lock.Lock):
 
     def _lock(self, op, timeout=0):
         if self._enable:
-            return super(Lock, self)._lock(op, timeout)
+            with spack.util.timeline.span('lock', 'lock', path=self.path):
+                return super(Lock, self)._lock(op, timeout)
         else:
             return 0, 0
 
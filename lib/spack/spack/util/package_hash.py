@@ -4,8 +4,16 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import ast
+import copy
+from binascii import hexlify, unhexlify
 import hashlib
+import json
+import os
+import sys
 
+import llnl.util.tty as tty
+
+import spack
 import spack.repo
 import spack.package
 import spack.directives
@@ -58,6 +66,15 @@ class RemoveDirectives(ast.NodeTransformer):
         return node
 
 
+def _when_condition(node):
+    """Condition of a @when-decorated method, or None."""
+    if node.decorator_list:
+        dec = node.decorator_list[0]
+        if isinstance(dec, ast.Call) and dec.func.id == 'when':
+            return dec.args[0].s
+    return None
+
+
 class TagMultiMethods(ast.NodeVisitor):
     """Tag @when-decorated methods in a spec."""
     def __init__(self, spec):
@@ -67,14 +84,25 @@ class TagMultiMethods(ast.NodeVisitor):
     def visit_FunctionDef(self, node):  # noqa
         nodes = self.methods.setdefault(node.name, [])
         if node.decorator_list:
-            dec = node.decorator_list[0]
-            if isinstance(dec, ast.Call) and dec.func.id == 'when':
-                cond = dec.args[0].s
+            cond = _when_condition(node)
+            if cond is not None:
                 nodes.append((node, self.spec.satisfies(cond, strict=True)))
         else:
             nodes.append((node, None))
 
 
+class FindWhenConditions(ast.NodeVisitor):
+    """Collect the conditions of @when-decorated methods, in the order
+    TagMultiMethods visits them."""
+    def __init__(self):
+        self.conditions = []
+
+    def visit_FunctionDef(self, node):  # noqa
+        cond = _when_condition(node)
+        if cond is not None:
+            self.conditions.append(cond)
+
+
 class ResolveMultiMethods(ast.NodeTransformer):
     """Remove methods which do not exist if their @when is not satisfied."""
     def __init__(self, methods):
@@ -105,22 +133,38 @@ def package_content(spec):
 
 
 def package_hash(spec, content=None):
-    if content is None:
-        content = package_content(spec)
-    return hashlib.sha256(content.encode('utf-8')).digest().lower()
+    """Hash of the code of the package of ``spec``, as it applies to
+    ``spec``.
+
+    Unless ``content`` is given, hashes are cached in ``misc_cache`` by
+    content of the package file and by which of its @when conditions
+    ``spec`` satisfies, so the package file is only parsed again if it
+    changed, or for new combinations of conditions.
+    """
+    if content is not None:
+        return _hash_content(content)
+
+    spec = _as_spec(spec)
+    source = _package_source(spec.name)
+    entry = _hash_cache_entry(source)
+    key = ''.join('1' if spec.satisfies(cond, strict=True) else '0'
+                  for cond in entry['conditions'])
+
+    hexdigest = entry['hashes'].get(key)
+    if hexdigest is None:
+        digest = _hash_content(ast.dump(_package_ast(spec, source)))
+        hexdigest = entry['hashes'][key] = hexlify(digest).decode('ascii')
+        _write_hash_cache_entry(source, entry)
+    return unhexlify(hexdigest)
 
 
 def package_ast(spec):
-    spec = spack.spec.Spec(spec)
+    spec = _as_spec(spec)
+    return _package_ast(spec, _package_source(spec.name))
 
-    filename = spack.repo.path.filename_for_package_name(spec.name)
-    with open(filename) as f:
-        text = f.read()
-        root = ast.parse(text)
 
-    root = RemoveDocstrings().visit(root)
-
-    RemoveDirectives(spec).visit(root)
+def _package_ast(spec, source):
+    root = copy.deepcopy(_parsed_package(source)[0])
 
     fmm = TagMultiMethods(spec)
     fmm.visit(root)
@@ -129,5 +173,113 @@ def package_ast(spec):
     return root
 
 
+def _as_spec(spec):
+    if isinstance(spec, spack.spec.Spec):
+        return spec
+    return spack.spec.Spec(spec)
+
+
+def _hash_content(content):
+    return hashlib.sha256(content.encode('utf-8')).digest().lower()
+
+
+class _PackageSource(object):
+    """Text of a package file, with a digest of everything its hash
+    depends on."""
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+
+        # ast.dump() output differs between Python versions, and hashing
+        # may change from a version of Spack to another
+        key = json.dumps([name, text, spack.spack_version,
+                          list(sys.version_info[:2])])
+        self.digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _package_source(name):
+    filename = spack.repo.path.filename_for_package_name(name)
+    with open(filename) as f:
+        return _PackageSource(name, f.read())
+
+
+#: Parsed package files, without docstrings and directives, and their
+#: @when conditions, by digest of their source
+_parsed_packages = {}
+
+
+def _parsed_package(source):
+    """Parse a package file once per process.
+
+    Returns:
+        tuple: the AST, which must not be modified, and the list of
+            conditions of its @when-decorated methods
+    """
+    parsed = _parsed_packages.get(source.digest)
+    if parsed is None:
+        root = ast.parse(source.text)
+        root = RemoveDocstrings().visit(root)
+        RemoveDirectives(spack.spec.Spec(source.name)).visit(root)
+
+        conditions = FindWhenConditions()
+        conditions.visit(root)
+        parsed = _parsed_packages[source.digest] = (
+            root, conditions.conditions)
+    return parsed
+
+
+#: Entries of the hash cache read or computed by this process, by digest
+#: of their package source
+_hash_cache_entries = {}
+
+
+def _hash_cache_key(source):
+    return os.path.join('package-hashes', source.digest + '.json')
+
+
+def _hash_cache_entry(source):
+    """Cached hashes for a package file: its @when conditions and a dict
+    from the conditions that a spec satisfies (as a string of 0s and 1s)
+    to the hash of the package for that spec.
+    """
+    entry = _hash_cache_entries.get(source.digest)
+    if entry is not None:
+        return entry
+
+    import spack.caches
+    cache = spack.caches.misc_cache
+    key = _hash_cache_key(source)
+    try:
+        if cache.init_entry(key):
+            with cache.read_transaction(key) as f:
+                entry = json.load(f)
+            # json gives unicode strings on Python 2
+            entry['conditions'] = [str(c) for c in entry['conditions']]
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot read package hash cache: {0}'.format(e))
+
+    if entry is None:
+        entry = {'conditions': _parsed_package(source)[1], 'hashes': {}}
+    _hash_cache_entries[source.digest] = entry
+    return entry
+
+
+def _write_hash_cache_entry(source, entry):
+    """Merge the hashes in ``entry`` into its cache file."""
+    import spack.caches
+    cache = spack.caches.misc_cache
+    key = _hash_cache_key(source)
+    try:
+        cache.init_entry(key)
+        with cache.write_transaction(key) as (old, new):
+            if old:
+                hashes = json.load(old)['hashes']
+                hashes.update(entry['hashes'])
+                entry['hashes'] = hashes
+            json.dump(entry, new)
+    except (IOError, OSError, ValueError) as e:
+        tty.debug('Cannot write package hash cache: {0}'.format(e))
+
+
 class PackageHashError(spack.error.SpackError):
     """Raised for all errors encountered during package hashing."""
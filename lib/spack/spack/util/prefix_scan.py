@@ -0,0 +1,128 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Scan a directory tree once on behalf of several visitors.
+
+Hooks that look at every file of an install prefix would otherwise each
+walk the prefix, and stat or read the same files again.  ``scan()`` walks
+the tree once, ``lstat``s each entry once and keeps what was read of
+each file, and calls all the visitors on each entry from a pool of
+threads, so that the latency of slow (e.g. parallel) filesystems is
+overlapped.
+"""
+import multiprocessing
+import multiprocessing.pool
+import os
+import stat
+
+try:
+    from os import scandir
+except ImportError:  # Python < 3.5
+    scandir = None
+
+
+class PrefixEntry(object):
+    """A file, directory or link found by ``scan()``.
+
+    Attributes:
+        path (str): path of the entry
+        stat: result of ``os.lstat()`` on the entry
+    """
+    __slots__ = ('path', 'stat', '_head')
+
+    def __init__(self, path, lstat):
+        self.path = path
+        self.stat = lstat
+        self._head = None
+
+    def is_dir(self):
+        return stat.S_ISDIR(self.stat.st_mode)
+
+    def is_file(self):
+        return stat.S_ISREG(self.stat.st_mode)
+
+    def is_link(self):
+        return stat.S_ISLNK(self.stat.st_mode)
+
+    def head(self, size):
+        """Return the first ``size`` bytes of a regular file.
+
+        The file is only read again if more bytes are asked for than
+        before, so that visitors of the same entry share the read.
+        """
+        if self._head is None or self._head[0] < size:
+            with open(self.path, 'rb') as f:
+                self._head = (size, f.read(size))
+        return self._head[1][:size]
+
+
+def _list_directory(directory):
+    """Paths and ``lstat`` results of the entries of ``directory``."""
+    if scandir is not None:
+        return [(e.path, e.stat(follow_symlinks=False))
+                for e in scandir(directory)]
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return [(path, os.lstat(path)) for path in paths]
+
+
+def entries(root):
+    """Yield a ``PrefixEntry`` for everything under ``root``.
+
+    Links are not followed, and files with several hard links in the
+    tree are only yielded once.  Like ``os.walk()``, directories that
+    can't be listed are skipped.
+    """
+    seen = set()
+    directories = [root]
+    while directories:
+        try:
+            listing = _list_directory(directories.pop())
+        except OSError:
+            continue
+
+        for path, lstat in listing:
+            if stat.S_ISDIR(lstat.st_mode):
+                directories.append(path)
+            elif lstat.st_nlink > 1 and stat.S_ISREG(lstat.st_mode):
+                inode = (lstat.st_dev, lstat.st_ino)
+                if inode in seen:
+                    continue
+                seen.add(inode)
+            yield PrefixEntry(path, lstat)
+
+
+def scan(root, visitors, jobs=None):
+    """Call each of ``visitors`` on each entry under ``root``.
+
+    Visitors of the same entry are called in order, in the same thread,
+    while different entries are visited concurrently.  An exception
+    raised by a visitor stops the scan, and is re-raised.
+
+    Args:
+        root (str): directory to scan
+        visitors (list): functions that take a ``PrefixEntry``
+        jobs (int): number of threads to visit entries with, default is
+            the number of CPUs
+    """
+    if not visitors:
+        return
+
+    def visit(entry):
+        for visitor in visitors:
+            visitor(entry)
+
+    jobs = jobs or multiprocessing.cpu_count()
+    if jobs == 1:
+        for entry in entries(root):
+            visit(entry)
+        return
+
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        for _ in pool.imap_unordered(visit, entries(root), chunksize=64):
+            pass
+    finally:
+        pool.terminate()
+        pool.join()
@@ -26,6 +26,9 @@ def load(stream):
     else:
         load = json.load
 
+    # strings are already str in Python 3, so there is nothing to convert
+    if sys.version_info[0] >= 3:
+        return load(stream)
     return _strify(load(stream, object_hook=_strify), ignore_dicts=True)
 
 
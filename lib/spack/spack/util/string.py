@@ -2,6 +2,11 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import re
+
+#: Multipliers of the units accepted by ``parse_size()``
+size_units = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3,
+              'T': 1024 ** 4}
 
 
 def comma_list(sequence, article=''):
@@ -55,3 +60,16 @@ def plural(n, singular, plural=None, show_n=True):
         return "%s%s" % (number, plural)
     else:
         return "%s%ss" % (number, singular)
+
+
+def parse_size(string):
+    """Parse a size in bytes, with an optional K, M, G or T suffix.
+
+    Raises:
+        ValueError: if ``string`` is not a size
+    """
+    match = re.match(r'^\s*(\d+(?:\.\d*)?)\s*([KMGT]?)i?B?\s*$',
+                     string, re.IGNORECASE)
+    if not match:
+        raise ValueError('invalid size: %s' % string)
+    return int(float(match.group(1)) * size_units[match.group(2).upper()])
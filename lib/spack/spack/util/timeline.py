@@ -0,0 +1,152 @@
+# Copyright 2013-2019 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Timelines of what Spack spends its time on.
+
+Code that may take a while is wrapped in ``span()``, which records when it
+started and how long it took while a timeline is being recorded, e.g.
+with ``spack install --timeline``, and does nothing otherwise.  Spans are
+nested by time: a span that starts and ends within another one is shown
+inside it.
+
+Timelines are written in the Trace Event Format, which can be viewed in
+``chrome://tracing`` or https://ui.perfetto.dev.  Events recorded by
+forked build processes are sent back to their parent by
+``spack.build_environment.fork()``, and shown as separate processes.
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+#: Whether spans are recorded
+_recording = False
+
+#: Events recorded by this process
+_events = []
+_events_lock = threading.Lock()
+
+
+def start():
+    """Start recording spans."""
+    global _recording
+    _recording = True
+
+
+def stop():
+    """Stop recording spans, and return the events recorded so far."""
+    global _recording
+    _recording = False
+    return take_events()
+
+
+def is_recording():
+    return _recording
+
+
+def _add_event(event):
+    with _events_lock:
+        _events.append(event)
+
+
+def record(name, start_time, end_time, category='spack', **args):
+    """Record a span from ``start_time`` to ``end_time``, as given by
+    ``time.time()``, if a timeline is being recorded."""
+    if _recording:
+        _add_event({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': int(start_time * 1e6),
+            'dur': int((end_time - start_time) * 1e6),
+            'pid': os.getpid(),
+            'tid': threading.current_thread().ident,
+            'args': args,
+        })
+
+
+@contextlib.contextmanager
+def span(name, category='spack', **args):
+    """Record the time spent in a ``with`` block as a span named ``name``.
+
+    Args:
+        name (str): name of the span
+        category (str): category of the span, e.g. ``phase`` or ``hook``
+        args: details shown with the span (must be JSON-serializable)
+    """
+    if not _recording:
+        yield
+        return
+
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        record(name, start_time, time.time(), category, **args)
+
+
+def timed(name, category='spack'):
+    """Decorator recording each call of a function as a span."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def name_process(name):
+    """Name the current process in the timeline."""
+    if _recording:
+        _add_event({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+                    'args': {'name': name}})
+
+
+def mark():
+    """Return a marker to get the events recorded after this call with
+    ``events_since()``."""
+    with _events_lock:
+        return len(_events)
+
+
+def events_since(marker):
+    """Events recorded since ``mark()`` returned ``marker``."""
+    with _events_lock:
+        return _events[marker:]
+
+
+def take_events():
+    """Return the events recorded so far, and forget them."""
+    with _events_lock:
+        events = _events[:]
+        del _events[:]
+    return events
+
+
+def add_events(events):
+    """Add events recorded by another process."""
+    with _events_lock:
+        _events.extend(events)
+
+
+def write(path, events):
+    """Write ``events`` to ``path`` in the Trace Event Format."""
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+@contextlib.contextmanager
+def recording(path):
+    """Record a timeline in a ``with`` block, and write it to ``path``,
+    even if the block raises an exception."""
+    start()
+    name_process('spack')
+    try:
+        yield
+    finally:
+        write(path, stop())
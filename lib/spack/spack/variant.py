@@ -208,6 +208,7 @@ class AbstractVariant(object):
     do it if it grows up to be a multi valued variant with the right set of
     values.
     """
+    __slots__ = ('name', '_value', '_original_value')
 
     def __init__(self, name, value):
         self.name = name
@@ -355,6 +356,9 @@ class AbstractVariant(object):
 
 class MultiValuedVariant(AbstractVariant):
     """A variant that can hold multiple values at once."""
+    # the 'patches' variant also records the order in which they're applied
+    __slots__ = ('_patches_in_order_of_appearance',)
+
     @implicit_variant_conversion
     def satisfies(self, other):
         """Returns true if ``other.name == self.name`` and ``other.value`` is
@@ -377,6 +381,7 @@ class MultiValuedVariant(AbstractVariant):
 
 class SingleValuedVariant(MultiValuedVariant):
     """A variant that can hold multiple values, but one at a time."""
+    __slots__ = ()
 
     def _value_setter(self, value):
         # Treat the value as a multi-valued variant
@@ -420,6 +425,7 @@ class SingleValuedVariant(MultiValuedVariant):
 
 class BoolValuedVariant(SingleValuedVariant):
     """A variant that can hold either True or False."""
+    __slots__ = ()
 
     def _value_setter(self, value):
         # Check the string representation of the value and turn
@@ -446,6 +452,7 @@ class VariantMap(lang.HashableMap):
     """Map containing variant instances. New values can be added only
     if the key is not already present.
     """
+    __slots__ = ('spec',)
 
     def __init__(self, spec):
         super(VariantMap, self).__init__()
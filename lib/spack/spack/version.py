@@ -94,6 +94,7 @@ def coerced(method):
 
 class Version(object):
     """Class to represent versions"""
+    __slots__ = ('string', 'version', 'separators')
 
     def __init__(self, string):
         string = str(string)
@@ -375,6 +376,7 @@ class Version(object):
 
 
 class VersionRange(object):
+    __slots__ = ('start', 'end')
 
     def __init__(self, start, end):
         if isinstance(start, string_types):
@@ -578,6 +580,7 @@ class VersionRange(object):
 
 class VersionList(object):
     """Sorted, non-redundant list of Versions and VersionRanges."""
+    __slots__ = ('versions',)
 
     def __init__(self, vlist=None):
         self.versions = []
@@ -719,11 +722,23 @@ class VersionList(object):
 
     @coerced
     def intersection(self, other):
-        # TODO: make this faster.  This is O(n^2).
+        """Intersection of two version lists.
+
+        Both lists are sorted and their elements don't overlap, so each
+        element of this list can only intersect the elements of ``other``
+        from the one before its bisection point to the first one that
+        lies entirely after it.
+        """
         result = VersionList()
         for s in self:
-            for o in other:
-                result.add(s.intersection(o))
+            i = max(bisect_left(other, s) - 1, 0)
+            while i < len(other):
+                o = other[i]
+                if s.overlaps(o):
+                    result.add(s.intersection(o))
+                elif s < o:
+                    break
+                i += 1
         return result
 
     @coerced
@@ -743,11 +758,9 @@ class VersionList(object):
             return False
 
         for version in other:
-            i = bisect_left(self, other)
-            if i == 0:
-                if version not in self[0]:
-                    return False
-            elif all(version not in v for v in self[i - 1:]):
+            # only the neighbors of its bisection point can contain version
+            i = bisect_left(self, version)
+            if not any(version in v for v in self[max(i - 1, 0):i + 1]):
                 return False
 
         return True
@@ -798,6 +811,18 @@ class VersionList(object):
         return str(self.versions)
 
 
+#: Versions parsed by ``ver()``, by string.  Versions are immutable, so
+#: all the specs read from a database share these instances.
+_interned_versions = {}
+
+
+def _interned_version(string):
+    version = _interned_versions.get(string)
+    if version is None:
+        version = _interned_versions[string] = Version(string)
+    return version
+
+
 def _string_to_version(string):
     """Converts a string to a Version, VersionList, or VersionRange.
        This is private.  Client code should use ver().
@@ -809,12 +834,12 @@ def _string_to_version(string):
 
     elif ':' in string:
         s, e = string.split(':')
-        start = Version(s) if s else None
-        end = Version(e) if e else None
+        start = _interned_version(s) if s else None
+        end = _interned_version(e) if e else None
         return VersionRange(start, end)
 
     else:
-        return Version(string)
+        return _interned_version(string)
 
 
 def ver(obj):
@@ -0,0 +1,24 @@
+-- -*- lua -*-
+-- Module file created by spack (https://github.com/spack/spack) on 2026-10-19 03:18:11.620679
+--
+-- a@2.0%gcc@4.5.0+bvv foo=bar foobar=bar arch=test-debian6-x86_64/sbqz267
+--
+
+whatis([[Name : a]])
+whatis([[Version : 2.0]])
+whatis([[Short description : Simple package with one optional dependency]])
+
+help([[Simple package with one optional dependency]])
+
+
+if not isloaded("b/1.0-aosqxaa") then
+    load("b/1.0-aosqxaa")
+end
+
+prepend_path("PATH", "/tmp/pytest-of-root/pytest-232/install_for_database0/test-debian6-x86_64/gcc-4.5.0/a-2.0-sbqz267vg2qfw457wwgo6wvjdahjgbde/bin", ":")
+prepend_path("MANPATH", "/tmp/pytest-of-root/pytest-232/install_for_database0/test-debian6-x86_64/gcc-4.5.0/a-2.0-sbqz267vg2qfw457wwgo6wvjdahjgbde/man", ":")
+prepend_path("LD_LIBRARY_PATH", "/tmp/pytest-of-root/pytest-232/install_for_database0/test-debian6-x86_64/gcc-4.5.0/a-2.0-sbqz267vg2qfw457wwgo6wvjdahjgbde/lib", ":")
+prepend_path("LIBRARY_PATH", "/tmp/pytest-of-root/pytest-232/install_for_database0/test-debian6-x86_64/gcc-4.5.0/a-2.0-sbqz267vg2qfw457wwgo6wvjdahjgbde/lib", ":")
+prepend_path("CPATH", "/tmp/pytest-of-root/pytest-232/install_for_database0/test-debian6-x86_64/gcc-4.5.0/a-2.0-sbqz267vg2qfw457wwgo6wvjdahjgbde/include", ":")
+prepend_path("CMAKE_PREFIX_PATH", "/tmp/pytest-of-root/pytest-232/install_for_database0/test-debian6-x86_64/gcc-4.5.0/a-2.0-sbqz267vg2qfw457wwgo6wvjdahjgbde/", ":")
+
@@ -226,8 +226,9 @@ function _spack_checksum {
 function _spack_clean {
     if $list_options
     then
-        compgen -W "-h --help -s --stage -d --downloads
-                    -m --misc-cache -p --python-cache -a --all" -- "$cur"
+        compgen -W "-h --help -s --stage -d --downloads --fetch-cache
+                    --max-size --max-age -m --misc-cache -p --python-cache
+                    -a --all" -- "$cur"
     else
         compgen -W "$(_all_packages)" -- "$cur"
     fi
@@ -637,7 +638,7 @@ function _spack_install {
                     --overwrite --keep-prefix --keep-stage --dont-restage
                     --use-cache --no-cache --show-log-on-error --source
                     -n --no-checksum -v --verbose --fake --only-concrete
-                    -f --file --clean --dirty --test --log-format --log-file
+                    -f --file --clean --dirty --test --log-format --log-file --timeline
                     --cdash-upload-url -y --yes-to-all" -- "$cur"
     else
         compgen -W "$(_all_packages)" -- "$cur"
@@ -988,7 +989,7 @@ function _spack_python {
 }
 
 function _spack_reindex {
-    compgen -W "-h --help" -- "$cur"
+    compgen -W "-h --help -j --jobs" -- "$cur"
 }
 
 function _spack_remove {
@@ -1193,7 +1194,7 @@ function _spack_view {
         compgen -W "-h --help -v --verbose -e --exclude
                     -d --dependencies" -- "$cur"
     else
-        compgen -W "add check hard hardlink remove rm soft
+        compgen -W "add check copy hard hardlink remove rm soft
                     statlink status symlink" -- "$cur"
     fi
 }
@@ -1208,6 +1209,13 @@ function _spack_view_check {
     _spack_view_statlink
 }
 
+function _spack_view_copy {
+    if $list_options
+    then
+        compgen -W "-h --help -i --ignore-conflicts" -- "$cur"
+    fi
+}
+
 function _spack_view_hard {
     # Alias for `spack view hardlink`
     _spack_view_hardlink